@@ -0,0 +1,3 @@
+# encoding: utf-8
+
+# Headless parts of Path Juggler; nothing in this package imports GlyphsApp.
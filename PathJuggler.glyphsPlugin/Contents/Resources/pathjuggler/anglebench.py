@@ -0,0 +1,123 @@
+# encoding: utf-8
+
+###########################################################################################################
+#
+#	Angle table check and microbenchmark
+#
+#	Measures whether a lookup table for the angles of integer segment deltas would be faster than
+#	engine.getAngle. The table is kept here and not in the engine: lookupAngle returns exactly the
+#	same angles as getAngle, but in CPython the dict lookup costs about as much as the atan it
+#	replaces (about 700 ns per segment warm and 1000 ns cold against 420 ns for getAngle on the
+#	sample segments), so isSimilarAngle keeps calling getAngle. Run this again if that changes.
+#
+#	Usage: python -m pathjuggler.anglebench [Font.pjgs]
+#
+###########################################################################################################
+
+from __future__ import division, print_function, unicode_literals
+import random, sys, timeit
+from . import engine
+
+try:
+	from math import gcd
+except ImportError:
+	from fractions import gcd
+
+EXHAUSTIVE_RANGE = 200
+RANDOM_SAMPLES = 200000
+# maximum number of reduced integer deltas kept by lookupAngle
+ANGLE_TABLE_LIMIT = 1 << 16
+
+angleTable = {}
+
+def lookupAngle(pointFrom, pointTo):
+	'''
+	Same result as engine.getAngle, served from angleTable for integer deltas
+	Deltas are reduced by the gcd of their components, which keeps their signs and the exact
+	ratio opp/adj, and thus the angle; all multiples of a delta share one computed angle.
+	'''
+	dx = pointTo[0] - pointFrom[0]
+	dy = pointTo[1] - pointFrom[1]
+	angle = angleTable.get((dx, dy))
+	if angle is None:
+		angle = _tableAngle(dx, dy, pointFrom, pointTo)
+	return angle
+
+def _tableAngle(dx, dy, pointFrom, pointTo):
+	''' Computes the angle of a delta missing from the table and stores it if the delta is integer '''
+	try:
+		ix, iy = int(dx), int(dy)
+	except (ValueError, OverflowError):
+		return engine.getAngle(pointFrom, pointTo)
+	if ix != dx or iy != dy:
+		return engine.getAngle(pointFrom, pointTo)
+	divisor = gcd(abs(ix), abs(iy))
+	reduced = (ix // divisor, iy // divisor) if divisor > 1 else (ix, iy)
+	angle = angleTable.get(reduced)
+	if angle is None:
+		angle = engine.getAngle((0, 0), reduced)
+	# the table stays bounded; deltas beyond the limit are computed every time
+	if len(angleTable) < ANGLE_TABLE_LIMIT - 1:
+		angleTable[reduced] = angle
+		angleTable[(ix, iy)] = angle
+	return angle
+
+def storeSegments(filePath):
+	''' (pointFrom, pointTo) of all on-curve segments in a geometry store '''
+	from . import store
+	segments = []
+	with store.GeometryStore(filePath) as geometryStore:
+		for g in range(geometryStore.glyphCount()):
+			for paths in geometryStore.glyphGeometry(g):
+				for nodes in paths:
+					onCurve = engine.onCurveNodes(list(nodes))
+					segments.extend([(onCurve[i-1], n) for i, n in enumerate(onCurve)])
+	return segments
+
+def sampleSegments(count, seed=0):
+	''' Font-like segments: mostly small integer deltas that repeat, some large and some fractional ones '''
+	generator = random.Random(seed)
+	segments = []
+	for i in range(count):
+		x, y = generator.randint(-200, 1200), generator.randint(-300, 900)
+		kind = generator.random()
+		if kind < 0.8:
+			dx, dy = generator.randint(-120, 120), generator.randint(-120, 120)
+		elif kind < 0.95:
+			dx, dy = generator.randint(-5000, 5000), generator.randint(-5000, 5000)
+		else:
+			dx, dy = generator.uniform(-500, 500), generator.uniform(-500, 500)
+		segments.append(((float(x), float(y)), (x + dx, y + dy)))
+	return segments
+
+def mismatches(segments):
+	''' Segments for which lookupAngle and getAngle differ (compared as floats, bit for bit) '''
+	return [(a, b) for (a, b) in segments if lookupAngle(a, b) != engine.getAngle(a, b)]
+
+def exhaustiveSegments(limit=EXHAUSTIVE_RANGE):
+	return [((0.0, 0.0), (float(dx), float(dy))) for dx in range(-limit, limit + 1) for dy in range(-limit, limit + 1)]
+
+def timePerSegment(function, segments, repeat=3):
+	''' Best time per segment in nanoseconds over repeat runs '''
+	def run():
+		for a, b in segments:
+			function(a, b)
+	return min(timeit.repeat(run, number=1, repeat=repeat)) / len(segments) * 1e9
+
+def main(arguments=None):
+	arguments = sys.argv[1:] if arguments is None else arguments
+	segments = storeSegments(arguments[0]) if arguments else sampleSegments(RANDOM_SAMPLES)
+
+	different = mismatches(exhaustiveSegments()) + mismatches(sampleSegments(RANDOM_SAMPLES, 1)) + mismatches(segments)
+	print("Identical results: %s" % ("yes" if not different else "no, %i differences, e.g. %r" % (len(different), different[0])))
+
+	angleTable.clear()
+	cold = timePerSegment(lookupAngle, segments, 1)
+	print("%i segments, %i table entries" % (len(segments), len(angleTable)))
+	print("getAngle:              %6.0f ns per segment" % timePerSegment(engine.getAngle, segments))
+	print("lookupAngle, cold:     %6.0f ns per segment" % cold)
+	print("lookupAngle, warm:     %6.0f ns per segment" % timePerSegment(lookupAngle, segments))
+	return 1 if different else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
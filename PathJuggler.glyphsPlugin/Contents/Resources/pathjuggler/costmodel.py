@@ -0,0 +1,252 @@
+# encoding: utf-8
+
+###########################################################################################################
+#
+#	Glyph cost model and longest-first scheduling
+#
+#	The time a glyph takes is very uneven: finding a path ordering tries permutations of the paths,
+#	and finding a matching starting point compares every rotation of a path. A run that hands out
+#	glyphs in font order ends with a few workers busy on the last expensive glyphs while the others
+#	idle. The model predicts the time of a glyph from features that are cheap to count and is used
+#	to start the expensive glyphs first. It is a linear model over these features, fitted again
+#	from the timings of earlier runs, which are kept in a JSON file next to the weights.
+#
+#	Features (L = active layers, c = paths, per path of the first layer n = nodes):
+#	  1                                    overhead per glyph
+#	  L^2 * sum(n)                         directional checks of every pair of layers
+#	  L * sum(n^2)                         searching the starting point of a path
+#	  L * c^2                              comparing the arrangement of the paths
+#	  (L-1) * orderings * sum(n)           path ordering; orderings is the number of permutations
+#	                                       that only swap paths with the same type signature, the
+#	                                       ones findPathOrdering cannot reject at the first path
+#
+#	Checking and planning cost differently (only planning searches orderings), so runs of
+#	different kinds should keep their timings in different model files.
+#
+#	Usage: python -m pathjuggler.costmodel Font.pjgs --model costs.json --processes 4
+#
+###########################################################################################################
+
+from __future__ import division, print_function, unicode_literals
+import io, json, math, os, sys, time
+from . import engine
+
+MODEL_VERSION = 1
+FEATURE_NAMES = ("glyph", "nodes", "rotations", "arrangement", "orderings")
+# seconds per unit of each feature, a starting point until there are timings to fit
+DEFAULT_WEIGHTS = (2e-5, 2e-6, 1e-8, 2e-6, 8e-6)
+# permutations are counted up to this many; beyond it the glyph is expensive in any case
+ORDERING_LIMIT = 40320
+# timings kept for fitting, the latest ones
+MAX_SAMPLES = 20000
+# chunks of a parallel run hold about this share of the predicted work per process
+CHUNK_SHARE = 1 / 32
+
+def glyphFeatures(layers):
+	'''
+	Features of a glyph for the cost model, see above
+
+	:param: layers: active layers, each as list of node lists (or path views of a store)
+	'''
+	if not layers:
+		return [1.0, 0.0, 0.0, 0.0, 0.0]
+	layerCount = len(layers)
+	lengths = [len(nodes) for nodes in layers[0]]
+	signatures = {}
+	for nodes in layers[0]:
+		signature = "".join([n[2][0] for n in nodes])
+		signatures[signature] = signatures.get(signature, 0) + 1
+	orderings = 1
+	for count in signatures.values():
+		orderings = min(ORDERING_LIMIT, orderings * math.factorial(min(count, 8)))
+	nodeCount = sum(lengths)
+	return [
+		1.0,
+		float(layerCount * layerCount * nodeCount),
+		float(layerCount * sum([n * n for n in lengths])),
+		float(layerCount * len(lengths) * len(lengths)),
+		float((layerCount - 1) * orderings * nodeCount),
+	]
+
+def solveLinear(matrix, vector):
+	''' Solves matrix * x = vector by Gaussian elimination with partial pivoting, None if singular '''
+	size = len(vector)
+	rows = [list(matrix[i]) + [vector[i]] for i in range(size)]
+	for column in range(size):
+		pivot = max(range(column, size), key=lambda r: abs(rows[r][column]))
+		if abs(rows[pivot][column]) < 1e-300:
+			return None
+		rows[column], rows[pivot] = rows[pivot], rows[column]
+		for r in range(column + 1, size):
+			factor = rows[r][column] / rows[column][column]
+			for c in range(column, size + 1):
+				rows[r][c] -= factor * rows[column][c]
+	result = [0.0] * size
+	for r in range(size - 1, -1, -1):
+		result[r] = (rows[r][size] - sum([rows[r][c] * result[c] for c in range(r + 1, size)])) / rows[r][r]
+	return result
+
+def fitWeights(samples, featureCount=len(FEATURE_NAMES)):
+	'''
+	Non-negative least squares fit of the weights to (features, seconds) samples
+	Features whose weight would come out negative are dropped and the rest fitted again.
+
+	:return: weights, or None if the samples do not determine them
+	'''
+	if not samples:
+		return None
+	# errors are weighted by 1/sqrt(seconds): the expensive glyphs decide the end of a run,
+	# but the many cheap ones should not be ignored either
+	scale = [math.sqrt(max(seconds, 1e-6)) for features, seconds in samples]
+	active = list(range(featureCount))
+	while active:
+		matrix = [[0.0] * len(active) for i in active]
+		vector = [0.0] * len(active)
+		for (features, seconds), s in zip(samples, scale):
+			row = [features[i] / s for i in active]
+			for a in range(len(active)):
+				vector[a] += row[a] * seconds / s
+				for b in range(len(active)):
+					matrix[a][b] += row[a] * row[b]
+		# a little ridge keeps features that never vary (e.g. orderings in a font without ambiguity) solvable
+		for a in range(len(active)):
+			matrix[a][a] += 1e-9 * (matrix[a][a] or 1.0)
+		solution = solveLinear(matrix, vector)
+		if solution is None:
+			return None
+		negative = [active[a] for a in range(len(active)) if solution[a] < 0]
+		if not negative:
+			weights = [0.0] * featureCount
+			for a, w in zip(active, solution):
+				weights[a] = w
+			return weights
+		active = [i for i in active if i not in negative]
+	return None
+
+class CostModel(object):
+	''' Predicts the seconds a glyph takes and learns from the timings of runs '''
+
+	def __init__(self, modelPath=None):
+		self.modelPath = modelPath
+		self.weights = list(DEFAULT_WEIGHTS)
+		self.samples = []
+		if modelPath and os.path.exists(modelPath):
+			with io.open(modelPath, encoding="utf-8") as f:
+				data = json.load(f)
+			if data.get("version") == MODEL_VERSION and len(data["weights"]) == len(FEATURE_NAMES):
+				self.weights = data["weights"]
+				self.samples = [(features, seconds) for features, seconds in data["samples"]]
+
+	def predict(self, features):
+		return sum([w * f for w, f in zip(self.weights, features)])
+
+	def record(self, features, seconds):
+		self.samples.append((list(features), seconds))
+
+	def refit(self):
+		''' Fits the weights to the recorded timings; keeps the old weights if they cannot be determined '''
+		del self.samples[:-MAX_SAMPLES]
+		weights = fitWeights(self.samples)
+		if weights is not None and any(weights):
+			self.weights = weights
+			return True
+		return False
+
+	def save(self):
+		if not self.modelPath:
+			return
+		tempPath = self.modelPath + ".tmp"
+		with io.open(tempPath, "w", encoding="utf-8") as f:
+			f.write(json.dumps({"version": MODEL_VERSION, "features": FEATURE_NAMES, "weights": self.weights, "samples": self.samples}))
+		os.rename(tempPath, self.modelPath)
+
+def longestFirst(costs):
+	''' Keys of {key: cost}, the most expensive first; ties in key order so that runs are repeatable '''
+	return sorted(costs, key=lambda key: (-costs[key], key))
+
+def assignWorkers(costs, workerCount):
+	'''
+	Longest processing time first: every job, the most expensive first, goes to the worker with
+	the least work so far. The busiest worker ends up with at most 4/3 of the optimum.
+
+	:param: costs: {job: cost}
+	:return: {job: worker}
+	'''
+	totals = [0] * workerCount
+	workers = {}
+	for job in longestFirst(costs):
+		worker = totals.index(min(totals))
+		workers[job] = worker
+		totals[worker] += costs[job]
+	return workers
+
+def costChunks(costs, workerCount, chunkSize):
+	'''
+	Jobs in chunks for a process pool, the most expensive first. A chunk ends after chunkSize jobs
+	or when it holds CHUNK_SHARE of the work of one worker, so expensive jobs travel alone and
+	the cheap ones at the end fill the gaps between them.
+
+	:return: list of lists of jobs
+	'''
+	limit = sum(costs.values()) / max(1, workerCount) * CHUNK_SHARE
+	chunks = []
+	chunk, chunkCost = [], 0
+	for job in longestFirst(costs):
+		chunk.append(job)
+		chunkCost += costs[job]
+		if len(chunk) >= chunkSize or chunkCost >= limit:
+			chunks.append(chunk)
+			chunk, chunkCost = [], 0
+	if chunk:
+		chunks.append(chunk)
+	return chunks
+
+def makespan(chunks, seconds, workerCount):
+	''' Time until the last of workerCount workers is done, if each takes the next chunk when it is free '''
+	finish = [0.0] * workerCount
+	for chunk in chunks:
+		worker = finish.index(min(finish))
+		finish[worker] += sum([seconds[job] for job in chunk])
+	return max(finish)
+
+def timed(function, *args):
+	''' (result, seconds) of a call '''
+	start = time.time()
+	result = function(*args)
+	return (result, time.time() - start)
+
+def main(arguments=None):
+	import argparse
+	from . import store
+	parser = argparse.ArgumentParser(description="Compare a parallel check of a geometry store in font order and longest first")
+	parser.add_argument("store")
+	parser.add_argument("--model", help="JSON file with the weights and timings, fitted again after the run")
+	parser.add_argument("--processes", type=int, default=os.cpu_count() if hasattr(os, "cpu_count") else 2)
+	args = parser.parse_args(arguments)
+
+	settings = engine.Settings()
+	model = CostModel(args.model)
+	(inOrder, inOrderSeconds) = timed(store.checkStore, args.store, settings, args.processes, 64, None, None, False)
+	timings = {}
+	(longest, longestSeconds) = timed(store.checkStore, args.store, settings, args.processes, 64, model, timings)
+	if inOrder != longest:
+		print("⚠️ The results differ")
+		return 1
+	work = sum([seconds for features, seconds in timings.values()])
+	print("%i glyphs, %.2f s of work on %i processes (%.2f s each)" % (len(timings), work, args.processes, work / args.processes))
+	# the wall clock times depend on the free cores; the schedules are also replayed with the measured timings
+	seconds = dict([(name, s) for name, (features, s) in timings.items()])
+	names = [result[0] for result in inOrder]
+	costs = dict([(name, model.predict(features)) for name, (features, s) in timings.items()])
+	inOrderChunks = [names[i:i + 64] for i in range(0, len(names), 64)]
+	longestChunks = costChunks(costs, args.processes, 64)
+	print("In font order:  %.2f s, replayed %.2f s" % (inOrderSeconds, makespan(inOrderChunks, seconds, args.processes)))
+	print("Longest first:  %.2f s, replayed %.2f s" % (longestSeconds, makespan(longestChunks, seconds, args.processes)))
+	print("Predicted work: %.2f s" % sum(costs.values()))
+	if model.refit():
+		print("Weights fitted to %i timings: %s" % (len(model.samples), ", ".join(["%s %.3g" % (n, w) for n, w in zip(FEATURE_NAMES, model.weights)])))
+	model.save()
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
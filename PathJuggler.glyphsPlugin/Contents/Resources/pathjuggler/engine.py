@@ -0,0 +1,1149 @@
+# encoding: utf-8
+
+###########################################################################################################
+#
+#	Path Juggler engine
+#
+#	The geometry algorithms of the plugin on plain node sequences, so that they can run
+#	without Glyphs (e.g. on views into a geometry store in worker processes).
+#
+#	A path is a sequence of nodes; a node is indexable as (x, y, type), with the type
+#	being one of the GlyphsApp node type strings below.
+#
+###########################################################################################################
+
+from __future__ import division, print_function, unicode_literals
+import math
+from itertools import permutations
+
+__all__ = [
+	"DEFAULT_TOLERANCE", "DEFAULT_HORIZ_TOLERANCE", "DEFAULT_MAX_MISMATCHES", "DEFAULT_SUPPRESS_OUTPUT", "DEFAULT_IGNORE_OVERLAP",
+	"DIR_NONE", "DIR_N", "DIR_NNE", "DIR_NE", "DIR_ENE", "DIR_E", "DIR_ESE", "DIR_SE", "DIR_SSE",
+	"DIR_S", "DIR_SSW", "DIR_SW", "DIR_WSW", "DIR_W", "DIR_WNW", "DIR_NW", "DIR_NNW",
+]
+
+DEFAULT_TOLERANCE = 60
+DEFAULT_HORIZ_TOLERANCE = 15
+DEFAULT_MAX_MISMATCHES = 0
+DEFAULT_SUPPRESS_OUTPUT = 20
+DEFAULT_IGNORE_OVERLAP = True
+
+DIR_NONE = -1
+DIR_N = 0
+DIR_NNE = 1
+DIR_NE = 2
+DIR_ENE = 3
+DIR_E = 4
+DIR_ESE = 5
+DIR_SE = 6
+DIR_SSE = 7
+DIR_S = 8
+DIR_SSW = 9
+DIR_SW = 10
+DIR_WSW = 11
+DIR_W = 12
+DIR_WNW = 13
+DIR_NW = 14
+DIR_NNW = 15
+
+# same values as the GlyphsApp constants
+LINE = "line"
+CURVE = "curve"
+OFFCURVE = "offcurve"
+QCURVE = "qcurve"
+
+# the 16 compass directions are sectors of 22.5 degrees, centred on their direction
+COMPASS_SECTOR = 22.5
+COMPASS_RATIOS = [math.tan(math.radians(a)) for a in (11.25, 33.75, 56.25, 78.75)]
+# safety margin (degrees) for float rounding near sector borders and tolerance limits
+COMPASS_EPSILON = 1e-6
+
+# line segments per curve segment when curves are flattened for winding numbers
+OVERLAP_CURVE_STEPS = 16
+# distance within which a node counts as lying on another contour
+OVERLAP_EPSILON = 1e-6
+# distance within which coordinates count as equal in a CoordinateHash
+COORDINATE_EPSILON = 0.01
+# interpolation group of the masters and brace layers, see layerNameGroup
+MASTER_GROUP = "masters"
+
+class Settings(object):
+	''' Analysis settings; the plugin instance has the same attributes and can be used in its place '''
+
+	def __init__(self, tolerance=DEFAULT_TOLERANCE, horizTolerance=DEFAULT_HORIZ_TOLERANCE, maxMismatches=DEFAULT_MAX_MISMATCHES, ignoreOverlap=DEFAULT_IGNORE_OVERLAP):
+		self.TOLERANCE = float(tolerance)
+		self.HORIZ_TOLERANCE = float(horizTolerance)
+		self.MAX_MISMATCHES = int(maxMismatches)
+		self.IGNORE_OVERLAP = bool(ignoreOverlap)
+		self.IGNORE_CORNER = False
+		self.USE_COMPASS = True
+		self.compassStatistics = newCompassStatistics()
+
+def newCompassStatistics():
+	''' Counts how many segment pairs each tier of the directional check resolved '''
+	return {"accepted": 0, "rejected": 0, "exact": 0}
+
+class CoordinateHash(object):
+	'''
+	Set of (x, y) with tolerant membership: a point is contained if a stored point lies within
+	epsilon, so that tiny float drift (e.g. after remove overlap) does not cause misses
+	Points are hashed into grid cells of size epsilon; a query only looks at the 3x3 cells around it.
+	'''
+
+	def __init__(self, points=(), epsilon=COORDINATE_EPSILON):
+		if epsilon <= 0:
+			raise ValueError("epsilon must be positive")
+		self.epsilon = float(epsilon)
+		self.cells = {}
+		self.count = 0
+		for point in points:
+			self.add(point)
+
+	def _cell(self, x, y):
+		return (int(math.floor(x / self.epsilon)), int(math.floor(y / self.epsilon)))
+
+	def add(self, point):
+		self.cells.setdefault(self._cell(point[0], point[1]), []).append((point[0], point[1]))
+		self.count += 1
+
+	def __len__(self):
+		return self.count
+
+	def __contains__(self, point):
+		(px, py) = point[0], point[1]
+		(cx, cy) = self._cell(px, py)
+		limit = self.epsilon * self.epsilon
+		for x in (cx-1, cx, cx+1):
+			for y in (cy-1, cy, cy+1):
+				for (qx, qy) in self.cells.get((x, y), ()):
+					if (qx - px) ** 2 + (qy - py) ** 2 <= limit:
+						return True
+		return False
+
+	def containsAll(self, points):
+		''' Batch membership query, returns one bool per point '''
+		cells = self.cells
+		epsilon = self.epsilon
+		limit = epsilon * epsilon
+		result = []
+		for point in points:
+			(px, py) = point[0], point[1]
+			cx, cy = int(math.floor(px / epsilon)), int(math.floor(py / epsilon))
+			found = False
+			for x in (cx-1, cx, cx+1):
+				for y in (cy-1, cy, cy+1):
+					for (qx, qy) in cells.get((x, y), ()):
+						if (qx - px) ** 2 + (qy - py) ** 2 <= limit:
+							found = True
+							break
+					if found:
+						break
+				if found:
+					break
+			result.append(found)
+		return result
+
+def getDirection(pointFrom, pointTo):
+	if pointTo[0] == pointFrom[0]:
+		# north or south
+		if pointTo[1] == pointFrom[1]:
+			return DIR_NONE
+		elif pointTo[1] > pointFrom[1]:
+			return DIR_N
+		else:
+			return DIR_S
+	elif pointTo[0] > pointFrom[0]:
+		# eastwards
+		if pointTo[1] == pointFrom[1]:
+			return DIR_E
+		elif pointTo[1] > pointFrom[1]:
+			return DIR_NE
+		else:
+			return DIR_SE
+	else:
+		# westwards
+		if pointTo[1] == pointFrom[1]:
+			return DIR_W
+		elif pointTo[1] > pointFrom[1]:
+			return DIR_NW
+		else:
+			return DIR_SW
+
+def getAngle(pointFrom, pointTo):
+	''' Returns the compass angle in degrees (0 = north, clockwise) or -1.0 for zero-length segments '''
+	dir = getDirection(pointFrom, pointTo)
+	if dir != DIR_NONE:
+		if dir < 4:
+			opp = pointTo[0] - pointFrom[0]
+			adj = pointTo[1] - pointFrom[1] # zero when east
+			return math.degrees(math.atan(opp/adj))
+		elif dir < 8:
+			opp = pointFrom[1] - pointTo[1]
+			adj = pointTo[0] - pointFrom[0] # zero when south
+			return 90.0 + math.degrees(math.atan(opp/adj))
+		elif dir < 12:
+			opp = pointFrom[0] - pointTo[0]
+			adj = pointFrom[1] - pointTo[1] # zero when west
+			return 180.0 + math.degrees(math.atan(opp/adj))
+		else:
+			opp = pointTo[1] - pointFrom[1]
+			adj = pointFrom[0] - pointTo[0] # zero when north
+			return 270.0 + math.degrees(math.atan(opp/adj))
+	else:
+		return -1.0
+
+def isHorizontal(dir1, dir2):
+	return dir1==DIR_W or dir1==DIR_E or dir2==DIR_W or dir2==DIR_E
+
+def _compassStep(opp, adj):
+	''' Number of sectors the angle atan(opp/adj) spans, 0 to 4 '''
+	for step, ratio in enumerate(COMPASS_RATIOS):
+		if opp < adj * ratio:
+			return step
+	return 4
+
+def getCompassDirection(pointFrom, pointTo):
+	''' Returns the 16-way compass direction (DIR_N to DIR_NNW) from sign and ratio tests only '''
+	dx = pointTo[0] - pointFrom[0]
+	dy = pointTo[1] - pointFrom[1]
+	if dx == 0 and dy == 0:
+		return DIR_NONE
+	if dx >= 0 and dy > 0:
+		return _compassStep(dx, dy)
+	elif dx > 0:
+		return DIR_E + _compassStep(-dy, dx)
+	elif dy < 0:
+		return DIR_S + _compassStep(-dx, -dy)
+	else:
+		return (DIR_W + _compassStep(dy, -dx)) % 16
+
+def compassDifference(dir1, dir2):
+	''' Number of sectors between two compass directions, 0 to 8 '''
+	diff = abs(dir1 - dir2) % 16
+	return min(diff, 16 - diff)
+
+def compassVerdict(pointFrom1, pointTo1, pointFrom2, pointTo2, tolerance):
+	'''
+	First tier of the directional check: True or False if the compass directions alone
+	decide whether the angles are within tolerance, None for borderline pairs
+	'''
+	dir1 = getCompassDirection(pointFrom1, pointTo1)
+	dir2 = getCompassDirection(pointFrom2, pointTo2)
+	if dir1 == DIR_NONE or dir2 == DIR_NONE:
+		return None
+	# angles within sectors d apart differ by more than (d-1) and less than (d+1) sectors
+	diff = compassDifference(dir1, dir2)
+	if (diff + 1) * COMPASS_SECTOR + COMPASS_EPSILON <= tolerance:
+		return True
+	if (diff - 1) * COMPASS_SECTOR - COMPASS_EPSILON > tolerance:
+		return False
+	return None
+
+def isSimilarAngle(pointFrom1, pointTo1, pointFrom2, pointTo2, settings, tolerance = False):
+	if not tolerance:
+		if isHorizontal(getDirection(pointFrom1, pointTo1), getDirection(pointFrom2, pointTo2)):
+			tolerance = settings.HORIZ_TOLERANCE # horizontal
+		else:
+			tolerance = settings.TOLERANCE # all other strokes, e.g. vertical
+
+	if settings.USE_COMPASS:
+		verdict = compassVerdict(pointFrom1, pointTo1, pointFrom2, pointTo2, tolerance)
+		if verdict is True:
+			settings.compassStatistics["accepted"] += 1
+			return True
+		elif verdict is False:
+			settings.compassStatistics["rejected"] += 1
+			return False
+		settings.compassStatistics["exact"] += 1
+
+	angle1 = getAngle(pointFrom1, pointTo1)
+	angle2 = getAngle(pointFrom2, pointTo2)
+
+	return abs(angle2 - angle1) <= tolerance or abs(angle2 - angle1 + 360.0) <= tolerance or abs(angle2 - angle1 - 360.0) <= tolerance
+
+def onCurveNodes(nodes):
+	return [n for n in nodes if n[2] == LINE or n[2] == CURVE]
+
+def distance(pointFrom, pointTo):
+	return math.sqrt((pointTo[0] - pointFrom[0]) ** 2 + (pointTo[1] - pointFrom[1]) ** 2)
+
+def isShortestSegment(prevPrevNode, prevNode, node, nextNode):
+	''' True if the segment prevNode -> node is shorter than the one before and after it '''
+	dist = distance(prevNode, node)
+	return dist < distance(prevPrevNode, prevNode) and dist < distance(node, nextNode)
+
+def survivingNodes(nodes, roCoords):
+	''' Membership of every node in roCoords, in one batch query if roCoords is a CoordinateHash '''
+	if isinstance(roCoords, CoordinateHash):
+		return roCoords.containsAll(nodes)
+	return [(n[0], n[1]) in roCoords for n in nodes]
+
+def isOverlapSegment(source, target, i, sourceSurvives, targetSurvives):
+	'''
+	True if the line segments ending at on-curve node i of source and target are short segments
+	in an overlap region (e.g. corners), which are ignored with settings.IGNORE_OVERLAP
+
+	:param: sourceSurvives, targetSurvives: per on-curve node, whether it survives remove overlap
+	'''
+	n1, n2 = source[i], target[i]
+	if n1[2] != LINE or n2[2] != LINE:
+		return False
+	prev_n1, prev_n2 = source[i-1], target[i-1]
+	if not sourceSurvives[i-1] and not sourceSurvives[i] or not targetSurvives[i-1] and not targetSurvives[i]:
+		next_n1, next_n2 = source[(i+1) % len(source)], target[(i+1) % len(target)]
+		return isShortestSegment(source[i-2], prev_n1, n1, next_n1) and isShortestSegment(target[i-2], prev_n2, n2, next_n2)
+	return False
+
+def isCorner(dirBefore, currDir, dirAfter):
+	''' True if the three compass directions turn the same way by more than 180 degrees in total '''
+	# check that both rotations in the same direction
+	if currDir < dirBefore:
+		beforeDiff = (currDir+16) - dirBefore
+	else:
+		beforeDiff = currDir - dirBefore
+	if not (beforeDiff >= 0 and beforeDiff < 16):
+		return False
+	if dirAfter < currDir:
+		afterDiff = (dirAfter+16) - currDir
+	else:
+		afterDiff = dirAfter - currDir
+	if not (afterDiff >= 0 and afterDiff < 16):
+		return False
+
+	if beforeDiff <= 8 and afterDiff <= 8:
+		# both directions are CW
+		if dirAfter < dirBefore:
+			totalDiff = (dirAfter+16) - dirBefore
+		else:
+			totalDiff = dirAfter - dirBefore
+	elif beforeDiff >= 8 and afterDiff >= 8:
+		# both directions are CCW
+		if dirBefore < dirAfter:
+			totalDiff = (dirBefore+16) - dirAfter
+		else:
+			totalDiff = dirBefore - dirAfter
+	else:
+		return False
+	return totalDiff > 8 and totalDiff < 16
+
+def isCornerSegment(source, target, i):
+	''' True if the line segments ending at on-curve node i of source and target both lie in a corner (settings.IGNORE_CORNER) '''
+	n1, n2 = source[i], target[i]
+	if n1[2] != LINE or n2[2] != LINE:
+		return False
+	next_n1, next_n2 = source[(i+1) % len(source)], target[(i+1) % len(target)]
+	return isCorner(getDirection(source[i-2], source[i-1]), getDirection(source[i-1], n1), getDirection(n1, next_n1)) \
+		and isCorner(getDirection(target[i-2], target[i-1]), getDirection(target[i-1], n2), getDirection(n2, next_n2))
+
+def pathsDirectionallyCompatible(sourceNodes, targetNodes, settings, roSourceCoords=None, roTargetCoords=None):
+	'''
+	Checks whether two paths run in similar directions segment by segment
+
+	:param: sourceNodes, targetNodes: node sequences of the two paths
+	:settings: Settings (or the plugin instance)
+	:roSourceCoords, roTargetCoords: sets of (x, y) of nodes that survive remove overlap; if given,
+	short line segments in overlap regions are ignored (settings.IGNORE_OVERLAP)
+	'''
+	if len(sourceNodes) != len(targetNodes):
+		return False
+
+	source = onCurveNodes(sourceNodes)
+	target = onCurveNodes(targetNodes)
+	if len(source) != len(target):
+		return False
+
+	checkOverlap = settings.IGNORE_OVERLAP and roSourceCoords is not None and roTargetCoords is not None
+	checkCorner = settings.IGNORE_CORNER and len(sourceNodes) >= 3
+	if checkOverlap:
+		sourceSurvives = survivingNodes(source, roSourceCoords)
+		targetSurvives = survivingNodes(target, roTargetCoords)
+	mismatchedNodesInSequence = 0
+	for i in range(len(source)):
+		n1, n2 = source[i], target[i]
+		if n1[2] != n2[2]:
+			return False
+
+		if checkOverlap and isOverlapSegment(source, target, i, sourceSurvives, targetSurvives):
+			continue
+		if checkCorner and isCornerSegment(source, target, i):
+			continue
+
+		# negative indices wrap around like in the plugin
+		if isSimilarAngle(source[i-1], n1, target[i-1], n2, settings):
+			mismatchedNodesInSequence = 0
+		else:
+			mismatchedNodesInSequence += 1
+			if mismatchedNodesInSequence > settings.MAX_MISMATCHES: # default = 0
+				return False
+	return True
+
+def allPathsDirectionallyCompatible(sourcePaths, targetPaths, settings, roSourceCoords=None, roTargetCoords=None):
+	if len(sourcePaths) != len(targetPaths):
+		return False
+	for sourceNodes, targetNodes in zip(sourcePaths, targetPaths):
+		if not pathsDirectionallyCompatible(sourceNodes, targetNodes, settings, roSourceCoords, roTargetCoords):
+			return False
+	return True
+
+def layerDistance(paths1, paths2):
+	''' Largest coordinate difference between corresponding nodes of two layers; infinite if their structure differs '''
+	if len(paths1) != len(paths2):
+		return float("inf")
+	distance = 0.0
+	for nodes1, nodes2 in zip(paths1, paths2):
+		if len(nodes1) != len(nodes2):
+			return float("inf")
+		for n1, n2 in zip(nodes1, nodes2):
+			distance = max(distance, abs(n1[0] - n2[0]), abs(n1[1] - n2[1]))
+	return distance
+
+def triagePairs(layers):
+	'''
+	Returns all ordered pairs (i, j) of layer indices, the most distant layers first:
+	failures mostly show up between the extreme masters, so a pass/fail check can stop early
+	'''
+	pairs = []
+	for i in range(len(layers)):
+		for j in range(i + 1, len(layers)):
+			pairs.append((-layerDistance(layers[i], layers[j]), i, j))
+	pairs.sort()
+	ordered = []
+	for distance, i, j in pairs:
+		ordered.append((i, j))
+		ordered.append((j, i))
+	return ordered
+
+def newTriageStatistics():
+	''' Counts layer pairs of pass/fail checks, and how many of them were skipped after a failure '''
+	return {"pairs": 0, "checked": 0, "skipped": 0}
+
+def layerNameGroup(layerName):
+	'''
+	Interpolation group of an active layer known only by its name: bracket layers carry their axis
+	range in brackets and only interpolate with the bracket layers of the same range, masters and
+	brace layers ({...}) interpolate with each other
+	'''
+	if "[" in layerName:
+		return "bracket [" + layerName.split("[", 1)[1]
+	return MASTER_GROUP
+
+def interpolationPairs(groups):
+	''' Index pairs of the layers that interpolate with each other, given the group of every layer '''
+	return [(a, b) for a in range(len(groups)) for b in range(a + 1, len(groups)) if groups[a] == groups[b]]
+
+def countTriage(triage, pairCount, checked):
+	if triage is not None:
+		triage["pairs"] += pairCount
+		triage["checked"] += checked
+		triage["skipped"] += pairCount - checked
+
+def glyphDirectionallyCompatible(layers, settings, overlaps=None, triage=None):
+	'''
+	Checks every pair of layers, each given as a list of paths, with optional overlap coordinates per layer
+	With triage statistics, the most distant pairs are checked first and counted (see triagePairs)
+	'''
+	if overlaps is None:
+		overlaps = [None] * len(layers)
+	if triage is None:
+		pairs = [(i, j) for i in range(len(layers)) for j in range(len(layers)) if i != j]
+	else:
+		pairs = triagePairs(layers)
+	for n, (i, j) in enumerate(pairs):
+		if not allPathsDirectionallyCompatible(layers[i], layers[j], settings, overlaps[i], overlaps[j]):
+			countTriage(triage, len(pairs), n + 1)
+			return False
+	countTriage(triage, len(pairs), len(pairs))
+	return True
+
+def angleDeviation(pointFrom1, pointTo1, pointFrom2, pointTo2):
+	''' Angle difference in degrees, as compared against the tolerance in isSimilarAngle '''
+	angle1 = getAngle(pointFrom1, pointTo1)
+	angle2 = getAngle(pointFrom2, pointTo2)
+	return min(abs(angle2 - angle1), abs(angle2 - angle1 + 360.0), abs(angle2 - angle1 - 360.0))
+
+def pathDeviations(sourceNodes, targetNodes, roSourceCoords=None, roTargetCoords=None):
+	'''
+	Returns (deviation, horizontal, in overlap) for every segment of the two paths,
+	or None if they cannot be compatible at any tolerance
+	'''
+	if len(sourceNodes) != len(targetNodes):
+		return None
+	source = onCurveNodes(sourceNodes)
+	target = onCurveNodes(targetNodes)
+	if len(source) != len(target):
+		return None
+
+	checkOverlap = roSourceCoords is not None and roTargetCoords is not None
+	if checkOverlap:
+		sourceSurvives = survivingNodes(source, roSourceCoords)
+		targetSurvives = survivingNodes(target, roTargetCoords)
+	deviations = []
+	for i in range(len(source)):
+		n1, n2 = source[i], target[i]
+		if n1[2] != n2[2]:
+			return None
+		prev_n1, prev_n2 = source[i-1], target[i-1]
+		horizontal = isHorizontal(getDirection(prev_n1, n1), getDirection(prev_n2, n2))
+		inOverlap = checkOverlap and isOverlapSegment(source, target, i, sourceSurvives, targetSurvives)
+		deviations.append((angleDeviation(prev_n1, n1, prev_n2, n2), horizontal, inOverlap))
+	return deviations
+
+def layerPairMargin(sourcePaths, targetPaths, roSourceCoords=None, roTargetCoords=None):
+	'''
+	Records how far a layer pair is from failing the directional check, so that the verdict
+	for any TOLERANCE, HORIZ_TOLERANCE, MAX_MISMATCHES and IGNORE_OVERLAP can be derived
+	without the geometry (see marginPasses)
+
+	:return: None if the layers cannot be compatible, otherwise a dict with the worst deviation
+	of horizontal and other strokes and the per-segment deviations of every path
+	'''
+	if len(sourcePaths) != len(targetPaths):
+		return None
+	margin = {"horizontal": 0.0, "other": 0.0, "paths": []}
+	for sourceNodes, targetNodes in zip(sourcePaths, targetPaths):
+		deviations = pathDeviations(sourceNodes, targetNodes, roSourceCoords, roTargetCoords)
+		if deviations is None:
+			return None
+		for deviation, horizontal, inOverlap in deviations:
+			key = "horizontal" if horizontal else "other"
+			margin[key] = max(margin[key], deviation)
+		margin["paths"].append(deviations)
+	return margin
+
+def longestMismatchRun(margin, settings):
+	''' Longest sequence of segments outside the tolerances of settings, within one path '''
+	longest = 0
+	for deviations in margin["paths"]:
+		run = 0
+		for deviation, horizontal, inOverlap in deviations:
+			if inOverlap and settings.IGNORE_OVERLAP:
+				continue
+			if deviation <= (settings.HORIZ_TOLERANCE if horizontal else settings.TOLERANCE):
+				run = 0
+			else:
+				run += 1
+				longest = max(longest, run)
+	return longest
+
+def marginPasses(margin, settings):
+	''' Same verdict as allPathsDirectionallyCompatible under settings, from a recorded margin '''
+	if margin is None:
+		return False
+	if margin["horizontal"] <= settings.HORIZ_TOLERANCE and margin["other"] <= settings.TOLERANCE:
+		return True
+	return longestMismatchRun(margin, settings) <= settings.MAX_MISMATCHES
+
+class MarginTable(object):
+	''' Tolerance margins per glyph and layer pair; re-evaluating other settings is a filter over the table '''
+
+	def __init__(self):
+		self.margins = {}
+
+	def __len__(self):
+		return len(self.margins)
+
+	def add(self, glyphName, sourceLayer, targetLayer, margin):
+		self.margins.setdefault(glyphName, {})[(sourceLayer, targetLayer)] = margin
+
+	def copyGlyph(self, glyphName, newGlyphName):
+		''' Records the margins of a glyph with identical outlines for another glyph '''
+		if glyphName in self.margins:
+			self.margins[newGlyphName] = self.margins[glyphName]
+
+	def glyphPasses(self, glyphName, settings):
+		for margin in self.margins[glyphName].values():
+			if not marginPasses(margin, settings):
+				return False
+		return True
+
+	def failingGlyphs(self, settings):
+		''' Names of all glyphs in the table that are not directionally compatible under settings '''
+		return sorted([name for name in self.margins if not self.glyphPasses(name, settings)])
+
+def bottomLeftIndex(nodes):
+	''' Returns the index of the bottom left on-curve node, or None '''
+	bottomLeft = None
+	for i, n in enumerate(nodes):
+		if n[2] == LINE or n[2] == CURVE:
+			if bottomLeft is None or (n[1], n[0]) < (nodes[bottomLeft][1], nodes[bottomLeft][0]):
+				bottomLeft = i
+	return bottomLeft
+
+def startingPointChanges(paths, closed):
+	''' Returns the indices of closed paths whose starting point is not at the bottom left '''
+	changes = []
+	for p, nodes in enumerate(paths):
+		index = bottomLeftIndex(nodes)
+		# the starting node of a closed path is its last node; the start of an open path is fixed
+		if closed[p] and index is not None and index != len(nodes)-1:
+			changes.append(p)
+	return changes
+
+def getCentreOfMass(nodes):
+	onCurve = onCurveNodes(nodes)
+	if onCurve:
+		return (sum([n[0] for n in onCurve]) / len(onCurve), sum([n[1] for n in onCurve]) / len(onCurve))
+	return None
+
+def getBounds(nodes):
+	''' Returns (x, y, width, height) of the control box of the nodes '''
+	xs = [n[0] for n in nodes]
+	ys = [n[1] for n in nodes]
+	if not xs:
+		return (0, 0, 0, 0)
+	return (min(xs), min(ys), max(xs) - min(xs), max(ys) - min(ys))
+
+def pointInRect(point, rect):
+	''' Same semantics as NSPointInRect '''
+	return rect[0] <= point[0] < rect[0] + rect[2] and rect[1] <= point[1] < rect[1] + rect[3]
+
+def checkPathOrderingLists(paths1, paths2, settings, bounds1=None, bounds2=None):
+	'''
+	Checks whether the paths in both lists are arranged the same way relative to each other
+	Bounds default to the control boxes of the nodes; pass the real path bounds where known.
+	'''
+	if len(paths1) != len(paths2):
+		return False
+	centres1 = [getCentreOfMass(p) for p in paths1]
+	centres2 = [getCentreOfMass(p) for p in paths2]
+	if bounds1 is None:
+		bounds1 = [getBounds(p) for p in paths1]
+	if bounds2 is None:
+		bounds2 = [getBounds(p) for p in paths2]
+	for i in range(len(paths1)):
+		for j in range(len(paths1)):
+			if i == j:
+				continue
+			cm1, cm2 = centres1[i], centres1[j]
+			if cm1 is None or cm2 is None:
+				return False
+			# check if centre of mass doesn't intersect the other's area
+			if pointInRect(cm1, bounds1[j]) or pointInRect(cm2, bounds1[i]):
+				continue
+			lcm1, lcm2 = centres2[i], centres2[j]
+			if lcm1 is None or lcm2 is None:
+				return False
+			if pointInRect(lcm1, bounds2[j]) or pointInRect(lcm2, bounds2[i]):
+				continue
+			if not isSimilarAngle(cm1, cm2, lcm1, lcm2, settings, 45):
+				return False
+	return True
+
+def glyphPathOrderingCompatible(layers, settings, triage=None):
+	'''
+	Checks the path ordering of the first layer against all other layers
+	With triage statistics, the layers most distant from the first one are checked first
+	'''
+	others = layers[1:]
+	if triage is not None:
+		others = sorted(others, key=lambda paths: -layerDistance(layers[0], paths))
+	for n, paths in enumerate(others):
+		if not checkPathOrderingLists(layers[0], paths, settings):
+			countTriage(triage, len(others), n + 1)
+			return False
+	countTriage(triage, len(others), len(others))
+	return True
+
+def rectContainsRect(a, b):
+	''' Same semantics as NSContainsRect, for (x, y, width, height) '''
+	return b[2] > 0 and b[3] > 0 and a[0] <= b[0] and a[1] <= b[1] and b[0] + b[2] <= a[0] + a[2] and b[1] + b[3] <= a[1] + a[3]
+
+def containmentCandidates(bounds):
+	''' Pairs (outer, inner) of paths whose bounds enclose each other, the first step of finding inner paths '''
+	return [(i2, i1) for i1, b1 in enumerate(bounds) for i2, b2 in enumerate(bounds) if i1 != i2 and rectContainsRect(b2, b1)]
+
+def newTopologyStatistics():
+	''' Counts layers whose inner paths were reused, rejected by verifyContainment or computed, and the seconds spent on each '''
+	return {"reused": 0, "rejected": 0, "computed": 0, "verifyTime": 0.0, "computeTime": 0.0}
+
+def verifyContainment(innerPaths, candidates, paths, bounds):
+	'''
+	Checks whether the inner paths found on another layer are valid for these paths as well, with the
+	test of findInnerPaths in the plugin: no bounds may enclose each other that did not on the other
+	layer, and every pair whose bounds enclose each other has to be free of crossings (see pathsCross)
+	exactly if it is one of the inner paths
+
+	:param: innerPaths: (outer, inner) pairs of the other layer
+	:candidates: containmentCandidates of the other layer
+	:paths: node lists of this layer
+	:bounds: path bounds of this layer
+	'''
+	current = set(containmentCandidates(bounds))
+	if not set(innerPaths) <= current or not current <= set(candidates):
+		return False
+	innerPaths = set(innerPaths)
+	for outer, inner in current:
+		# catches inner paths that cross their outer path here, and pairs that crossed on the other layer but not here
+		if pathsCross(paths[outer], paths[inner]) == ((outer, inner) in innerPaths):
+			return False
+	return True
+
+def reversedNodes(nodes):
+	''' Returns the nodes of the path in opposite direction; segment types move to the other end of each segment '''
+	onCurve = [i for i, n in enumerate(nodes) if n[2] != OFFCURVE]
+	types = [n[2] for n in nodes]
+	for k, i in enumerate(onCurve):
+		types[i] = nodes[onCurve[(k+1) % len(onCurve)]][2]
+	return [(n[0], n[1], types[i]) for i, n in reversed(list(enumerate(nodes)))]
+
+def rotatedNodes(nodes, index):
+	''' Returns the nodes of a closed path with nodes[index] as starting node (the last one) '''
+	return list(nodes[index+1:]) + list(nodes[:index+1])
+
+class PathState(object):
+	''' Working copy of a path; bounds and index refer to the path as it was read '''
+
+	def __init__(self, index, nodes, closed, bounds):
+		self.index = index
+		self.nodes = list(nodes)
+		self.closed = closed
+		self.bounds = bounds
+
+	def reverse(self):
+		self.nodes = reversedNodes(self.nodes)
+
+	def makeNodeFirst(self, index):
+		if self.closed:
+			self.nodes = rotatedNodes(self.nodes, index)
+
+class LayerState(object):
+	''' Working copy of a layer, read once and changed by several corrections before it is written back '''
+
+	def __init__(self, paths, active):
+		self.paths = paths
+		self.active = active
+		self.overlapCoords = None
+
+	def nodeLists(self):
+		return [p.nodes for p in self.paths]
+
+	def isChanged(self):
+		for i, p in enumerate(self.paths):
+			if p.index != i:
+				return True
+		return False
+
+def setStartingPointStates(layerState):
+	''' Moves the starting points of all closed paths to their bottom left node, returns the number of changes '''
+	changed = 0
+	for path in layerState.paths:
+		index = bottomLeftIndex(path.nodes)
+		if path.closed and index is not None and index != len(path.nodes)-1:
+			path.makeNodeFirst(index)
+			changed += 1
+	return changed
+
+def findMatchingRotation(nodes, targetNodes, settings, roCoords=None, roTargetCoords=None):
+	''' Returns the nodes rotated to the first starting node that makes them compatible with targetNodes, or None '''
+	for i, n in enumerate(nodes):
+		if n[2] == CURVE or n[2] == LINE:
+			rotated = rotatedNodes(nodes, i)
+			if pathsDirectionallyCompatible(rotated, targetNodes, settings, roCoords, roTargetCoords):
+				return rotated
+	return None
+
+def findPathOrdering(referencePaths, paths, settings, roReferenceCoords=None, roCoords=None, moveStartingPoints=False, referenceBounds=None, bounds=None, closed=None):
+	'''
+	Finds the first permutation of paths that is directionally compatible with referencePaths
+	and keeps their arrangement (see correctPathOrdering in the plugin)
+	
+	:param: closed: closed flags of paths; with moveStartingPoints, only closed paths get a new
+	starting point, the start of an open path is fixed (None: all paths are closed)
+	:return: (permutation of path indices, node lists in that order) or None
+	'''
+	if len(referencePaths) != len(paths):
+		return None
+	for perm in permutations(range(len(paths))):
+		newPaths = []
+		for i, referenceNodes in enumerate(referencePaths):
+			nodes = paths[perm[i]]
+			if pathsDirectionallyCompatible(referenceNodes, nodes, settings, roReferenceCoords, roCoords):
+				newPaths.append(nodes)
+			elif moveStartingPoints and (closed is None or closed[perm[i]]) and len(nodes) > 0 and len(nodes) == len(referenceNodes):
+				rotated = findMatchingRotation(nodes, referenceNodes, settings, roCoords, roReferenceCoords)
+				if rotated is None:
+					break
+				newPaths.append(rotated)
+			else:
+				break
+		else:
+			permBounds = [bounds[j] for j in perm] if bounds is not None else None
+			if checkPathOrderingLists(referencePaths, newPaths, settings, referenceBounds, permBounds):
+				return (perm, newPaths)
+	return None
+
+def correctLayerStates(states, reference, settings):
+	'''
+	Sets the starting points of all closed paths, then reorders the paths of the other active layers
+	to match reference, moving starting points where necessary (stages 2 and 3 of running all
+	corrections; path direction needs the outline operations of Glyphs and is done before)
+
+	:param: states: LayerStates of all layers of a glyph, with the overlapCoords of the active ones
+	:reference: the state of the reference layer
+	:return: (number of starting points set, True if any path was reordered or got another starting
+	point to match reference, None or why no ordering was found: "empty", "paths" or "match")
+	'''
+	startingPoints = 0
+	for state in states:
+		startingPoints += setStartingPointStates(state)
+	if not reference.paths:
+		return (startingPoints, False, "empty")
+	referenceBounds = [p.bounds for p in reference.paths]
+	orderings = []
+	for state in states:
+		if state is reference or not state.active or not state.paths:
+			continue
+		ordering = findPathOrdering(reference.nodeLists(), state.nodeLists(), settings, reference.overlapCoords, state.overlapCoords, True, referenceBounds, [p.bounds for p in state.paths], [p.closed for p in state.paths])
+		if ordering is None:
+			return (startingPoints, False, "paths" if len(state.paths) != len(reference.paths) else "match")
+		orderings.append((state, ordering))
+	reordered = False
+	for state, (perm, newNodes) in orderings:
+		paths = [state.paths[j] for j in perm]
+		for path, nodes in zip(paths, newNodes):
+			if nodes != path.nodes:
+				path.nodes = nodes
+				reordered = True
+		if list(perm) != list(range(len(perm))):
+			state.paths = paths
+			reordered = True
+	return (startingPoints, reordered, None)
+
+def rotationIndex(nodes, rotated):
+	''' Returns the index that rotatedNodes needs to turn nodes into rotated, or None '''
+	for i in range(len(nodes)):
+		if rotatedNodes(nodes, i) == list(rotated):
+			return i
+	return None
+
+def planGlyph(layers, closed, settings):
+	'''
+	Plans starting points and path ordering of all layers, with the first layer as reference,
+	in a form that can be stored and applied later by applyGlyphPlan
+
+	:param: layers: active layers, each as list of node lists
+	:closed: closed flags of the paths of the first layer
+	:return: per layer a dict with "startingPoints" ([path, node] in the original order),
+	"ordering" (permutation of the paths, None if no compatible ordering exists) and
+	"rotations" ([position, node] of paths whose starting point had to move to match the reference)
+	'''
+	states = []
+	for paths in layers:
+		states.append(LayerState([PathState(i, nodes, closed[i] if i < len(closed) else True, getBounds(nodes)) for i, nodes in enumerate(paths)], True))
+	plan = []
+	for state in states:
+		startingPoints = []
+		for i, path in enumerate(state.paths):
+			index = bottomLeftIndex(path.nodes)
+			if path.closed and index is not None and index != len(path.nodes)-1:
+				startingPoints.append([i, index])
+		setStartingPointStates(state)
+		plan.append({"startingPoints": startingPoints, "ordering": list(range(len(state.paths))), "rotations": []})
+	reference = states[0] if states else None
+	for state, layerPlan in zip(states[1:], plan[1:]):
+		overlaps = (None, None)
+		if settings.IGNORE_OVERLAP and len(state.paths) == len(closed) == len(reference.paths):
+			overlaps = (overlapCoords(reference.nodeLists(), closed), overlapCoords(state.nodeLists(), closed))
+		ordering = findPathOrdering(reference.nodeLists(), state.nodeLists(), settings, overlaps[0], overlaps[1], True, [p.bounds for p in reference.paths], [p.bounds for p in state.paths], [p.closed for p in state.paths])
+		if ordering is None:
+			layerPlan["ordering"] = None
+			continue
+		layerPlan["ordering"] = list(ordering[0])
+		for position, (j, nodes) in enumerate(zip(ordering[0], ordering[1])):
+			if nodes != state.paths[j].nodes:
+				layerPlan["rotations"].append([position, rotationIndex(state.paths[j].nodes, nodes)])
+	return plan
+
+def applyGlyphPlan(layers, plan):
+	''' Returns the node lists of the layers after the changes of a plan made by planGlyph '''
+	result = []
+	for paths, layerPlan in zip(layers, plan):
+		paths = [list(nodes) for nodes in paths]
+		for i, index in layerPlan["startingPoints"]:
+			paths[i] = rotatedNodes(paths[i], index)
+		if layerPlan["ordering"] is not None:
+			paths = [paths[j] for j in layerPlan["ordering"]]
+			for position, index in layerPlan["rotations"]:
+				paths[position] = rotatedNodes(paths[position], index)
+		result.append(paths)
+	return result
+
+def layerOrigin(paths):
+	''' Position of the first node of a layer; path keys are relative to it, so that they do not depend on where the outlines are '''
+	for nodes in paths:
+		for n in nodes:
+			return (n[0], n[1])
+	return (0, 0)
+
+def pathKey(nodes, origin):
+	return tuple([(n[2], n[0] - origin[0], n[1] - origin[1]) for n in nodes])
+
+def layerStatesPlan(layers, states):
+	'''
+	The changes of LayerStates as a path plan that can be replayed on glyphs with the same outlines:
+	per layer None (unchanged) or a list of (original path index, path key after the change)
+
+	:param: layers: node lists of the layers as they were read into the states
+	:return: the plan, or None if no layer changed
+	'''
+	plan = []
+	changed = False
+	for paths, state in zip(layers, states):
+		origin = layerOrigin(paths)
+		layerPlan = [(p.index, pathKey(p.nodes, origin)) for p in state.paths]
+		if [key for (index, key) in layerPlan] != [pathKey(nodes, origin) for nodes in paths]:
+			plan.append(layerPlan)
+			changed = True
+		else:
+			plan.append(None)
+	return plan if changed else None
+
+def resolvePathKey(nodes, closed, key, origin):
+	'''
+	Finds the direction and starting node that turn a path into the one described by key
+
+	:return: (reverse first, index of the node to make the starting node or None), or None if there is none
+	'''
+	for reverse in (False, True):
+		candidate = reversedNodes(nodes) if reverse else list(nodes)
+		if pathKey(candidate, origin) == key:
+			return (reverse, None)
+		if closed:
+			for i, n in enumerate(candidate):
+				if (n[2] == CURVE or n[2] == LINE) and pathKey(rotatedNodes(candidate, i), origin) == key:
+					return (reverse, i)
+	return None
+
+def resolveLayerPlan(paths, closed, layerPlan):
+	'''
+	Resolves one layer of a path plan against the paths of a layer with the same outlines
+
+	:param: paths: node lists of the layer
+	:closed: closed flag per path
+	:return: per path in the new order (original index, reverse first, new starting node or None),
+	or None if the plan does not fit the layer
+	'''
+	origin = layerOrigin(paths)
+	changes = []
+	for index, key in layerPlan:
+		if index >= len(paths):
+			return None
+		change = resolvePathKey(paths[index], closed[index], key, origin)
+		if change is None:
+			return None
+		changes.append((index,) + change)
+	return changes
+
+def applyLayerChanges(paths, changes):
+	''' Node lists of a layer after the changes returned by resolveLayerPlan '''
+	result = []
+	for index, reverse, start in changes:
+		nodes = reversedNodes(paths[index]) if reverse else list(paths[index])
+		result.append(rotatedNodes(nodes, start) if start is not None else nodes)
+	return result
+
+def flattenedPolygon(nodes, steps=OVERLAP_CURVE_STEPS):
+	''' Returns the outline of a closed path as polygon, with curve segments approximated by lines '''
+	if not nodes:
+		return []
+	polygon = []
+	# the outline starts at the starting node, the last one
+	current = nodes[-1]
+	offCurves = []
+	for n in nodes:
+		if n[2] == OFFCURVE:
+			offCurves.append(n)
+			continue
+		if n[2] == CURVE and len(offCurves) == 2:
+			polygon.extend(cubicPoints(current, offCurves[0], offCurves[1], n, steps))
+		else:
+			# quadratic splines and irregular curves: the control polygon is close enough
+			polygon.extend([(o[0], o[1]) for o in offCurves])
+		polygon.append((n[0], n[1]))
+		current = n
+		offCurves = []
+	return polygon
+
+def cubicPoints(p0, p1, p2, p3, steps):
+	''' The points of a cubic curve between its end points, at steps - 1 equal parameter intervals '''
+	(x0, y0), (x1, y1), (x2, y2), (x3, y3) = p0[:2], p1[:2], p2[:2], p3[:2]
+	points = []
+	for step in range(1, steps):
+		t = step / steps
+		mt = 1.0 - t
+		points.append((
+			mt*mt*mt*x0 + 3*mt*mt*t*x1 + 3*mt*t*t*x2 + t*t*t*x3,
+			mt*mt*mt*y0 + 3*mt*mt*t*y1 + 3*mt*t*t*y2 + t*t*t*y3,
+		))
+	return points
+
+def pathSegments(nodes):
+	''' The segments of a closed path as node lists from one on-curve node to the next, in the order of flattenedPolygon '''
+	if not nodes:
+		return []
+	if nodes[-1][2] == OFFCURVE:
+		# no on-curve starting node: the whole path as one segment, only used for its bounds
+		return [list(nodes) + [nodes[0]]]
+	segments = []
+	current = [nodes[-1]]
+	for n in nodes:
+		current.append(n)
+		if n[2] != OFFCURVE:
+			segments.append(current)
+			current = [n]
+	return segments
+
+def segmentEdges(segment, steps=OVERLAP_CURVE_STEPS):
+	''' The lines flattenedPolygon approximates a segment of pathSegments with '''
+	if segment[-1][2] == CURVE and len(segment) == 4:
+		points = [segment[0][:2]] + cubicPoints(segment[0], segment[1], segment[2], segment[3], steps) + [segment[-1][:2]]
+	else:
+		points = [n[:2] for n in segment]
+	return [(points[i-1], points[i]) for i in range(1, len(points))]
+
+def pointBounds(points):
+	''' (left, bottom, right, top) of points '''
+	xs = [p[0] for p in points]
+	ys = [p[1] for p in points]
+	return (min(xs), min(ys), max(xs), max(ys))
+
+def boundsOverlap(a, b):
+	return a[0] <= b[2] and b[0] <= a[2] and a[1] <= b[3] and b[1] <= a[3]
+
+def signedArea(polygon):
+	''' Positive for counter-clockwise polygons '''
+	area = 0.0
+	for i, (x1, y1) in enumerate(polygon):
+		(x0, y0) = polygon[i-1]
+		area += x0 * y1 - x1 * y0
+	return area / 2.0
+
+def windingNumber(point, polygon):
+	''' Winding number of the polygon around point, counter-clockwise counts positive '''
+	(px, py) = point
+	winding = 0
+	for i, (x1, y1) in enumerate(polygon):
+		(x0, y0) = polygon[i-1]
+		isLeft = (x1 - x0) * (py - y0) - (px - x0) * (y1 - y0)
+		if y0 <= py:
+			if y1 > py and isLeft > 0:
+				winding += 1
+		elif y1 <= py and isLeft < 0:
+			winding -= 1
+	return winding
+
+def segmentsIntersect(a, b, c, d):
+	''' True if the segments a-b and c-d intersect or touch '''
+	d1 = (d[0] - c[0]) * (a[1] - c[1]) - (d[1] - c[1]) * (a[0] - c[0])
+	d2 = (d[0] - c[0]) * (b[1] - c[1]) - (d[1] - c[1]) * (b[0] - c[0])
+	d3 = (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+	d4 = (b[0] - a[0]) * (d[1] - a[1]) - (b[1] - a[1]) * (d[0] - a[0])
+	if ((d1 > 0 and d2 < 0) or (d1 < 0 and d2 > 0)) and ((d3 > 0 and d4 < 0) or (d3 < 0 and d4 > 0)):
+		return True
+	# collinear cases: an end point lying on the other segment
+	def onSegment(p, q, r):
+		return min(p[0], q[0]) <= r[0] <= max(p[0], q[0]) and min(p[1], q[1]) <= r[1] <= max(p[1], q[1])
+	return (d1 == 0 and onSegment(c, d, a)) or (d2 == 0 and onSegment(c, d, b)) or (d3 == 0 and onSegment(a, b, c)) or (d4 == 0 and onSegment(a, b, d))
+
+def pathsCross(nodes1, nodes2):
+	'''
+	True if the outlines of two closed paths intersect or touch, like intersectWithPath_ in findInnerPaths
+	A segment lies within the bounds of its nodes, so only the segments whose bounds meet those of
+	the other path are flattened, and only their edges near each other are compared.
+	'''
+	segments1 = pathSegments(nodes1)
+	segments2 = pathSegments(nodes2)
+	if not segments1 or not segments2:
+		return False
+	bounds1 = [pointBounds(segment) for segment in segments1]
+	bounds2 = [pointBounds(segment) for segment in segments2]
+	near1 = [segments1[i] for i, b in enumerate(bounds1) if boundsOverlap(b, pointBounds(nodes2))]
+	if not near1:
+		return False
+	nearBounds1 = pointBounds([n for segment in near1 for n in segment])
+	near2 = [segments2[i] for i, b in enumerate(bounds2) if boundsOverlap(b, nearBounds1)]
+	if not near2:
+		return False
+	edges2 = [edge for segment in near2 for edge in segmentEdges(segment)]
+	nearBounds2 = pointBounds([p for edge in edges2 for p in edge])
+	for segment in near1:
+		for (a, b) in segmentEdges(segment):
+			if not boundsOverlap(pointBounds((a, b)), nearBounds2):
+				continue
+			for (c, d) in edges2:
+				if max(a[0], b[0]) < min(c[0], d[0]) or max(c[0], d[0]) < min(a[0], b[0]) or max(a[1], b[1]) < min(c[1], d[1]) or max(c[1], d[1]) < min(a[1], b[1]):
+					continue
+				if segmentsIntersect(a, b, c, d):
+					return True
+	return False
+
+def isOnPolygon(point, polygon, epsilon=OVERLAP_EPSILON):
+	(px, py) = point
+	for i, (x1, y1) in enumerate(polygon):
+		(x0, y0) = polygon[i-1]
+		dx, dy = x1 - x0, y1 - y0
+		length = dx * dx + dy * dy
+		if length == 0:
+			t = 0.0
+		else:
+			t = max(0.0, min(1.0, ((px - x0) * dx + (py - y0) * dy) / length))
+		if (px - x0 - t * dx) ** 2 + (py - y0 - t * dy) ** 2 <= epsilon * epsilon:
+			return True
+	return False
+
+def overlapCoords(paths, closed, epsilon=COORDINATE_EPSILON):
+	'''
+	Returns a CoordinateHash of all on-curve nodes that would survive remove overlap, computed from winding
+	numbers instead of a boolean operation: a node survives if it lies on the border of the filled
+	area (non-zero winding), i.e. if the other contours around it wind 0 times on either side of its own contour
+	
+	:param: paths: node lists of all paths of the layer
+	:closed: closed flag per path; open paths do not fill any area
+	'''
+	polygons = []
+	for nodes, isClosed in zip(paths, closed):
+		polygon = flattenedPolygon(nodes) if isClosed else []
+		if len(polygon) >= 3:
+			xs = [p[0] for p in polygon]
+			ys = [p[1] for p in polygon]
+			polygons.append((polygon, (min(xs), min(ys), max(xs), max(ys)), 1 if signedArea(polygon) > 0 else -1))
+		else:
+			polygons.append(None)
+	
+	survivors = CoordinateHash(epsilon=epsilon)
+	for i, nodes in enumerate(paths):
+		for n in onCurveNodes(nodes):
+			point = (n[0], n[1])
+			winding = 0
+			onBorder = False
+			for j, entry in enumerate(polygons):
+				if j == i or entry is None:
+					continue
+				polygon, (xMin, yMin, xMax, yMax), orientation = entry
+				if point[0] < xMin - OVERLAP_EPSILON or point[0] > xMax + OVERLAP_EPSILON or point[1] < yMin - OVERLAP_EPSILON or point[1] > yMax + OVERLAP_EPSILON:
+					continue
+				if isOnPolygon(point, polygon):
+					# remove overlap puts a node where contours cross
+					onBorder = True
+					break
+				winding += windingNumber(point, polygon)
+			if onBorder or winding == 0 or (polygons[i] is not None and winding + polygons[i][2] == 0):
+				survivors.add(point)
+	return survivors
+
+def checkGlyph(layers, closed, settings, triage=None):
+	'''
+	Runs the checks of the plugin on the active layers of a glyph without Glyphs
+
+	:param: layers: active layers, each as list of node lists
+	:closed: closed flags of the paths of the first layer
+	:triage: triage statistics, to check the most distant layers first and stop at the first failure
+	:return: dict with the verdicts "directional" and "ordering"
+	'''
+	overlaps = None
+	if settings.IGNORE_OVERLAP:
+		overlaps = [overlapCoords(paths, closed) if len(paths) == len(closed) else None for paths in layers]
+	return {
+		"directional": glyphDirectionallyCompatible(layers, settings, overlaps, triage),
+		"ordering": glyphPathOrderingCompatible(layers, settings, triage),
+	}
@@ -0,0 +1,177 @@
+# encoding: utf-8
+
+###########################################################################################################
+#
+#	Family-wide analysis cache
+#
+#	The sources of a family (Upright, Italic, Condensed, ...) share most of their glyph set and
+#	often whole outlines. This cache is content-addressed: entries are keyed by the geometry of a
+#	glyph's active layers, each layer moved so that its first node is at the origin, so an outline
+#	is analyzed once no matter which source or position it comes from. An entry keeps the overlap
+#	classification of the nodes and the verdicts per settings.
+#
+#	Usage: python -m pathjuggler.familycache Upright.glyphspackage Italic.pjgs --cache family.json
+#
+###########################################################################################################
+
+from __future__ import division, print_function, unicode_literals
+import hashlib, io, json, os, sys
+from . import engine, glyphsfile, interpolation, store
+
+CACHE_VERSION = 2
+
+def layerOrigin(paths):
+	''' Position of the first node of the layer, like getLayerOrigin in the plugin '''
+	for nodes in paths:
+		if len(nodes):
+			return (nodes[0][0], nodes[0][1])
+	return (0.0, 0.0)
+
+def normalizedLayers(layers):
+	''' The layers with every layer moved so that its first node is at the origin '''
+	normalized = []
+	for paths in layers:
+		(ox, oy) = layerOrigin(paths)
+		normalized.append([[(n[0] - ox, n[1] - oy, n[2]) for n in nodes] for nodes in paths])
+	return normalized
+
+def geometryKey(layers, closed):
+	''' Content address of a glyph's outlines: a digest of the normalized layers and the closed flags '''
+	digest = hashlib.sha1()
+	digest.update(repr((normalizedLayers(layers), list(closed))).encode("utf-8"))
+	return digest.hexdigest()
+
+def settingsKey(settings):
+	return "%r/%r/%r/%r" % (settings.TOLERANCE, settings.HORIZ_TOLERANCE, settings.MAX_MISMATCHES, settings.IGNORE_OVERLAP)
+
+class FamilyCache(object):
+	''' Analysis results of the glyphs of several fonts, shared by all glyphs with the same outlines '''
+
+	def __init__(self, cachePath=None):
+		self.cachePath = cachePath
+		self.entries = {}
+		self.statistics = {} # font -> {"hits", "misses"}
+		if cachePath and os.path.exists(cachePath):
+			with io.open(cachePath, encoding="utf-8") as f:
+				data = json.load(f)
+			if data.get("version") == CACHE_VERSION:
+				self.entries = data["entries"]
+
+	def save(self):
+		if not self.cachePath:
+			return
+		tempPath = self.cachePath + ".tmp"
+		with io.open(tempPath, "w", encoding="utf-8") as f:
+			f.write(json.dumps({"version": CACHE_VERSION, "entries": self.entries}, ensure_ascii=False))
+		os.rename(tempPath, self.cachePath)
+
+	def entry(self, layers, closed, font=None):
+		''' Returns the cache entry of a glyph, creating it with the overlap classification on a miss '''
+		key = geometryKey(layers, closed)
+		statistics = self.statistics.setdefault(font, {"hits": 0, "misses": 0})
+		if key in self.entries:
+			statistics["hits"] += 1
+			return self.entries[key]
+		statistics["misses"] += 1
+		overlaps = []
+		for paths in layers:
+			if len(paths) == len(closed):
+				survivors = engine.overlapCoords(paths, closed)
+				# classification of the on-curve nodes, in the order of onCurveNodes
+				overlaps.append([[(n[0], n[1]) in survivors for n in engine.onCurveNodes(nodes)] for nodes in paths])
+			else:
+				overlaps.append(None)
+		entry = {
+			"overlaps": overlaps,
+			"verdicts": {},
+		}
+		self.entries[key] = entry
+		return entry
+
+	def overlapCoords(self, entry, layers):
+		''' Rebuilds the overlap coordinates of the layers from the classification of an entry '''
+		coords = []
+		for paths, classification in zip(layers, entry["overlaps"]):
+			if classification is None:
+				coords.append(None)
+				continue
+			survivors = engine.CoordinateHash()
+			for nodes, survives in zip(paths, classification):
+				for n, s in zip(engine.onCurveNodes(nodes), survives):
+					if s:
+						survivors.add((n[0], n[1]))
+			coords.append(survivors)
+		return coords
+
+	def checkGlyph(self, layers, closed, settings, font=None):
+		''' Same verdicts as engine.checkGlyph, computed once per outline and settings '''
+		entry = self.entry(layers, closed, font)
+		key = settingsKey(settings)
+		if key not in entry["verdicts"]:
+			overlaps = self.overlapCoords(entry, layers) if settings.IGNORE_OVERLAP else None
+			entry["verdicts"][key] = {
+				"directional": engine.glyphDirectionallyCompatible(layers, settings, overlaps),
+				"ordering": engine.glyphPathOrderingCompatible(layers, settings),
+			}
+		return entry["verdicts"][key]
+
+	def hitRates(self):
+		''' Share of glyphs per font whose outlines were already in the cache '''
+		rates = {}
+		for font, statistics in self.statistics.items():
+			total = statistics["hits"] + statistics["misses"]
+			rates[font] = statistics["hits"] / total if total else 0.0
+		return rates
+
+def sourceGlyphs(sourcePath):
+	''' Yields (glyph name, layers, closed) of a .glyphspackage or a geometry store '''
+	if os.path.isdir(sourcePath):
+		directory = glyphsfile.glyphsDirectory(sourcePath)
+		for fileName in sorted(os.listdir(directory)):
+			if fileName.endswith(".glyph"):
+				glyphName, layers = glyphsfile.readGlyphFile(os.path.join(directory, fileName))
+				yield (glyphName, [[nodes for (closed, nodes) in paths] for (layerId, paths) in layers], [c for (c, nodes) in layers[0][1]] if layers else [])
+	else:
+		with store.GeometryStore(sourcePath) as geometryStore:
+			for glyph in interpolation.storeGlyphs(geometryStore):
+				yield glyph
+
+def checkFamily(sourcePaths, settings, cache):
+	'''
+	Checks all glyphs of several sources through one cache
+
+	:return: {source path: {glyph name: verdicts}}
+	'''
+	results = {}
+	for sourcePath in sourcePaths:
+		verdicts = {}
+		for glyphName, layers, closed in sourceGlyphs(sourcePath):
+			if layers:
+				verdicts[glyphName] = cache.checkGlyph(layers, closed, settings, sourcePath)
+			else:
+				verdicts[glyphName] = {"directional": True, "ordering": True}
+		results[sourcePath] = verdicts
+	return results
+
+def main(arguments=None):
+	import argparse
+	parser = argparse.ArgumentParser(description="Check the sources of a family with a shared analysis cache")
+	parser.add_argument("sources", nargs="+", help=".glyphspackage directories or geometry stores")
+	parser.add_argument("--cache", help="JSON file to keep the cache in between runs")
+	parser.add_argument("--tolerance", type=float, default=engine.DEFAULT_TOLERANCE)
+	parser.add_argument("--horiz-tolerance", type=float, default=engine.DEFAULT_HORIZ_TOLERANCE)
+	parser.add_argument("--max-mismatches", type=int, default=engine.DEFAULT_MAX_MISMATCHES)
+	args = parser.parse_args(arguments)
+
+	settings = engine.Settings(args.tolerance, args.horiz_tolerance, args.max_mismatches)
+	cache = FamilyCache(args.cache)
+	results = checkFamily(args.sources, settings, cache)
+	cache.save()
+	rates = cache.hitRates()
+	for sourcePath in args.sources:
+		failing = sorted([name for name, verdicts in results[sourcePath].items() if not verdicts["directional"] or not verdicts["ordering"]])
+		print("%s: %i glyphs, %.0f%% from the cache, %i with problems%s" % (sourcePath, len(results[sourcePath]), rates.get(sourcePath, 0.0) * 100, len(failing), (": " + ", ".join(failing)) if failing else ""))
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
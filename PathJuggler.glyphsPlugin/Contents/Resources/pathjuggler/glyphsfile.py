@@ -0,0 +1,151 @@
+# encoding: utf-8
+
+###########################################################################################################
+#
+#	Reader for Glyphs 3 source files
+#
+#	A minimal OpenStep property list parser, enough to read the paths of the active layers
+#	of the glyph files in a .glyphspackage (glyphs/*.glyph) without Glyphs.
+#
+###########################################################################################################
+
+from __future__ import division, print_function, unicode_literals
+import io, os, re
+from . import engine
+
+NODE_TYPES = {
+	"l": engine.LINE, "ls": engine.LINE,
+	"c": engine.CURVE, "cs": engine.CURVE,
+	"q": engine.QCURVE, "qs": engine.QCURVE,
+	"o": engine.OFFCURVE,
+}
+
+_TOKEN = re.compile(r'\s*(?:(//[^\n]*)|(/\*.*?\*/)|([{}()=;,])|"((?:[^"\\]|\\.)*)"|(<[0-9a-fA-F\s]*>)|([^\s{}()=;,"<>]+))', re.S)
+_ESCAPES = {"n": "\n", "t": "\t", "r": "\r", "\"": "\"", "\\": "\\"}
+
+class ParseError(ValueError):
+	pass
+
+def _tokens(text):
+	position = 0
+	length = len(text)
+	while position < length:
+		match = _TOKEN.match(text, position)
+		if not match:
+			if text[position:].strip() == "":
+				return
+			raise ParseError("Unexpected character at offset %i" % position)
+		position = match.end()
+		comment, blockComment, punctuation, quoted, data, bare = match.groups()
+		if punctuation:
+			yield ("punctuation", punctuation)
+		elif quoted is not None:
+			yield ("string", re.sub(r'\\(.)', lambda m: _ESCAPES.get(m.group(1), m.group(1)), quoted))
+		elif data:
+			yield ("string", data)
+		elif bare:
+			yield ("string", bare)
+
+def parse(text):
+	''' Parses an OpenStep property list into dicts, lists and strings '''
+	tokens = _tokens(text)
+
+	def value(token):
+		kind, content = token
+		if kind == "string":
+			return content
+		if content == "{":
+			result = {}
+			for token in tokens:
+				if token == ("punctuation", "}"):
+					return result
+				key = value(token)
+				if next(tokens) != ("punctuation", "="):
+					raise ParseError("Expected '=' after %s" % key)
+				result[key] = value(next(tokens))
+				if next(tokens) != ("punctuation", ";"):
+					raise ParseError("Expected ';' after value of %s" % key)
+			raise ParseError("Unterminated dictionary")
+		if content == "(":
+			result = []
+			for token in tokens:
+				if token == ("punctuation", ")"):
+					return result
+				if token == ("punctuation", ","):
+					continue
+				result.append(value(token))
+			raise ParseError("Unterminated array")
+		raise ParseError("Unexpected '%s'" % content)
+
+	try:
+		return value(next(tokens))
+	except StopIteration:
+		raise ParseError("Unexpected end of file")
+
+def _dict(value):
+	''' The value if it is a dictionary, otherwise an empty one, so that malformed entries are skipped '''
+	return value if isinstance(value, dict) else {}
+
+def isActiveLayer(layer):
+	''' Master layers and brace/bracket layers, like isActiveLayer in the plugin '''
+	if "associatedMasterId" not in layer or layer.get("associatedMasterId") == layer.get("layerId"):
+		return True
+	attributes = _dict(layer.get("attr"))
+	return "coordinates" in attributes or "axisRules" in attributes
+
+def layerPaths(layer):
+	''' Returns the paths of a parsed layer as [(closed, [(x, y, type)])]; components are skipped '''
+	paths = []
+	for shape in layer.get("shapes", layer.get("paths", [])):
+		if not isinstance(shape, dict) or "nodes" not in shape:
+			continue
+		nodes = []
+		for node in shape["nodes"]:
+			nodes.append((float(node[0]), float(node[1]), NODE_TYPES[node[2]]))
+		paths.append((shape.get("closed", "1") == "1", nodes))
+	return paths
+
+def interpolationGroup(layer):
+	'''
+	Layers interpolate with the layers of the same group: the masters and brace layers with each
+	other, bracket layers only with the bracket layers of the same axis range
+	'''
+	axisRules = _dict(layer.get("attr")).get("axisRules")
+	if axisRules is not None:
+		return "bracket %r" % (axisRules,)
+	return engine.layerNameGroup(layer.get("name", ""))
+
+def readGlyphLayers(text):
+	'''
+	Reads the active layers of a glyph from the text of a .glyph file, with their interpolation groups
+
+	:return: (glyph name, [(layer id, interpolation group, [(closed, nodes)])])
+	'''
+	glyph = parse(text)
+	if not isinstance(glyph, dict):
+		raise ParseError("Not a glyph")
+	layers = []
+	for layer in glyph.get("layers", []):
+		if isinstance(layer, dict) and isActiveLayer(layer):
+			layers.append((layer.get("layerId", ""), interpolationGroup(layer), layerPaths(layer)))
+	return (glyph.get("glyphname", ""), layers)
+
+def readGlyph(text):
+	'''
+	Reads the active layers of a glyph from the text of a .glyph file
+
+	:return: (glyph name, [(layer id, [(closed, nodes)])])
+	'''
+	glyphName, layers = readGlyphLayers(text)
+	return (glyphName, [(layerId, paths) for (layerId, group, paths) in layers])
+
+def readGlyphFile(filePath):
+	with io.open(filePath, encoding="utf-8") as f:
+		return readGlyph(f.read())
+
+def readGlyphLayersFile(filePath):
+	with io.open(filePath, encoding="utf-8") as f:
+		return readGlyphLayers(f.read())
+
+def glyphsDirectory(packagePath):
+	return os.path.join(packagePath, "glyphs")
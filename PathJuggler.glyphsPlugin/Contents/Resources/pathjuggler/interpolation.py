@@ -0,0 +1,223 @@
+# encoding: utf-8
+
+###########################################################################################################
+#
+#	Interpolation sampler
+#
+#	Interpolates sample instances between compatible layers and looks for the problems that
+#	pairwise comparisons of the masters do not show: paths that flip direction, segments that
+#	collapse to (almost) zero length and control polygons that start to intersect themselves.
+#	Only layers that really interpolate are paired: masters and brace layers with each other,
+#	bracket layers with the bracket layers of the same axis range (see engine.interpolationPairs).
+#
+#	Usage: python -m pathjuggler.interpolation Font.glyphspackage (or Font.pjgs) [--samples 10]
+#
+###########################################################################################################
+
+from __future__ import division, print_function, unicode_literals
+import os, sys
+from . import engine
+
+DEFAULT_SAMPLES = 10
+# segments shorter than this (in units) count as collapsed
+COLLAPSE_THRESHOLD = 0.5
+
+# weights for ranking glyphs by severity
+SEVERITY_FLIP = 10
+SEVERITY_INTERSECTION = 5
+SEVERITY_COLLAPSE = 1
+
+def layersInterpolable(layers):
+	''' True if all layers have the same structure (paths, node counts and types) '''
+	for paths in layers[1:]:
+		if len(paths) != len(layers[0]):
+			return False
+		for nodes, referenceNodes in zip(paths, layers[0]):
+			if len(nodes) != len(referenceNodes):
+				return False
+			for n, r in zip(nodes, referenceNodes):
+				if n[2] != r[2]:
+					return False
+	return True
+
+def flatCoordinates(paths):
+	''' All coordinates of a layer as one flat list x0, y0, x1, y1, ... '''
+	coords = []
+	for nodes in paths:
+		for n in nodes:
+			coords.append(n[0])
+			coords.append(n[1])
+	return coords
+
+def instanceCoordinates(coordsA, coordsB, samples):
+	''' Coordinates of samples evenly spaced instances strictly between two layers, computed in one batch '''
+	deltas = [b - a for a, b in zip(coordsA, coordsB)]
+	instances = []
+	for s in range(1, samples + 1):
+		t = s / (samples + 1)
+		instances.append([a + t * d for a, d in zip(coordsA, deltas)])
+	return instances
+
+def splitPaths(coords, template):
+	''' Turns flat coordinates back into node lists, with the node types of template '''
+	paths = []
+	i = 0
+	for nodes in template:
+		path = []
+		for n in nodes:
+			path.append((coords[i], coords[i+1], n[2]))
+			i += 2
+		paths.append(path)
+	return paths
+
+def segmentLengths(nodes):
+	onCurve = engine.onCurveNodes(nodes)
+	return [engine.distance(onCurve[i-1], n) for i, n in enumerate(onCurve)]
+
+def _orientation(a, b, c):
+	value = (b[0] - a[0]) * (c[1] - a[1]) - (b[1] - a[1]) * (c[0] - a[0])
+	return (value > 0) - (value < 0)
+
+def _segmentsCross(a, b, c, d):
+	''' Proper crossing of segments ab and cd; touching or collinear segments do not count '''
+	return _orientation(a, b, c) * _orientation(a, b, d) < 0 and _orientation(c, d, a) * _orientation(c, d, b) < 0
+
+def selfIntersects(nodes):
+	''' True if the control polygon of the closed path crosses itself (sweep over x) '''
+	points = [(n[0], n[1]) for n in nodes]
+	count = len(points)
+	if count < 4:
+		return False
+	segments = []
+	for i in range(count):
+		a, b = points[i-1], points[i]
+		segments.append((min(a[0], b[0]), max(a[0], b[0]), min(a[1], b[1]), max(a[1], b[1]), i, a, b))
+	segments.sort()
+	for k, (xMin, xMax, yMin, yMax, i, a, b) in enumerate(segments):
+		for (xMin2, xMax2, yMin2, yMax2, j, c, d) in segments[k+1:]:
+			if xMin2 > xMax:
+				break
+			if yMin2 > yMax or yMax2 < yMin:
+				continue
+			# neighbouring segments share a node
+			if abs(i - j) == 1 or abs(i - j) == count - 1:
+				continue
+			if _segmentsCross(a, b, c, d):
+				return True
+	return False
+
+def pathOrientation(nodes):
+	return engine.signedArea(engine.flattenedPolygon(nodes))
+
+def validateGlyph(layers, closed, samples=DEFAULT_SAMPLES, collapseThreshold=COLLAPSE_THRESHOLD, groups=None):
+	'''
+	Interpolates samples instances between every pair of layers that interpolate with each other
+	and counts the problems
+
+	:param: layers: the compatible layers (masters), each as list of node lists
+	:closed: closed flag per path
+	:groups: interpolation group per layer (see engine.layerNameGroup); None: all layers are masters
+	:return: dict with the counts of "flips", "collapses" and "intersections", the "severity"
+	and "interpolable" (False if the layers are not compatible, nothing is checked then)
+	'''
+	result = {"flips": 0, "collapses": 0, "intersections": 0, "severity": 0, "interpolable": True}
+	if len(layers) < 2:
+		return result
+	if not layersInterpolable(layers):
+		result["interpolable"] = False
+		return result
+
+	# properties of the masters that instances are compared against
+	masterSigns = []
+	masterShort = []
+	masterIntersects = []
+	for p in range(len(layers[0])):
+		masterSigns.append([pathOrientation(paths[p]) > 0 for paths in layers])
+		shortSegments = set()
+		for paths in layers:
+			shortSegments.update([i for i, length in enumerate(segmentLengths(paths[p])) if length < collapseThreshold])
+		masterShort.append(shortSegments)
+		masterIntersects.append(closed[p] and any([selfIntersects(paths[p]) for paths in layers]))
+
+	flatLayers = [flatCoordinates(paths) for paths in layers]
+	if groups is None:
+		groups = [engine.MASTER_GROUP] * len(layers)
+	for a, b in engine.interpolationPairs(groups):
+		for coords in instanceCoordinates(flatLayers[a], flatLayers[b], samples):
+			for p, nodes in enumerate(splitPaths(coords, layers[0])):
+				if not closed[p]:
+					continue
+				# only report flips where both masters agree on the direction
+				sign = pathOrientation(nodes) > 0
+				if masterSigns[p][a] == masterSigns[p][b] and sign != masterSigns[p][a]:
+					result["flips"] += 1
+				for i, length in enumerate(segmentLengths(nodes)):
+					if length < collapseThreshold and i not in masterShort[p]:
+						result["collapses"] += 1
+				if not masterIntersects[p] and selfIntersects(nodes):
+					result["intersections"] += 1
+
+	result["severity"] = result["flips"] * SEVERITY_FLIP + result["intersections"] * SEVERITY_INTERSECTION + result["collapses"] * SEVERITY_COLLAPSE
+	return result
+
+def rankGlyphs(glyphs, samples=DEFAULT_SAMPLES, collapseThreshold=COLLAPSE_THRESHOLD):
+	'''
+	Validates many glyphs and returns (glyph name, result) for those with problems, most severe first
+
+	:param: glyphs: iterable of (glyph name, layers, closed flags) or (glyph name, layers, closed flags, groups)
+	'''
+	ranking = []
+	for glyph in glyphs:
+		name, layers, closed = glyph[:3]
+		result = validateGlyph(layers, closed, samples, collapseThreshold, glyph[3] if len(glyph) > 3 else None)
+		if result["severity"]:
+			ranking.append((name, result))
+	ranking.sort(key=lambda entry: -entry[1]["severity"])
+	return ranking
+
+def storeGlyphs(store):
+	''' Yields (glyph name, layers, closed flags) of the glyphs of a geometry store '''
+	for g in range(store.glyphCount()):
+		layers = store.glyphGeometry(g)
+		closed = [p.closed for p in layers[0]] if layers else []
+		yield (store.glyphNames[g], [[list(p) for p in paths] for paths in layers], closed)
+
+def sourceGlyphs(sourcePath):
+	'''
+	Yields the glyphs of a .glyphspackage or a geometry store in the form expected by rankGlyphs,
+	with the interpolation groups of the layers; a store only has layer names to go by
+	'''
+	from . import glyphsfile, store
+	if os.path.isdir(sourcePath):
+		directory = glyphsfile.glyphsDirectory(sourcePath)
+		for fileName in sorted(os.listdir(directory)):
+			if fileName.endswith(".glyph"):
+				glyphName, layers = glyphsfile.readGlyphLayersFile(os.path.join(directory, fileName))
+				closed = [c for (c, nodes) in layers[0][2]] if layers else []
+				yield (glyphName, [[nodes for (c, nodes) in paths] for (layerId, group, paths) in layers], closed, [group for (layerId, group, paths) in layers])
+	else:
+		with store.GeometryStore(sourcePath) as geometryStore:
+			for g in range(geometryStore.glyphCount()):
+				layerIndices = geometryStore.glyphLayers(g)
+				layers = [geometryStore.layerPaths(l) for l in layerIndices]
+				closed = [p.closed for p in layers[0]] if layers else []
+				groups = [engine.layerNameGroup(geometryStore.layerNames[l]) for l in layerIndices]
+				yield (geometryStore.glyphNames[g], [[list(p) for p in paths] for paths in layers], closed, groups)
+
+def main(arguments=None):
+	import argparse
+	parser = argparse.ArgumentParser(description="Rank the glyphs of a source by the problems of their interpolated instances")
+	parser.add_argument("source", help=".glyphspackage directory or geometry store")
+	parser.add_argument("--samples", type=int, default=DEFAULT_SAMPLES, help="instances between each pair of interpolating layers")
+	parser.add_argument("--collapse-threshold", type=float, default=COLLAPSE_THRESHOLD)
+	args = parser.parse_args(arguments)
+
+	ranking = rankGlyphs(sourceGlyphs(args.source), args.samples, args.collapse_threshold)
+	for name, result in ranking:
+		print("%s: severity %i, %i direction flips, %i self-intersections, %i collapsed segments" % (name, result["severity"], result["flips"], result["intersections"], result["collapses"]))
+	print("%i glyphs with problems in their interpolated instances" % len(ranking))
+	# a non-zero exit status fails CI runs
+	return 1 if ranking else 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,129 @@
+# encoding: utf-8
+
+###########################################################################################################
+#
+#	Prefetching reader
+#
+#	Parses glyph files on a few threads ahead of the geometry work. Parsed glyphs are handed over
+#	through a bounded queue, so reading overlaps with checking while at most queueSize parsed
+#	glyphs are held in memory. The counters show which side is the bottleneck: if the consumer
+#	keeps waiting for an empty queue, reading is too slow; if readers wait for a full queue,
+#	the checks are.
+#
+###########################################################################################################
+
+from __future__ import division, print_function, unicode_literals
+import threading, time
+from . import glyphsfile
+
+try:
+	import queue
+except ImportError:
+	import Queue as queue
+
+DEFAULT_READERS = 4
+DEFAULT_QUEUE_SIZE = 64
+
+class ReaderStatistics(object):
+	''' Throughput of the reading and the processing side of a PrefetchReader '''
+
+	def __init__(self):
+		self.start = time.time()
+		self.read = 0
+		self.processed = 0
+		self.readersWaiting = 0 # puts that found the queue full
+		self.consumerWaiting = 0 # gets that found the queue empty
+		self.readEnd = None
+		self.processedEnd = None
+
+	def rates(self):
+		''' Returns glyphs/s read and processed, each over the time until that side finished (or now) '''
+		now = time.time()
+		readSeconds = (self.readEnd or now) - self.start
+		processedSeconds = (self.processedEnd or now) - self.start
+		return (self.read / readSeconds if readSeconds else 0.0, self.processed / processedSeconds if processedSeconds else 0.0)
+
+	def summary(self):
+		readRate, processedRate = self.rates()
+		return "Read %i glyphs (%.0f/s), processed %i (%.0f/s); readers waited %i times for a full queue, processing waited %i times for an empty one" % (
+			self.read, readRate, self.processed, processedRate, self.readersWaiting, self.consumerWaiting)
+
+class PrefetchReader(object):
+	'''
+	Iterates over (file path, parsed glyph, error) for the given files, in the order they finish reading
+
+	:param: filePaths: glyph files to read
+	:read: function that parses one file, glyphsfile.readGlyphFile by default
+	:readers: number of reading threads
+	:queueSize: maximum number of parsed glyphs waiting to be processed
+	'''
+
+	def __init__(self, filePaths, read=glyphsfile.readGlyphFile, readers=DEFAULT_READERS, queueSize=DEFAULT_QUEUE_SIZE):
+		self.filePaths = iter(filePaths)
+		self.read = read
+		self.readers = max(1, readers)
+		self.queue = queue.Queue(max(1, queueSize))
+		self.lock = threading.Lock()
+		self.statistics = ReaderStatistics()
+		self.stopped = False
+
+	def nextPath(self):
+		with self.lock:
+			if self.stopped:
+				return None
+			return next(self.filePaths, None)
+
+	def put(self, item):
+		try:
+			self.queue.put(item, False)
+		except queue.Full:
+			with self.lock:
+				self.statistics.readersWaiting += 1
+			self.queue.put(item)
+
+	def readLoop(self):
+		try:
+			while True:
+				filePath = self.nextPath()
+				if filePath is None:
+					break
+				try:
+					item = (filePath, self.read(filePath), None)
+				except Exception as e:
+					# whatever is wrong with one file, it is reported with the file and the others are read
+					item = (filePath, None, e)
+				with self.lock:
+					self.statistics.read += 1
+				self.put(item)
+		finally:
+			# one end marker per reader, even if the reader fails, so that the consumer does not wait forever
+			self.put(None)
+
+	def __iter__(self):
+		threads = [threading.Thread(target=self.readLoop) for i in range(self.readers)]
+		for thread in threads:
+			thread.daemon = True
+			thread.start()
+		finished = 0
+		try:
+			while finished < len(threads):
+				try:
+					item = self.queue.get(False)
+				except queue.Empty:
+					self.statistics.consumerWaiting += 1
+					item = self.queue.get()
+				if item is None:
+					finished += 1
+					if finished == len(threads):
+						self.statistics.readEnd = time.time()
+					continue
+				yield item
+				self.statistics.processed += 1
+			self.statistics.processedEnd = time.time()
+		finally:
+			# the consumer stopped early: let the readers run out and drain what they still put
+			with self.lock:
+				self.stopped = True
+			while finished < len(threads):
+				if self.queue.get() is None:
+					finished += 1
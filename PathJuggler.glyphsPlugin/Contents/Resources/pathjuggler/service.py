@@ -0,0 +1,335 @@
+# encoding: utf-8
+
+###########################################################################################################
+#
+#	Local check service
+#
+#	A long-running process that keeps parsed .glyphspackage sources and everything derived
+#	from them (overlap coordinates, verdicts, plans, compatibility matrices) in memory, so that
+#	build scripts, editors and the plugin can share one warm process instead of starting cold.
+#
+#	Protocol: one JSON object per line, in the style of JSON-RPC
+#	  request   {"id": 1, "method": "checkGlyph", "params": {"font": "Font.glyphspackage", "glyph": "A"}}
+#	  response  {"id": 1, "result": {...}}  or  {"id": 1, "error": "message"}
+#
+#	checkGlyph, planCorrections and compatibilityMatrix take an optional "settings" param that
+#	overrides the settings of the service for that request, e.g. {"tolerance": 30, "ignoreOverlap": false};
+#	results are cached per settings.
+#
+#	Methods: checkGlyph, planCorrections, compatibilityMatrix, statistics, forget, shutdown
+#
+#	Usage: python -m pathjuggler.service --socket /tmp/pathjuggler.sock
+#	       python -m pathjuggler.service --port 8765 (localhost only)
+#
+###########################################################################################################
+
+from __future__ import division, print_function, unicode_literals
+import json, os, socket, sys, threading, time
+from . import engine, glyphsfile
+
+try:
+	import socketserver
+except ImportError:
+	import SocketServer as socketserver
+
+# seconds after its last change from which the file list of a glyphs directory is trusted to be complete
+INDEX_SETTLE_SECONDS = 2.0
+
+class GlyphEntry(object):
+	''' Parsed active layers of one glyph file and the results derived from them '''
+
+	def __init__(self, stat, layerIds, layers, closed):
+		self.stat = stat
+		self.layerIds = layerIds
+		self.layers = layers
+		self.closed = closed
+		self.derived = {}
+
+def directoryStat(path):
+	stat = os.stat(path)
+	return (stat.st_mtime, stat.st_size)
+
+class PackageCache(object):
+	''' Glyphs of one .glyphspackage, parsed on first use and re-parsed when their file changes '''
+
+	def __init__(self, packagePath):
+		self.glyphsPath = glyphsfile.glyphsDirectory(packagePath)
+		self.fileNames = {} # glyph name -> file name
+		self.glyphs = {} # glyph name -> GlyphEntry
+		self.indexStat = None # stat of the glyphs directory when it was last indexed
+		self.statistics = {"parsed": 0, "hits": 0, "misses": 0}
+		self.triage = engine.newTriageStatistics()
+
+	def indexFiles(self):
+		''' Maps glyph names to file names; the glyph name is read from the start of each file '''
+		self.fileNames = {}
+		stat = directoryStat(self.glyphsPath)
+		# a directory changed just now can change again without a new mtime: index it again next time
+		self.indexStat = stat if time.time() - stat[0] > INDEX_SETTLE_SECONDS else None
+		for entry in os.scandir(self.glyphsPath):
+			if entry.name.endswith(".glyph"):
+				with open(entry.path, "rb") as f:
+					head = f.read(512).decode("utf-8", "replace")
+				if "glyphname = " in head:
+					name = head.split("glyphname = ", 1)[1].split(";", 1)[0].strip().strip('"')
+					self.fileNames[name] = entry.name
+
+	def glyph(self, glyphName):
+		''' Returns the GlyphEntry of a glyph, reading its file only if it changed since the last call '''
+		if glyphName not in self.fileNames:
+			# unknown names are looked up again only once files were added, removed or renamed
+			if self.indexStat != directoryStat(self.glyphsPath):
+				self.indexFiles()
+			if glyphName not in self.fileNames:
+				raise KeyError("No glyph named %s" % glyphName)
+		filePath = os.path.join(self.glyphsPath, self.fileNames[glyphName])
+		stat = os.stat(filePath)
+		stat = (stat.st_mtime, stat.st_size)
+		entry = self.glyphs.get(glyphName)
+		if entry is None or entry.stat != stat:
+			name, layers = glyphsfile.readGlyphFile(filePath)
+			if name != glyphName:
+				# the file was renamed or replaced, look it up again next time
+				self.fileNames.pop(glyphName, None)
+				self.indexStat = None
+				raise KeyError("No glyph named %s" % glyphName)
+			layerIds = [layerId for (layerId, paths) in layers]
+			nodeLists = [[nodes for (closed, nodes) in paths] for (layerId, paths) in layers]
+			closed = [c for (c, nodes) in layers[0][1]] if layers else []
+			entry = GlyphEntry(stat, layerIds, nodeLists, closed)
+			self.glyphs[glyphName] = entry
+			self.statistics["parsed"] += 1
+		return entry
+
+def settingsKey(settings):
+	return (settings.TOLERANCE, settings.HORIZ_TOLERANCE, settings.MAX_MISMATCHES, settings.IGNORE_OVERLAP)
+
+class CheckService(object):
+	''' The requests of the service on top of the package caches; settings may be overridden per request '''
+
+	def __init__(self, settings=None):
+		self.settings = settings or engine.Settings()
+		self.packages = {}
+
+	SETTINGS = {"tolerance": "TOLERANCE", "horizTolerance": "HORIZ_TOLERANCE", "maxMismatches": "MAX_MISMATCHES", "ignoreOverlap": "IGNORE_OVERLAP"}
+
+	def requestSettings(self, overrides=None):
+		'''
+		The settings of the service with the overrides of a request
+
+		:param overrides: None or a dict with keys of SETTINGS
+		'''
+		if not overrides:
+			return self.settings
+		if not isinstance(overrides, dict):
+			raise TypeError("settings must be an object")
+		unknown = sorted(set(overrides) - set(self.SETTINGS))
+		if unknown:
+			raise ValueError("Unknown settings %s" % ", ".join(unknown))
+		values = dict([(name, overrides.get(name, getattr(self.settings, attribute))) for name, attribute in self.SETTINGS.items()])
+		return engine.Settings(values["tolerance"], values["horizTolerance"], values["maxMismatches"], values["ignoreOverlap"])
+
+	def package(self, fontPath):
+		fontPath = os.path.abspath(fontPath)
+		if fontPath not in self.packages:
+			if not os.path.isdir(glyphsfile.glyphsDirectory(fontPath)):
+				raise ValueError("%s is not a .glyphspackage" % fontPath)
+			self.packages[fontPath] = PackageCache(fontPath)
+		return self.packages[fontPath]
+
+	def derived(self, package, entry, key, compute):
+		''' Returns a cached result of the entry, computing it on first use '''
+		if key in entry.derived:
+			package.statistics["hits"] += 1
+		else:
+			package.statistics["misses"] += 1
+			entry.derived[key] = compute()
+		return entry.derived[key]
+
+	def overlaps(self, package, entry, settings):
+		if not settings.IGNORE_OVERLAP:
+			return [None] * len(entry.layers)
+		return self.derived(package, entry, "overlaps", lambda: [engine.overlapCoords(paths, entry.closed) if len(paths) == len(entry.closed) else None for paths in entry.layers])
+
+	def checkGlyph(self, font, glyph, settings=None):
+		''' Directional and path ordering verdicts of all active layers '''
+		settings = self.requestSettings(settings)
+		package = self.package(font)
+		entry = package.glyph(glyph)
+		def compute():
+			overlaps = self.overlaps(package, entry, settings)
+			return {
+				"directional": engine.glyphDirectionallyCompatible(entry.layers, settings, overlaps, package.triage),
+				"ordering": engine.glyphPathOrderingCompatible(entry.layers, settings, package.triage),
+			}
+		return self.derived(package, entry, ("verdicts", settingsKey(settings)), compute)
+
+	def planCorrections(self, font, glyphs, settings=None):
+		'''
+		Plans starting points and path ordering for the given glyphs (the selection),
+		with the first active layer as reference. Path direction needs the outline
+		operations of Glyphs and is left to the plugin.
+
+		:return: {glyph name: per layer a plan of engine.planGlyph with its "layer" id, or {"error": ...}}
+		'''
+		settings = self.requestSettings(settings)
+		package = self.package(font)
+		plans = {}
+		for glyph in glyphs:
+			try:
+				entry = package.glyph(glyph)
+			except KeyError as e:
+				plans[glyph] = {"error": str(e)}
+				continue
+			plans[glyph] = self.derived(package, entry, ("plan", settingsKey(settings)), lambda: self.computePlan(entry, settings))
+		return plans
+
+	def computePlan(self, entry, settings):
+		plan = engine.planGlyph(entry.layers, entry.closed, settings)
+		for layerId, layerPlan in zip(entry.layerIds, plan):
+			layerPlan["layer"] = layerId
+		return plan
+
+	def compatibilityMatrix(self, font, glyph, settings=None):
+		'''
+		Pairwise verdicts of the active layers of a glyph
+
+		:return: {"layers": layer ids, "directional": matrix, "ordering": matrix}
+		'''
+		settings = self.requestSettings(settings)
+		package = self.package(font)
+		entry = package.glyph(glyph)
+		def compute():
+			overlaps = self.overlaps(package, entry, settings)
+			count = len(entry.layers)
+			directional = [[True] * count for i in range(count)]
+			ordering = [[True] * count for i in range(count)]
+			for i in range(count):
+				for j in range(count):
+					if i != j:
+						directional[i][j] = engine.allPathsDirectionallyCompatible(entry.layers[i], entry.layers[j], settings, overlaps[i], overlaps[j])
+						ordering[i][j] = engine.checkPathOrderingLists(entry.layers[i], entry.layers[j], settings)
+			return {"layers": entry.layerIds, "directional": directional, "ordering": ordering}
+		return self.derived(package, entry, ("matrix", settingsKey(settings)), compute)
+
+	def statistics(self):
+		return dict([(path, dict(package.statistics, glyphs=len(package.glyphs), triage=package.triage)) for path, package in self.packages.items()])
+
+	def forget(self, font=None):
+		''' Drops the cache of one font, or of all fonts '''
+		if font is None:
+			self.packages = {}
+		else:
+			self.packages.pop(os.path.abspath(font), None)
+		return True
+
+	METHODS = ("checkGlyph", "planCorrections", "compatibilityMatrix", "statistics", "forget")
+
+	def handle(self, request):
+		''' Answers one decoded request; errors, including those of the engine, become error responses '''
+		if not isinstance(request, dict):
+			return {"id": None, "error": "Request must be an object"}
+		method = request.get("method")
+		if method not in self.METHODS:
+			return {"id": request.get("id"), "error": "Unknown method %s" % method}
+		params = request.get("params", {})
+		if not isinstance(params, dict):
+			return {"id": request.get("id"), "error": "params must be an object"}
+		try:
+			result = getattr(self, method)(**params)
+		except Exception as e:
+			return {"id": request.get("id"), "error": "%s: %s" % (e.__class__.__name__, e)}
+		return {"id": request.get("id"), "result": result}
+
+class _RequestHandler(socketserver.StreamRequestHandler):
+
+	def handle(self):
+		for line in self.rfile:
+			if not line.strip():
+				continue
+			try:
+				request = json.loads(line.decode("utf-8"))
+			except ValueError:
+				response = {"id": None, "error": "Invalid JSON"}
+			else:
+				if isinstance(request, dict) and request.get("method") == "shutdown":
+					self.respond({"id": request.get("id"), "result": True})
+					threading.Thread(target=self.server.shutdown).start()
+					return
+				# the caches are not thread-safe; requests are answered one at a time
+				with self.server.lock:
+					response = self.server.service.handle(request)
+			self.respond(response)
+
+	def respond(self, response):
+		self.wfile.write((json.dumps(response, ensure_ascii=False) + "\n").encode("utf-8"))
+		self.wfile.flush()
+
+def makeServer(service, socketPath=None, port=None):
+	''' Creates a server on a Unix socket, or on localhost if no socket path is given '''
+	if socketPath:
+		if os.path.exists(socketPath):
+			os.remove(socketPath)
+		server = socketserver.ThreadingUnixStreamServer(socketPath, _RequestHandler)
+	else:
+		server = socketserver.ThreadingTCPServer(("127.0.0.1", port or 0), _RequestHandler)
+	server.daemon_threads = True
+	server.service = service
+	server.lock = threading.Lock()
+	return server
+
+class Client(object):
+	''' Connection to a running service, e.g. Client("/tmp/pathjuggler.sock").call("checkGlyph", font=..., glyph="A") '''
+
+	def __init__(self, address):
+		if isinstance(address, tuple):
+			self.socket = socket.create_connection(address)
+		else:
+			self.socket = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+			self.socket.connect(address)
+		self.file = self.socket.makefile("rwb")
+		self.nextId = 1
+
+	def call(self, method, **params):
+		request = {"id": self.nextId, "method": method, "params": params}
+		self.nextId += 1
+		self.file.write((json.dumps(request) + "\n").encode("utf-8"))
+		self.file.flush()
+		line = self.file.readline()
+		if not line:
+			raise IOError("Connection closed by the service")
+		response = json.loads(line.decode("utf-8"))
+		if "error" in response:
+			raise RuntimeError(response["error"])
+		return response["result"]
+
+	def close(self):
+		self.file.close()
+		self.socket.close()
+
+def main(arguments=None):
+	import argparse
+	parser = argparse.ArgumentParser(description="Serve Path Juggler checks from a warm process")
+	parser.add_argument("--socket", help="Unix socket path")
+	parser.add_argument("--port", type=int, help="localhost port, if no socket is given")
+	parser.add_argument("--tolerance", type=float, default=engine.DEFAULT_TOLERANCE)
+	parser.add_argument("--horiz-tolerance", type=float, default=engine.DEFAULT_HORIZ_TOLERANCE)
+	parser.add_argument("--max-mismatches", type=int, default=engine.DEFAULT_MAX_MISMATCHES)
+	args = parser.parse_args(arguments)
+
+	service = CheckService(engine.Settings(args.tolerance, args.horiz_tolerance, args.max_mismatches))
+	server = makeServer(service, args.socket, args.port)
+	print("Path Juggler service listening on %s" % (args.socket or "127.0.0.1:%i" % server.server_address[1]))
+	sys.stdout.flush()
+	try:
+		server.serve_forever()
+	except KeyboardInterrupt:
+		pass
+	finally:
+		server.server_close()
+		if args.socket and os.path.exists(args.socket):
+			os.remove(args.socket)
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,281 @@
+# encoding: utf-8
+
+###########################################################################################################
+#
+#	Sharded runs over a geometry store
+#
+#	The glyphs of a store (see store.py) are split into deterministic shards, by a hash of the
+#	glyph name or by the cost predicted by costmodel.py. Every shard runs on its own, in another process or on another
+#	machine with a copy of the store, and writes a partial report with verdicts and correction plans.
+#	The merge step checks that the partial reports belong together, combines them and can apply
+#	all plans to the store in one pass. The reports carry the timing of every glyph, which the
+#	merge step can use to fit the cost model for the next run.
+#
+#	Usage: python -m pathjuggler.shard run Font.pjgs --shard 0 --shards 4 --out part0.json
+#	       python -m pathjuggler.shard merge part*.json --out report.json --apply Font.pjgs --store-out Fixed.pjgs
+#	       python -m pathjuggler.shard local Font.pjgs --shards 4 --out report.json (all shards as local processes)
+#	       python -m pathjuggler.shard local Font.pjgs --shards 4 --out report.json --by-cost --cost-model costs.json
+#
+###########################################################################################################
+
+from __future__ import division, print_function, unicode_literals
+import hashlib, io, json, os, subprocess, sys, zlib
+from . import costmodel, engine, store
+
+REPORT_VERSION = 2
+
+def hashShard(glyphName, shardCount):
+	''' Shard of a glyph by a hash of its name, the same in every process (unlike hash()) '''
+	return zlib.crc32(glyphName.encode("utf-8")) % shardCount
+
+def costShards(costs, shardCount):
+	'''
+	Assigns glyphs to shards, the most expensive first, each to the shard with the least cost so far
+
+	:param: costs: {glyph name: cost}
+	:return: {glyph name: shard}
+	'''
+	return costmodel.assignWorkers(costs, shardCount)
+
+def storeDigest(filePath):
+	''' Identifies the store a report was made from, so that reports of different fonts are not merged '''
+	digest = hashlib.sha1()
+	with open(filePath, "rb") as f:
+		for block in iter(lambda: f.read(1 << 20), b""):
+			digest.update(block)
+	return digest.hexdigest()
+
+def settingsKey(settings):
+	return [settings.TOLERANCE, settings.HORIZ_TOLERANCE, settings.MAX_MISMATCHES, settings.IGNORE_OVERLAP]
+
+def shardAssignment(geometryStore, shardCount, byCost=False, costModel=None):
+	'''
+	Assigns every glyph of the store to a shard
+
+	:return: ({glyph name: shard}, glyph names in the order to process them)
+	'''
+	names = [geometryStore.glyphNames[g] for g in range(geometryStore.glyphCount())]
+	if byCost:
+		model = costModel or costmodel.CostModel()
+		costs = dict([(name, model.predict(costmodel.glyphFeatures(geometryStore.glyphGeometry(g)))) for g, name in enumerate(names)])
+		return (costShards(costs, shardCount), costmodel.longestFirst(costs))
+	return (dict([(name, hashShard(name, shardCount)) for name in names]), names)
+
+def assignmentDigest(shards):
+	''' Identifies an assignment, so that shards that split the glyphs differently are not merged '''
+	return hashlib.sha1(json.dumps(sorted(shards.items()), ensure_ascii=False).encode("utf-8")).hexdigest()
+
+def shardGlyphs(geometryStore, shardIndex, shardCount, byCost=False, costModel=None):
+	''' Indices of the glyphs of the store that belong to a shard, the most expensive first if byCost '''
+	shards, order = shardAssignment(geometryStore, shardCount, byCost, costModel)
+	return [geometryStore.glyphIndex(name) for name in order if shards[name] == shardIndex]
+
+def checkAndPlan(layers, closed, settings):
+	entry = engine.checkGlyph(layers, closed, settings) if layers else {"directional": True, "ordering": True}
+	entry["plan"] = engine.planGlyph(layers, closed, settings)
+	return entry
+
+def runShard(storePath, shardIndex, shardCount, settings, reportPath=None, byCost=False, costModel=None):
+	'''
+	Checks and plans the glyphs of one shard
+
+	:return: the partial report, also written to reportPath if given
+	'''
+	glyphs = {}
+	timings = {}
+	with store.GeometryStore(storePath) as geometryStore:
+		shards, order = shardAssignment(geometryStore, shardCount, byCost, costModel)
+		glyphCount = geometryStore.glyphCount()
+		for g in [geometryStore.glyphIndex(name) for name in order if shards[name] == shardIndex]:
+			layers = [[list(p) for p in paths] for paths in geometryStore.glyphGeometry(g)]
+			closed = [p.closed for p in geometryStore.layerPaths(geometryStore.glyphLayers(g)[0])] if layers else []
+			name = geometryStore.glyphNames[g]
+			glyphs[name], seconds = costmodel.timed(checkAndPlan, layers, closed, settings)
+			timings[name] = [costmodel.glyphFeatures(layers), seconds]
+	report = {
+		"version": REPORT_VERSION,
+		"store": storeDigest(storePath),
+		"settings": settingsKey(settings),
+		"shard": shardIndex,
+		"shards": shardCount,
+		"glyphCount": glyphCount,
+		"assignment": assignmentDigest(shards),
+		"glyphs": glyphs,
+		"timings": timings,
+	}
+	if reportPath:
+		writeReport(reportPath, report)
+	return report
+
+def writeReport(reportPath, report):
+	tempPath = reportPath + ".tmp"
+	with io.open(tempPath, "w", encoding="utf-8") as f:
+		f.write(json.dumps(report, sort_keys=True, ensure_ascii=False))
+	os.rename(tempPath, reportPath)
+
+def readReport(reportPath):
+	with io.open(reportPath, encoding="utf-8") as f:
+		return json.load(f)
+
+def mergeReports(reports):
+	'''
+	Combines the partial reports of all shards of a run
+
+	:raise: ValueError if the reports come from different stores, settings, shard counts or
+	assignments of glyphs to shards, if a shard is missing or given twice, if a glyph appears
+	in two shards or if a glyph of the store is in none
+	'''
+	if not reports:
+		raise ValueError("No reports to merge")
+	first = reports[0]
+	shards = set()
+	glyphs = {}
+	timings = {}
+	for report in reports:
+		if report.get("version") != REPORT_VERSION:
+			raise ValueError("Report of shard %s has an unknown version" % report.get("shard"))
+		for key in ("store", "settings", "shards", "glyphCount"):
+			if report[key] != first[key]:
+				raise ValueError("Report of shard %i has a different %s" % (report["shard"], key))
+		if report["assignment"] != first["assignment"]:
+			raise ValueError("Report of shard %i assigns the glyphs to shards differently (were the costs predicted with different cost models?)" % report["shard"])
+		if report["shard"] in shards:
+			raise ValueError("Shard %i is given twice" % report["shard"])
+		shards.add(report["shard"])
+		for name, entry in report["glyphs"].items():
+			if name in glyphs:
+				raise ValueError("Glyph %s appears in more than one shard" % name)
+			glyphs[name] = entry
+		timings.update(report.get("timings", {}))
+	missing = sorted(set(range(first["shards"])) - shards)
+	if missing:
+		raise ValueError("Reports of shards %s are missing" % ", ".join([str(s) for s in missing]))
+	if len(glyphs) != first["glyphCount"]:
+		raise ValueError("%i glyphs of the store are in no shard" % (first["glyphCount"] - len(glyphs)))
+	return {"version": REPORT_VERSION, "store": first["store"], "settings": first["settings"], "shards": first["shards"], "glyphCount": first["glyphCount"],
+		"assignment": first["assignment"], "glyphs": glyphs, "timings": timings}
+
+def applyPlans(storePath, report, outPath):
+	'''
+	Writes a copy of the store with the plans of a merged report applied, in one pass over the glyphs
+
+	:return: number of glyphs that changed
+	'''
+	if storeDigest(storePath) != report["store"]:
+		raise ValueError("The report was not made from %s" % storePath)
+	changed = [0]
+	with store.GeometryStore(storePath) as geometryStore:
+		missing = [name for name in geometryStore.glyphNames if name not in report["glyphs"]]
+		if missing:
+			raise ValueError("The report has no plans for %s" % ", ".join(missing))
+		def glyphs():
+			for g in range(geometryStore.glyphCount()):
+				name = geometryStore.glyphNames[g]
+				layerIndices = geometryStore.glyphLayers(g)
+				layers = [[list(p) for p in geometryStore.layerPaths(l)] for l in layerIndices]
+				closed = [[p.closed for p in geometryStore.layerPaths(l)] for l in layerIndices]
+				entry = report["glyphs"].get(name)
+				if entry is not None and layers:
+					newLayers = engine.applyGlyphPlan(layers, entry["plan"])
+					if newLayers != layers:
+						changed[0] += 1
+					# paths keep their closed flag when they are reordered
+					closed = [[c[j] for j in layerPlan["ordering"]] if layerPlan["ordering"] is not None else c for c, layerPlan in zip(closed, entry["plan"])]
+					layers = newLayers
+				yield (name, [(geometryStore.layerNames[l], list(zip(c, paths))) for l, c, paths in zip(layerIndices, closed, layers)])
+		store.writeStore(outPath, glyphs())
+	return changed[0]
+
+def learnTimings(modelPath, report):
+	''' Fits the cost model in modelPath to the timings of a report and saves it '''
+	model = costmodel.CostModel(modelPath)
+	for features, seconds in report.get("timings", {}).values():
+		model.record(features, seconds)
+	fitted = model.refit()
+	model.save()
+	return fitted
+
+def runLocal(storePath, shardCount, reportPath, settings, byCost=False, modelPath=None):
+	''' Runs every shard as a separate local process and merges their reports '''
+	# the shards run in the directory of the package, so paths have to be absolute
+	storePath = os.path.abspath(storePath)
+	processes = []
+	partPaths = []
+	for shard in range(shardCount):
+		partPath = "%s.shard%i" % (os.path.abspath(reportPath), shard)
+		partPaths.append(partPath)
+		command = [sys.executable, "-m", "pathjuggler.shard", "run", storePath, "--shard", str(shard), "--shards", str(shardCount), "--out", partPath,
+			"--tolerance", str(settings.TOLERANCE), "--horiz-tolerance", str(settings.HORIZ_TOLERANCE), "--max-mismatches", str(settings.MAX_MISMATCHES)]
+		if byCost:
+			command.append("--by-cost")
+			if modelPath:
+				command.extend(["--cost-model", os.path.abspath(modelPath)])
+		processes.append(subprocess.Popen(command, cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))))
+	failed = [shard for shard, process in enumerate(processes) if process.wait() != 0]
+	if failed:
+		raise RuntimeError("Shards %s failed" % ", ".join([str(s) for s in failed]))
+	report = mergeReports([readReport(path) for path in partPaths])
+	writeReport(reportPath, report)
+	for path in partPaths:
+		os.remove(path)
+	return report
+
+def summary(report):
+	failing = sorted([name for name, entry in report["glyphs"].items() if not entry["directional"] or not entry["ordering"]])
+	work = sum([seconds for features, seconds in report.get("timings", {}).values()])
+	return "%i glyphs, %.2f s of work, %i with problems%s" % (len(report["glyphs"]), work, len(failing), (": " + ", ".join(failing)) if failing else "")
+
+def main(arguments=None):
+	import argparse
+	parser = argparse.ArgumentParser(description="Sharded Path Juggler runs over a geometry store")
+	commands = parser.add_subparsers(dest="command")
+	run = commands.add_parser("run", help="check and plan one shard")
+	run.add_argument("store")
+	run.add_argument("--shard", type=int, required=True)
+	run.add_argument("--shards", type=int, required=True)
+	local = commands.add_parser("local", help="run all shards as local processes and merge them")
+	local.add_argument("store")
+	local.add_argument("--shards", type=int, default=os.cpu_count() if hasattr(os, "cpu_count") else 2)
+	for command in (run, local):
+		command.add_argument("--out", required=True)
+		command.add_argument("--by-cost", action="store_true", help="balance shards by estimated cost instead of name hash")
+		command.add_argument("--tolerance", type=float, default=engine.DEFAULT_TOLERANCE)
+		command.add_argument("--horiz-tolerance", type=float, default=engine.DEFAULT_HORIZ_TOLERANCE)
+		command.add_argument("--max-mismatches", type=int, default=engine.DEFAULT_MAX_MISMATCHES)
+	merge = commands.add_parser("merge", help="merge partial reports")
+	merge.add_argument("reports", nargs="+")
+	merge.add_argument("--out", required=True)
+	for command in (local, merge):
+		command.add_argument("--apply", metavar="STORE", help="apply the merged plans to this store")
+		command.add_argument("--store-out", help="where to write the corrected store")
+	for command in (run, local, merge):
+		command.add_argument("--cost-model", help="JSON file of costmodel.py; predicts costs for --by-cost and is fitted to the timings of merged reports")
+	args = parser.parse_args(arguments)
+
+	if args.command in ("run", "local"):
+		settings = engine.Settings(args.tolerance, args.horiz_tolerance, args.max_mismatches)
+	try:
+		if args.command == "run":
+			runShard(args.store, args.shard, args.shards, settings, args.out, args.by_cost, costmodel.CostModel(args.cost_model))
+			return 0
+		if args.command == "local":
+			report = runLocal(args.store, args.shards, args.out, settings, args.by_cost, args.cost_model)
+		elif args.command == "merge":
+			report = mergeReports([readReport(path) for path in args.reports])
+			writeReport(args.out, report)
+		else:
+			parser.print_help()
+			return 2
+		print(summary(report))
+		if args.cost_model and learnTimings(args.cost_model, report):
+			print("Fitted the cost model to %i timings" % len(report["timings"]))
+		if args.apply:
+			changed = applyPlans(args.apply, report, args.store_out or args.apply)
+			print("Applied the plans of %i glyphs" % changed)
+	except (ValueError, RuntimeError) as e:
+		print("⚠️ %s" % e)
+		return 1
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -0,0 +1,274 @@
+# encoding: utf-8
+
+###########################################################################################################
+#
+#	Compact binary geometry store
+#
+#	Flat node coordinate and type arrays plus path, layer and glyph offset tables of the
+#	active layers of a font. The file is memory-mapped read-only, so worker processes that
+#	open the same store share its pages instead of each parsing the font.
+#
+#	Layout (little endian, every section starts at a multiple of 8 bytes):
+#	  header              magic, version, glyph/layer/path/node counts, string table size
+#	  coords              float64 x, y per node
+#	  pathNodeOffsets     uint32, pathCount+1
+#	  layerPathOffsets    uint32, layerCount+1
+#	  glyphLayerOffsets   uint32, glyphCount+1
+#	  types               uint8 per node
+#	  pathClosed          uint8 per path
+#	  strings             utf-8 glyph names followed by layer names, separated by newlines
+#
+###########################################################################################################
+
+from __future__ import division, print_function, unicode_literals
+import array, mmap, os, struct, sys
+from . import costmodel, engine
+
+STORE_MAGIC = b"PJGS"
+STORE_VERSION = 1
+HEADER_FORMAT = str("<4sIIIIII")
+HEADER_SIZE = struct.calcsize(HEADER_FORMAT)
+
+NODE_TYPES = (engine.LINE, engine.CURVE, engine.OFFCURVE, engine.QCURVE)
+NODE_TYPE_CODES = dict([(t, i) for i, t in enumerate(NODE_TYPES)])
+
+def _padded(size):
+	return (size + 7) & ~7
+
+def _sectionSizes(glyphCount, layerCount, pathCount, nodeCount, stringBytes):
+	return [
+		nodeCount * 2 * 8, # coords
+		(pathCount + 1) * 4, # pathNodeOffsets
+		(layerCount + 1) * 4, # layerPathOffsets
+		(glyphCount + 1) * 4, # glyphLayerOffsets
+		nodeCount, # types
+		pathCount, # pathClosed
+		stringBytes, # strings
+	]
+
+def isActiveLayer(layer):
+	return layer.isMasterLayer or layer.isBracketLayer() or layer.isBraceLayer()
+
+def fontGeometry(font):
+	'''
+	Yields (glyph name, [(layer name, [(closed, nodes)])]) for the active layers of a GSFont,
+	in the form expected by writeStore
+	'''
+	for glyph in font.glyphs:
+		layers = []
+		for layer in glyph.layers:
+			if isActiveLayer(layer):
+				paths = []
+				for path in layer.paths:
+					paths.append((path.closed, [(n.position.x, n.position.y, n.type) for n in path.nodes]))
+				layers.append((layer.name or "", paths))
+		yield (glyph.name, layers)
+
+def writeStore(filePath, glyphs):
+	'''
+	Writes a geometry store
+
+	:param: filePath: destination; written to a temporary file first and then renamed,
+	so readers never see a partial store
+	:glyphs: iterable of (glyph name, [(layer name, [(closed, nodes)])]) with nodes as (x, y, type)
+	'''
+	coords = array.array(str("d"))
+	types = array.array(str("B"))
+	pathClosed = array.array(str("B"))
+	pathNodeOffsets = array.array(str("I"), [0])
+	layerPathOffsets = array.array(str("I"), [0])
+	glyphLayerOffsets = array.array(str("I"), [0])
+	glyphNames, layerNames = [], []
+
+	for glyphName, layers in glyphs:
+		glyphNames.append(glyphName)
+		for layerName, paths in layers:
+			layerNames.append(layerName)
+			for closed, nodes in paths:
+				for (x, y, type) in nodes:
+					coords.append(x)
+					coords.append(y)
+					types.append(NODE_TYPE_CODES[type])
+				pathClosed.append(1 if closed else 0)
+				pathNodeOffsets.append(len(types))
+			layerPathOffsets.append(len(pathClosed))
+		glyphLayerOffsets.append(len(layerNames))
+
+	strings = "\n".join(glyphNames + layerNames).encode("utf-8")
+	sections = [coords, pathNodeOffsets, layerPathOffsets, glyphLayerOffsets, types, pathClosed]
+	if sys.byteorder != "little":
+		for section in sections:
+			section.byteswap()
+
+	tempPath = filePath + ".tmp"
+	with open(tempPath, "wb") as f:
+		f.write(struct.pack(HEADER_FORMAT, STORE_MAGIC, STORE_VERSION, len(glyphNames), len(layerNames), len(pathClosed), len(types), len(strings)))
+		f.write(b"\0" * (_padded(HEADER_SIZE) - HEADER_SIZE))
+		for data in [s.tobytes() for s in sections] + [strings]:
+			f.write(data)
+			f.write(b"\0" * (_padded(len(data)) - len(data)))
+	os.rename(tempPath, filePath)
+
+def writeFontStore(font, filePath):
+	''' Writes the active layers of a GSFont to a geometry store '''
+	writeStore(filePath, fontGeometry(font))
+
+class PathView(object):
+	''' Read-only node sequence of one path in the store, without copying the coordinates '''
+
+	def __init__(self, store, pathIndex):
+		self.start = store.pathNodeOffsets[pathIndex]
+		self.end = store.pathNodeOffsets[pathIndex + 1]
+		self.closed = bool(store.pathClosed[pathIndex])
+		self.coords = store.coords
+		self.types = store.types
+
+	def __len__(self):
+		return self.end - self.start
+
+	def __getitem__(self, index):
+		if index < 0:
+			index += len(self)
+		if index < 0 or index >= len(self):
+			raise IndexError("node index out of range")
+		i = self.start + index
+		return (self.coords[2*i], self.coords[2*i + 1], NODE_TYPES[self.types[i]])
+
+	def __iter__(self):
+		for i in range(self.start, self.end):
+			yield (self.coords[2*i], self.coords[2*i + 1], NODE_TYPES[self.types[i]])
+
+class GeometryStore(object):
+	''' Memory-mapped, read-only access to a geometry store written by writeStore '''
+
+	def __init__(self, filePath):
+		self.file = open(filePath, "rb")
+		self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ)
+		magic, version, glyphCount, layerCount, pathCount, nodeCount, stringBytes = struct.unpack_from(HEADER_FORMAT, self.map, 0)
+		if magic != STORE_MAGIC or version != STORE_VERSION:
+			self.close()
+			raise ValueError("%s is not a Path Juggler geometry store (version %i)" % (filePath, STORE_VERSION))
+		if sys.byteorder != "little":
+			self.close()
+			raise ValueError("Geometry stores can only be mapped on little endian machines")
+
+		self.buffer = memoryview(self.map)
+		views = []
+		offset = _padded(HEADER_SIZE)
+		for size, format in list(zip(_sectionSizes(glyphCount, layerCount, pathCount, nodeCount, stringBytes), "dIIIBB")) + [(stringBytes, None)]:
+			view = self.buffer[offset:offset + size]
+			views.append(view.cast(str(format)) if format else view)
+			offset += _padded(size)
+		self.coords, self.pathNodeOffsets, self.layerPathOffsets, self.glyphLayerOffsets, self.types, self.pathClosed, strings = views
+
+		names = bytes(strings).decode("utf-8").split("\n") if stringBytes else []
+		self.glyphNames = names[:glyphCount]
+		self.layerNames = names[glyphCount:]
+		self.glyphIndices = dict([(name, i) for i, name in enumerate(self.glyphNames)])
+
+	def close(self):
+		# views have to be released before the map can be closed
+		for name in ("coords", "pathNodeOffsets", "layerPathOffsets", "glyphLayerOffsets", "types", "pathClosed", "buffer"):
+			view = self.__dict__.pop(name, None)
+			if view is not None:
+				view.release()
+		self.map.close()
+		self.file.close()
+
+	def __enter__(self):
+		return self
+
+	def __exit__(self, *args):
+		self.close()
+
+	def glyphCount(self):
+		return len(self.glyphNames)
+
+	def glyphIndex(self, glyphName):
+		return self.glyphIndices[glyphName]
+
+	def glyphLayers(self, glyphIndex):
+		return range(self.glyphLayerOffsets[glyphIndex], self.glyphLayerOffsets[glyphIndex + 1])
+
+	def layerPaths(self, layerIndex):
+		return [PathView(self, p) for p in range(self.layerPathOffsets[layerIndex], self.layerPathOffsets[layerIndex + 1])]
+
+	def glyphGeometry(self, glyphIndex):
+		''' Returns the glyph's active layers as lists of path views, as expected by the engine '''
+		return [self.layerPaths(l) for l in self.glyphLayers(glyphIndex)]
+
+def checkStoreGlyph(store, glyphIndex, settings):
+	'''
+	Runs the checks of the engine on one glyph of the store
+
+	:return: (glyph name, directionally compatible, path ordering compatible, paths needing new starting points)
+	'''
+	layers = store.glyphGeometry(glyphIndex)
+	startingPoints = 0
+	for paths in layers:
+		startingPoints += len(engine.startingPointChanges(paths, [p.closed for p in paths]))
+	# the same verdicts as the other back ends, including the overlap handling
+	verdicts = engine.checkGlyph(layers, [p.closed for p in layers[0]] if layers else [], settings)
+	return (
+		store.glyphNames[glyphIndex],
+		verdicts["directional"],
+		verdicts["ordering"],
+		startingPoints,
+	)
+
+_workerStore = None
+
+def _openWorkerStore(filePath):
+	global _workerStore
+	_workerStore = GeometryStore(filePath)
+
+def _checkWorkerGlyphs(args):
+	glyphIndices, settings = args
+	return [(g,) + costmodel.timed(checkStoreGlyph, _workerStore, g, settings) for g in glyphIndices]
+
+def checkStore(filePath, settings, processes=None, chunkSize=64, costModel=None, timings=None, longestFirst=True):
+	'''
+	Checks all glyphs of a store, in parallel if processes > 1
+	Every worker maps the store once; only glyph indices and results are sent between processes.
+	The glyphs are handed out longest first as predicted by costModel (see costmodel.py), so that
+	no expensive glyph is left for the end of the run.
+
+	:param: costModel: a costmodel.CostModel; the timing of every glyph is recorded in it
+	:timings: dict to fill with {glyph name: (features, seconds)}
+	:longestFirst: False to hand out the glyphs in font order
+	:return: the results of checkStoreGlyph, in font order
+	'''
+	model = costModel or costmodel.CostModel()
+	with GeometryStore(filePath) as store:
+		glyphCount = store.glyphCount()
+		features = [costmodel.glyphFeatures(store.glyphGeometry(g)) for g in range(glyphCount)]
+		if processes == 1:
+			timedResults = [(g,) + costmodel.timed(checkStoreGlyph, store, g, settings) for g in range(glyphCount)]
+		else:
+			timedResults = None
+
+	if timedResults is None:
+		import multiprocessing
+		if longestFirst:
+			costs = dict([(g, model.predict(features[g])) for g in range(glyphCount)])
+			chunks = costmodel.costChunks(costs, processes or multiprocessing.cpu_count(), chunkSize)
+		else:
+			chunks = [list(range(i, min(i + chunkSize, glyphCount))) for i in range(0, glyphCount, chunkSize)]
+		pool = multiprocessing.Pool(processes, initializer=_openWorkerStore, initargs=(filePath,))
+		try:
+			timedResults = []
+			# chunks are taken in the order given, one at a time as workers become free
+			for chunkResults in pool.imap_unordered(_checkWorkerGlyphs, [(chunk, settings) for chunk in chunks]):
+				timedResults.extend(chunkResults)
+		finally:
+			pool.close()
+			pool.join()
+
+	results = [None] * glyphCount
+	for g, result, seconds in timedResults:
+		results[g] = result
+		if costModel is not None:
+			costModel.record(features[g], seconds)
+		if timings is not None:
+			timings[result[0]] = (features[g], seconds)
+	return results
@@ -0,0 +1,174 @@
+# encoding: utf-8
+
+###########################################################################################################
+#
+#	Watch mode for .glyphspackage sources
+#
+#	Polls the glyphs/ directory of a package and re-checks only the glyph files that changed
+#	since the last scan. Results are kept in a JSON report that survives restarts: entries of
+#	unchanged files are reused, so even the first scan after a restart only parses what changed.
+#
+#	Usage: python -m pathjuggler.watch Font.glyphspackage --report report.json
+#
+###########################################################################################################
+
+from __future__ import division, print_function, unicode_literals
+import io, json, os, sys, time
+from . import engine, glyphsfile, reader
+
+DEFAULT_INTERVAL = 0.5 # seconds between scans
+
+def checkGlyphFile(filePath, settings, triage=None):
+	''' Parses one glyph file and returns its report entry '''
+	return checkParsedGlyph(glyphsfile.readGlyphFile(filePath), settings, triage)
+
+def checkParsedGlyph(glyph, settings, triage=None):
+	''' Returns the report entry of a glyph read by glyphsfile.readGlyph '''
+	glyphName, layers = glyph
+	layers = [paths for (layerId, paths) in layers]
+	entry = {"glyph": glyphName, "directional": True, "ordering": True}
+	if layers:
+		nodeLists = [[nodes for (closed, nodes) in paths] for paths in layers]
+		closed = [c for (c, nodes) in layers[0]]
+		entry.update(engine.checkGlyph(nodeLists, closed, settings, triage))
+	return entry
+
+class PackageWatcher(object):
+	''' Keeps a report of the PathJuggler checks of all glyphs in a .glyphspackage up to date '''
+
+	def __init__(self, packagePath, settings=None, reportPath=None, readers=reader.DEFAULT_READERS):
+		self.glyphsPath = glyphsfile.glyphsDirectory(packagePath)
+		self.settings = settings or engine.Settings()
+		self.reportPath = reportPath
+		self.readers = readers
+		self.readerStatistics = None
+		# the report only needs pass/fail verdicts
+		self.triageStatistics = engine.newTriageStatistics()
+		# file name -> (mtime, size, report entry)
+		self.files = {}
+		if reportPath and os.path.exists(reportPath):
+			self.loadReport()
+
+	def loadReport(self):
+		with io.open(self.reportPath, encoding="utf-8") as f:
+			report = json.load(f)
+		if report.get("settings") == self.settingsKey():
+			for fileName, (mtime, size, entry) in report.get("files", {}).items():
+				self.files[fileName] = (mtime, size, entry)
+
+	def saveReport(self):
+		if not self.reportPath:
+			return
+		tempPath = self.reportPath + ".tmp"
+		with io.open(tempPath, "w", encoding="utf-8") as f:
+			f.write(json.dumps({"settings": self.settingsKey(), "files": self.files}, sort_keys=True, ensure_ascii=False))
+		os.rename(tempPath, self.reportPath)
+
+	def settingsKey(self):
+		return [self.settings.TOLERANCE, self.settings.HORIZ_TOLERANCE, self.settings.MAX_MISMATCHES, self.settings.IGNORE_OVERLAP]
+
+	def scan(self):
+		'''
+		Re-checks new and modified glyph files and forgets deleted ones
+
+		:return: (names of re-checked files, names of removed files)
+		'''
+		seen = set()
+		stats = {}
+		for entry in os.scandir(self.glyphsPath):
+			if not entry.name.endswith(".glyph"):
+				continue
+			seen.add(entry.name)
+			stat = entry.stat()
+			known = self.files.get(entry.name)
+			if not known or known[0] != stat.st_mtime or known[1] != stat.st_size:
+				stats[entry.path] = (entry.name, stat)
+
+		# parse the changed files ahead of checking them
+		changed = []
+		prefetch = reader.PrefetchReader(sorted(stats), readers=self.readers)
+		for filePath, glyph, error in prefetch:
+			fileName, stat = stats[filePath]
+			if error is None:
+				result = checkParsedGlyph(glyph, self.settings, self.triageStatistics)
+			else:
+				# the file may be half written; it is picked up again on the next change
+				result = {"glyph": fileName, "error": str(error)}
+			self.files[fileName] = (stat.st_mtime, stat.st_size, result)
+			changed.append(fileName)
+		self.readerStatistics = prefetch.statistics
+		removed = [name for name in self.files if name not in seen]
+		for name in removed:
+			del self.files[name]
+		if changed or removed:
+			self.saveReport()
+		return (changed, removed)
+
+	def problems(self):
+		''' Report entries of glyphs that fail a check, sorted by glyph name '''
+		failing = []
+		for (mtime, size, entry) in self.files.values():
+			if entry.get("error") or not entry.get("directional", True) or not entry.get("ordering", True):
+				failing.append(entry)
+		return sorted(failing, key=lambda entry: entry["glyph"])
+
+	def watch(self, interval=DEFAULT_INTERVAL, callback=None):
+		''' Scans until interrupted; callback(changed, removed, seconds) is called after scans that found changes '''
+		while True:
+			start = time.time()
+			changed, removed = self.scan()
+			if (changed or removed) and callback:
+				callback(changed, removed, time.time() - start)
+			time.sleep(interval)
+
+def describe(entry):
+	if entry.get("error"):
+		return "%s: ⚠️ could not be read (%s)" % (entry["glyph"], entry["error"])
+	problems = []
+	if not entry.get("directional", True):
+		problems.append("not directionally compatible")
+	if not entry.get("ordering", True):
+		problems.append("paths appear to be switched")
+	if problems:
+		return "%s: ⚠️ %s" % (entry["glyph"], ", ".join(problems))
+	return "%s: OK" % entry["glyph"]
+
+def main(arguments=None):
+	import argparse
+	parser = argparse.ArgumentParser(description="Re-check changed glyphs of a .glyphspackage with Path Juggler")
+	parser.add_argument("package")
+	parser.add_argument("--report", help="JSON report, kept up to date and reused on restart")
+	parser.add_argument("--interval", type=float, default=DEFAULT_INTERVAL)
+	parser.add_argument("--tolerance", type=float, default=engine.DEFAULT_TOLERANCE)
+	parser.add_argument("--horiz-tolerance", type=float, default=engine.DEFAULT_HORIZ_TOLERANCE)
+	parser.add_argument("--max-mismatches", type=int, default=engine.DEFAULT_MAX_MISMATCHES)
+	parser.add_argument("--readers", type=int, default=reader.DEFAULT_READERS, help="threads parsing glyph files ahead of the checks")
+	parser.add_argument("--once", action="store_true", help="scan once, print the problems and exit")
+	args = parser.parse_args(arguments)
+
+	settings = engine.Settings(args.tolerance, args.horiz_tolerance, args.max_mismatches)
+	watcher = PackageWatcher(args.package, settings, args.report, args.readers)
+	changed, removed = watcher.scan()
+	print("Checked %i glyph files" % len(changed))
+	print(watcher.readerStatistics.summary())
+	print("Layer triage: %(checked)i of %(pairs)i layer pairs checked, %(skipped)i skipped after a failure" % watcher.triageStatistics)
+	for entry in watcher.problems():
+		print(describe(entry))
+	if args.once:
+		return 1 if watcher.problems() else 0
+
+	def report(changed, removed, seconds):
+		for name in changed:
+			print(describe(watcher.files[name][2]))
+		for name in removed:
+			print("%s: removed" % name)
+		print("(%.1f ms)" % (seconds * 1000))
+
+	try:
+		watcher.watch(args.interval, report)
+	except KeyboardInterrupt:
+		pass
+	return 0
+
+if __name__ == "__main__":
+	sys.exit(main())
@@ -12,7 +12,9 @@
 ###########################################################################################################
 
 from __future__ import division, print_function, unicode_literals
-import vanilla, math, objc, copy
+import time
+_loadStart = time.time()
+import objc, copy
 from GlyphsApp import *
 from GlyphsApp.plugins import *
 from AppKit import NSAlternateKeyMask, NSContainsRect, NSMakePoint, NSMenuItem, NSNotificationCenter, NSPointInRect
@@ -20,29 +22,14 @@ from itertools import permutations
 
 PATH_JUGGLER_PREFIX = "PathJuggler"
 
-DEFAULT_TOLERANCE = 60
-DEFAULT_HORIZ_TOLERANCE = 15
-DEFAULT_MAX_MISMATCHES = 0
-DEFAULT_SUPPRESS_OUTPUT = 20
-DEFAULT_IGNORE_OVERLAP = True
+# loaded with the first command, see loadEngine
+engine = None
+interpolation = None
 
-DIR_NONE = -1
-DIR_N = 0
-DIR_NNE = 1
-DIR_NE = 2
-DIR_ENE = 3
-DIR_E = 4
-DIR_ESE = 5
-DIR_SE = 6
-DIR_SSE = 7
-DIR_S = 8
-DIR_SSW = 9
-DIR_SW = 10
-DIR_WSW = 11
-DIR_W = 12
-DIR_WNW = 13
-DIR_NW = 14
-DIR_NNW = 15
+def loadEngine():
+	''' Imports the engine into this module; its constants are used as engine.DEFAULT_TOLERANCE etc. '''
+	global engine, interpolation
+	from pathjuggler import engine, interpolation
 
 class PathJuggler(GeneralPlugin):
 	
@@ -53,12 +40,9 @@ class PathJuggler(GeneralPlugin):
 	@objc.python_method
 	def start(self):
 		
-		# constants (experimental settings not in settings window)
-		self.USE_COMPASS = False
-		self.IGNORE_CORNER = False
-		
-		if not self.loadPreferences():
-			print("Note: 'Path Juggler' could not load preferences. Will resort to defaults")
+		# only the menu items are created here; everything else waits for the first command (see prepare)
+		startTime = time.time()
+		self.prepared = False
 		
 		pathMenu = Glyphs.menu[PATH_MENU]	
 		pathMenu.append(NSMenuItem.separatorItem())
@@ -72,6 +56,9 @@ class PathJuggler(GeneralPlugin):
 		self.pathOrderingItem = NSMenuItem("Check path ordering", self.runMenuCommand)
 		pathMenu.append(self.pathOrderingItem)
 		
+		self.interpolationItem = NSMenuItem("Check interpolated instances", self.runMenuCommand)
+		pathMenu.append(self.interpolationItem)
+		
 		#pathMenu.append(NSMenuItem.separatorItem())
 		
 		self.startingPointItem = NSMenuItem("Set starting points", self.runMenuCommand)
@@ -107,36 +94,90 @@ class PathJuggler(GeneralPlugin):
 		self.allCorrectionsAllLayersItem = NSMenuItem("Run all corrections for all layers", self.runMenuCommand)
 		pathMenu.append(self.allCorrectionsAllLayersItem)
 		
+		# module import and start, without the time Glyphs spends between them
+		self.startupTime = MODULE_LOAD_TIME + time.time() - startTime
+		
+	@objc.python_method
+	def prepare(self):
+		''' Loads the engine and the preferences before the first command or the settings window '''
+		if self.prepared:
+			return
+		prepareStart = time.time()
+		loadEngine()
+		
+		# constants (experimental settings not in settings window)
+		self.USE_COMPASS = True # compass directions as fast filter before computing exact angles
+		self.IGNORE_CORNER = False
+		self.DEDUPLICATE = True # process glyphs with identical outlines only once
+		self.ANALYTIC_OVERLAP = True # find nodes in overlaps by winding numbers instead of removing overlap on a copy
+		self.COORDINATE_EPSILON = engine.COORDINATE_EPSILON # tolerance for looking up overlap coordinates
+		self.OVERLAP_CACHE_LIMIT = 20000 # layers whose overlap coordinates are kept, across commands
+		self.overlapCache = {}
+		self.compassStatistics = engine.newCompassStatistics()
+		self.RECORD_MARGINS = True # keep tolerance margins of directional checks for re-evaluation
+		self.marginTable = engine.MarginTable()
+		self.INTERPOLATION_SAMPLES = interpolation.DEFAULT_SAMPLES # instances between each pair of interpolating layers
+		self.TRIAGE_LAYERS = True # check the most distant layers first and stop at the first failure
+		self.triageStatistics = engine.newTriageStatistics()
+		self.REUSE_TOPOLOGY = True # find inner paths on one layer and only verify them on the others
+		self.topologyStatistics = engine.newTopologyStatistics()
+		self.COMPONENT_AWARE = True # check the glyphs that components come from once and pass their verdicts on
+		self.componentVerdicts = {}
+		self.componentStatistics = {"analyzed": 0, "reused": 0}
+		
+		if not self.loadPreferences():
+			print("Note: 'Path Juggler' could not load preferences. Will resort to defaults")
+		
+		self.prepared = True
+		if Glyphs.defaults[PATH_JUGGLER_PREFIX + "ReportStartupTime"]:
+			print("Path Juggler: plugin startup took %.2f ms, loading the engine and preferences %.2f ms" % (self.startupTime * 1000, (time.time() - prepareStart) * 1000))
+		
 	
 	@objc.python_method
 	def savePreferences( self, sender ):
 		try:
-			self.TOLERANCE = float(self.w.tolerance.get())
-			self.HORIZ_TOLERANCE = float(self.w.horizTolerance.get())
-			self.MAX_MISMATCHES = int(self.w.maxMismatches.get())
-			self.SUPRESS_OUTPUT = int(self.w.suppressOutput.get())
-			self.IGNORE_OVERLAP = bool(self.w.ignoreOverlap.get())
-			Glyphs.defaults[PATH_JUGGLER_PREFIX + "Tolerance"] = self.TOLERANCE
-			Glyphs.defaults[PATH_JUGGLER_PREFIX + "HorizTolerance"] = self.HORIZ_TOLERANCE
-			Glyphs.defaults[PATH_JUGGLER_PREFIX + "MaxMismatches"] = self.MAX_MISMATCHES
-			Glyphs.defaults[PATH_JUGGLER_PREFIX + "SuppressOutput"] = self.SUPPRESS_OUTPUT
-			Glyphs.defaults[PATH_JUGGLER_PREFIX + "IgnoreOverlap"] = self.IGNORE_OVERLAP
-			
-			self.w.close()
-		except:
+			tolerance = float(self.w.tolerance.get())
+			horizTolerance = float(self.w.horizTolerance.get())
+			maxMismatches = int(self.w.maxMismatches.get())
+			suppressOutput = int(self.w.suppressOutput.get())
+		except (ValueError, TypeError):
 			Message("Check that the entries are all valid.", "Error saving preferences")
 			return False
-			
+		self.TOLERANCE = tolerance
+		self.HORIZ_TOLERANCE = horizTolerance
+		self.MAX_MISMATCHES = maxMismatches
+		self.SUPPRESS_OUTPUT = suppressOutput
+		self.IGNORE_OVERLAP = bool(self.w.ignoreOverlap.get())
+		Glyphs.defaults[PATH_JUGGLER_PREFIX + "Tolerance"] = self.TOLERANCE
+		Glyphs.defaults[PATH_JUGGLER_PREFIX + "HorizTolerance"] = self.HORIZ_TOLERANCE
+		Glyphs.defaults[PATH_JUGGLER_PREFIX + "MaxMismatches"] = self.MAX_MISMATCHES
+		Glyphs.defaults[PATH_JUGGLER_PREFIX + "SuppressOutput"] = self.SUPPRESS_OUTPUT
+		Glyphs.defaults[PATH_JUGGLER_PREFIX + "IgnoreOverlap"] = self.IGNORE_OVERLAP
+		
+		self.w.close()
+		self.reevaluateMargins()
 		return True
 
+	@objc.python_method
+	def reevaluateMargins(self):
+		'''
+		Re-evaluates the last directional checks under the current settings, without touching the outlines
+		The table only holds the glyphs of the last command; every command run starts a new one.
+		'''
+		if len(self.marginTable):
+			failing = self.marginTable.failingGlyphs(self)
+			print("With these settings, %i of %i checked glyphs are not directionally compatible" % (len(failing), len(self.marginTable)))
+			if failing:
+				print(", ".join(failing))
+
 	@objc.python_method
 	def loadPreferences( self ):
 		try:
-			Glyphs.registerDefault(PATH_JUGGLER_PREFIX + "Tolerance", DEFAULT_TOLERANCE)
-			Glyphs.registerDefault(PATH_JUGGLER_PREFIX + "HorizTolerance", DEFAULT_HORIZ_TOLERANCE)
-			Glyphs.registerDefault(PATH_JUGGLER_PREFIX + "MaxMismatches", DEFAULT_MAX_MISMATCHES)
-			Glyphs.registerDefault(PATH_JUGGLER_PREFIX + "SuppressOutput", DEFAULT_SUPPRESS_OUTPUT)
-			Glyphs.registerDefault(PATH_JUGGLER_PREFIX + "IgnoreOverlap", DEFAULT_IGNORE_OVERLAP)
+			Glyphs.registerDefault(PATH_JUGGLER_PREFIX + "Tolerance", engine.DEFAULT_TOLERANCE)
+			Glyphs.registerDefault(PATH_JUGGLER_PREFIX + "HorizTolerance", engine.DEFAULT_HORIZ_TOLERANCE)
+			Glyphs.registerDefault(PATH_JUGGLER_PREFIX + "MaxMismatches", engine.DEFAULT_MAX_MISMATCHES)
+			Glyphs.registerDefault(PATH_JUGGLER_PREFIX + "SuppressOutput", engine.DEFAULT_SUPPRESS_OUTPUT)
+			Glyphs.registerDefault(PATH_JUGGLER_PREFIX + "IgnoreOverlap", engine.DEFAULT_IGNORE_OVERLAP)
 			self.TOLERANCE = float(Glyphs.defaults[PATH_JUGGLER_PREFIX + "Tolerance"])
 			self.HORIZ_TOLERANCE = float(Glyphs.defaults[PATH_JUGGLER_PREFIX + "HorizTolerance"])
 			self.MAX_MISMATCHES = int(Glyphs.defaults[PATH_JUGGLER_PREFIX + "MaxMismatches"])
@@ -150,11 +191,11 @@ class PathJuggler(GeneralPlugin):
 	@objc.python_method
 	def resetDefaults( self, sender ):
 		try:
-			self.w.tolerance.set( DEFAULT_TOLERANCE )
-			self.w.horizTolerance.set( DEFAULT_HORIZ_TOLERANCE )
-			self.w.maxMismatches.set( DEFAULT_MAX_MISMATCHES )
-			self.w.suppressOutput.set( DEFAULT_SUPPRESS_OUTPUT )
-			self.w.ignoreOverlap.set( DEFAULT_IGNORE_OVERLAP )
+			self.w.tolerance.set( engine.DEFAULT_TOLERANCE )
+			self.w.horizTolerance.set( engine.DEFAULT_HORIZ_TOLERANCE )
+			self.w.maxMismatches.set( engine.DEFAULT_MAX_MISMATCHES )
+			self.w.suppressOutput.set( engine.DEFAULT_SUPPRESS_OUTPUT )
+			self.w.ignoreOverlap.set( engine.DEFAULT_IGNORE_OVERLAP )
 		except:
 			return False
 			
@@ -163,6 +204,9 @@ class PathJuggler(GeneralPlugin):
 	@objc.python_method
 	def showSettingsDialog(self, sender):
 		
+		import vanilla
+		self.prepare()
+		
 		# Create new dialog window object. Once closed it cannot be re-opened
 		windowWidth  = 325
 		windowHeight = 225
@@ -226,57 +270,16 @@ class PathJuggler(GeneralPlugin):
 		
 	@objc.python_method
 	def getDirection(self, pointFrom, pointTo):
-		if pointTo.x == pointFrom.x:
-			# north or south
-			if pointTo.y == pointFrom.y:
-				return DIR_NONE
-			elif pointTo.y > pointFrom.y:
-				return DIR_N
-			elif pointTo.y < pointFrom.y:
-				return DIR_S
-		elif pointTo.x > pointFrom.x:
-			# eastwards
-			if pointTo.y == pointFrom.y:
-				return DIR_E
-			elif pointTo.y > pointFrom.y:
-				return DIR_NE
-			elif pointTo.y < pointFrom.y:
-				return DIR_SE
-		elif pointTo.x < pointFrom.x:
-			# westwards
-			if pointTo.y == pointFrom.y:
-				return DIR_W
-			elif pointTo.y > pointFrom.y:
-				return DIR_NW
-			elif pointTo.y < pointFrom.y:
-				return DIR_SW
+		# works for NSPoints and GSNodes alike
+		return engine.getDirection((pointFrom.x, pointFrom.y), (pointTo.x, pointTo.y))
 	
 	@objc.python_method
 	def getAngle(self, pointFrom, pointTo):
-		dir = self.getDirection(pointFrom, pointTo)
-		if dir != DIR_NONE:
-			if dir < 4:
-				opp = pointTo.x - pointFrom.x
-				adj = pointTo.y - pointFrom.y # zero when east
-				return math.degrees(math.atan(opp/adj))
-			elif dir < 8:
-				opp = pointFrom.y - pointTo.y
-				adj = pointTo.x - pointFrom.x # zero when south
-				return 90.0 + math.degrees(math.atan(opp/adj))
-			elif dir < 12:
-				opp = pointFrom.x - pointTo.x
-				adj = pointFrom.y - pointTo.y # zero when west
-				return 180.0 + math.degrees(math.atan(opp/adj))
-			else:
-				opp = pointTo.y - pointFrom.y
-				adj = pointFrom.x - pointTo.x # zero when north
-				return 270.0 + math.degrees(math.atan(opp/adj))
-		else:
-			return -1.0
+		return engine.getAngle((pointFrom.x, pointFrom.y), (pointTo.x, pointTo.y))
 		
 	@objc.python_method
 	def isHorizontal(self, dir1, dir2):
-		return dir1==DIR_W or dir1==DIR_E or dir2==DIR_W or dir2==DIR_E
+		return dir1==engine.DIR_W or dir1==engine.DIR_E or dir2==engine.DIR_W or dir2==engine.DIR_E
 		
 	@objc.python_method
 	def isSimilarDirection(self, dir1, dir2):
@@ -290,19 +293,8 @@ class PathJuggler(GeneralPlugin):
 	
 	@objc.python_method
 	def isSimilarAngle(self, pointFrom1, pointTo1, pointFrom2, pointTo2, tolerance = False):
-		dir1 = self.getDirection(pointFrom1, pointTo1)
-		dir2 = self.getDirection(pointFrom2, pointTo2)
-		
-		if not tolerance:
-			if self.isHorizontal(dir1, dir2):
-				tolerance = self.HORIZ_TOLERANCE #2.0 # horizontal
-			else:
-				tolerance = self.TOLERANCE #60.0 # all other strokes, e.g. vertical
-		
-		angle1 = self.getAngle(pointFrom1, pointTo1)
-		angle2 = self.getAngle(pointFrom2, pointTo2)
-		
-		return abs(angle2 - angle1) <= tolerance or abs(angle2 - angle1 + 360.0) <= tolerance or abs(angle2 - angle1 - 360.0) <= tolerance
+		# with USE_COMPASS, only pairs the compass directions cannot decide go through getAngle
+		return engine.isSimilarAngle((pointFrom1.x, pointFrom1.y), (pointTo1.x, pointTo1.y), (pointFrom2.x, pointFrom2.y), (pointTo2.x, pointTo2.y), self, tolerance)
 	
 	@objc.python_method
 	def pathsCompatible(self, sourceLayer, targetLayer):
@@ -327,193 +319,51 @@ class PathJuggler(GeneralPlugin):
 	
 	
 	@objc.python_method
-	def isCorner(self, dirBefore, currDir, dirAfter):
-		
-		# check that both rotations in the same direction
-		
-		if currDir < dirBefore:
-			beforeDiff = (currDir+16) - dirBefore
-		else:
-			beforeDiff = currDir - dirBefore
-		
-		print("in isCorner", dirBefore, currDir, beforeDiff)
-		
-		#if beforeDiff > 0 and beforeDiff != 8 and beforeDiff < 16:
-		if beforeDiff >= 0 and beforeDiff < 16:
-			
-			if dirAfter < currDir:
-				afterDiff = (dirAfter+16) - currDir
-			else:
-				afterDiff = dirAfter - currDir
-			
-			#if afterDiff > 0 and afterDiff != 8 and afterDiff < 16:
-			if afterDiff >= 0 and afterDiff < 16:
-			
-				if beforeDiff <= 8 and afterDiff <= 8:
-					
-					# both directions are CW
-					if dirAfter < dirBefore:
-						totalDiff = (dirAfter+16) - dirBefore
-					else:
-						totalDiff = dirAfter - dirBefore
-						
-				elif beforeDiff >= 8 and afterDiff >= 8:
-					
-					# both directions are CCW
-					if dirBefore < dirAfter:
-						totalDiff = (dirBefore+16) - dirAfter
-					else:
-						totalDiff = dirBefore - dirAfter
+	def pathsDirectionallyCompatible(self, sourcePath, targetPath, roSourceCoords, roTargetCoords):
+		''' engine.pathsDirectionallyCompatible for two paths, with the plugin as settings (IGNORE_OVERLAP, IGNORE_CORNER, ...) '''
+		return engine.pathsDirectionallyCompatible(self.getPathNodes(sourcePath), self.getPathNodes(targetPath), self, roSourceCoords, roTargetCoords)
 
-				else:
-					return False
-			else:
-				return False
-		else:
-			return False
-		
-		if totalDiff > 8 and totalDiff < 16:
-			return True
-		else:
-			return False
-	
-		
 	@objc.python_method
-	def pathsDirectionallyCompatible(self, sourcePath, targetPath, roSourceCoords, roTargetCoords):
-		
-		if len(sourcePath.nodes) != len(targetPath.nodes):
-			return False
-		if len(sourcePath.segments) != len(targetPath.segments):
-			return False
-		
-		mismatchedNodesInSequence = 0
-		
-		sourceNodes = []
-		targetNodes = []
-		
-		for node in sourcePath.nodes:
-			if node.type == LINE or node.type == CURVE:
-				sourceNodes.append(node)
-		for node in targetPath.nodes:
-			if node.type == LINE or node.type == CURVE:
-				targetNodes.append(node)		
-		
-		for i, n1 in enumerate(sourceNodes):
-			#print("next node")
-			n2 = targetNodes[i]
-			if i == 0:
-				prev_n1 = sourceNodes[len(sourceNodes)-1]
-				prev_n2 = targetNodes[len(sourceNodes)-1]
-			else:
-				prev_n1 = sourceNodes[i-1]
-				prev_n2 = targetNodes[i-1]
-			
-			if i != len(sourceNodes)-1:
-				next_n1 = sourceNodes[i+1]
-				next_n2 = targetNodes[i+1]
-			else:
-				next_n1 = sourceNodes[0]
-				next_n2 = targetNodes[0]
-			
-			if i == 0:
-				prev_prev_n1 = sourceNodes[len(sourceNodes)-2]
-				prev_prev_n2 = targetNodes[len(sourceNodes)-2]
-			elif i == 1:
-				prev_prev_n1 = sourceNodes[len(sourceNodes)-1]
-				prev_prev_n2 = targetNodes[len(sourceNodes)-1]
-			else:
-				prev_prev_n1 = sourceNodes[i-2]
-				prev_prev_n2 = targetNodes[i-2]
-			
-			if n1.type != n2.type:
-				return False
-			
-			# Overlap detection AND
-			if False:
-			#if self.IGNORE_OVERLAP:# and not prevSegInOverlap:
-				if n1.type == LINE and n2.type == LINE:# or \
+	def getPathNodes(self, path):
+		return [(n.position.x, n.position.y, n.type) for n in path.nodes]
 
-					if (prev_n1.position.x, prev_n1.position.y) not in roSourceCoords and (n1.position.x, n1.position.y) not in roSourceCoords:# \
-							#and (int((prev_n1.position.x + n1.position.x)/2), int((prev_n1.position.y + n1.position.y)/2)) not in roSourceCoords:
-						#print("sourcePath segment in overlap", prev_prev_n1.position, prev_n1.position, n1.position, prev_prev_n1.type, prev_n1.type, n1.type)
-						if (prev_n2.position.x, prev_n2.position.y) not in roTargetCoords and (n2.position.x, n2.position.y) not in roTargetCoords:# \
-								#and (int((prev_n2.position.x + n2.position.x)/2), int((prev_n2.position.y + n2.position.y)/2)) not in roTargetCoords:
-							#print("targetPath segment in overlap\n", prev_prev_n2.position, prev_n2.position, n2.position, prev_prev_n2.type, prev_n2.type, n2.type)
-							#prevSegInOverlap = True
-							
-							# check that this segment is shorter than the one before and after it
-							dist1 = math.sqrt((n1.position.x - prev_n1.position.x) ** 2 + \
-									(n1.position.y - prev_n1.position.y) ** 2)
-							prev_dist1 = math.sqrt((prev_n1.position.x - prev_prev_n1.position.x) ** 2 + \
-									(prev_n1.position.y - prev_prev_n1.position.y) ** 2)
-							next_dist1 = math.sqrt((next_n1.position.x - n1.position.x) ** 2 + \
-									(next_n1.position.y - n1.position.y) ** 2)
-									
-							dist2 = math.sqrt((n2.position.x - prev_n2.position.x) ** 2 + \
-									(n2.position.y - prev_n2.position.y) ** 2)
-							prev_dist2 = math.sqrt((prev_n2.position.x - prev_prev_n2.position.x) ** 2 + \
-									(prev_n2.position.y - prev_prev_n2.position.y) ** 2)
-							next_dist2 = math.sqrt((next_n2.position.x - n2.position.x) ** 2 + \
-									(next_n2.position.y - n2.position.y) ** 2)
-							
-							if dist1 < prev_dist1 and dist1 < next_dist1 and dist2 < prev_dist2 and dist2 < next_dist2:
-								continue
-								
-			# Overlap detection OR
-			if self.IGNORE_OVERLAP:# and not prevSegInOverlap:
-				if n1.type == LINE and n2.type == LINE:# or \
+	@objc.python_method
+	def getLayerNodes(self, layer):
+		''' Returns the paths of the layer as (x, y, type) node lists for the engine '''
+		return [self.getPathNodes(p) for p in layer.paths]
 
-					if (prev_n1.position.x, prev_n1.position.y) not in roSourceCoords and (n1.position.x, n1.position.y) not in roSourceCoords \
-							or (prev_n2.position.x, prev_n2.position.y) not in roTargetCoords and (n2.position.x, n2.position.y) not in roTargetCoords:
-						
-						# check that this segment is shorter than the one before and after it
-						dist1 = math.sqrt((n1.position.x - prev_n1.position.x) ** 2 + \
-								(n1.position.y - prev_n1.position.y) ** 2)
-						prev_dist1 = math.sqrt((prev_n1.position.x - prev_prev_n1.position.x) ** 2 + \
-								(prev_n1.position.y - prev_prev_n1.position.y) ** 2)
-						next_dist1 = math.sqrt((next_n1.position.x - n1.position.x) ** 2 + \
-								(next_n1.position.y - n1.position.y) ** 2)
-								
-						dist2 = math.sqrt((n2.position.x - prev_n2.position.x) ** 2 + \
-								(n2.position.y - prev_n2.position.y) ** 2)
-						prev_dist2 = math.sqrt((prev_n2.position.x - prev_prev_n2.position.x) ** 2 + \
-								(prev_n2.position.y - prev_prev_n2.position.y) ** 2)
-						next_dist2 = math.sqrt((next_n2.position.x - n2.position.x) ** 2 + \
-								(next_n2.position.y - n2.position.y) ** 2)
-						
-						if dist1 < prev_dist1 and dist1 < next_dist1 and dist2 < prev_dist2 and dist2 < next_dist2:
-							continue
-			
-			#Corner detection
-			if self.IGNORE_CORNER:
-				if n1.type == LINE and n2.type == LINE and len(sourcePath.nodes) >= 3:
-					
-					dirBefore1 = self.getDirection(prev_prev_n1, prev_n1)
-					dirBefore2 = self.getDirection(prev_prev_n2, prev_n2)
-					currDir1 = self.getDirection(prev_n1, n1)
-					currDir2 = self.getDirection(prev_n2, n2)
-					dirAfter1 = self.getDirection(n1, next_n1)
-					dirAfter2 = self.getDirection(n2, next_n2)
-					
-					#if self.isCorner(dirBefore1, currDir1, dirAfter1) and self.isCorner(dirBefore2, currDir2, dirAfter2):
-					c1 = self.isCorner(dirBefore1, currDir1, dirAfter1)
-					c2 = self.isCorner(dirBefore2, currDir2, dirAfter2)
-					
-					if c1 and c2:
-						continue	
-				
-			if self.isSimilarAngle(prev_n1, n1, prev_n2, n2):
-				mismatchedNodesInSequence = 0
-			else:
-				mismatchedNodesInSequence += 1
-				if mismatchedNodesInSequence > self.MAX_MISMATCHES: # default = 0
-					return False
-		return True
+	@objc.python_method
+	def generateOverlapCoords(self, thisLayer, reversedPaths=()):
+		'''
+		Returns the coordinates of the nodes that survive remove overlap as engine.CoordinateHash
+		Results are cached by the nodes themselves for the lifetime of the plugin, so they stay valid
+		across commands and are shared by layers with the same outlines.
+		'''
+		paths = self.getLayerNodes(thisLayer)
+		closed = tuple([p.closed for p in thisLayer.paths])
+		cacheKey = (tuple([tuple(p) for p in paths]), closed, tuple(reversedPaths), self.ANALYTIC_OVERLAP, self.COORDINATE_EPSILON)
+		coords = self.overlapCache.get(cacheKey)
+		if coords is not None:
+			return coords
+		
+		if self.ANALYTIC_OVERLAP:
+			# direction changes that are not written to the layer yet
+			for i in reversedPaths:
+				paths[i] = engine.reversedNodes(paths[i])
+			coords = engine.overlapCoords(paths, list(closed), self.COORDINATE_EPSILON)
+		else:
+			coords = engine.CoordinateHash(self.flattenedCoords(thisLayer, reversedPaths), self.COORDINATE_EPSILON)
+		if len(self.overlapCache) >= self.OVERLAP_CACHE_LIMIT:
+			self.overlapCache = {}
+		self.overlapCache[cacheKey] = coords
+		return coords
 
 	@objc.python_method
-	def generateOverlapCoords(self, thisLayer):
+	def flattenedCoords(self, thisLayer, reversedPaths=()):
 		testLayer = thisLayer.copy()
 		testLayer.stopUpdates()
+		for i in reversedPaths:
+			testLayer.paths[i].reverse()
 		testLayer.flattenOutlines()
 		
 		tempList = []
@@ -522,7 +372,7 @@ class PathJuggler(GeneralPlugin):
 				(x, y) = node.position
 				tempList.append((x, y))
 					
-			return set(tempList)
+		return tempList
 
 	@objc.python_method
 	def allPathsDirectionallyCompatible(self, sourceLayer, targetLayer, roSourceCoords, roTargetCoords):
@@ -551,7 +401,7 @@ class PathJuggler(GeneralPlugin):
 		newStartingNode = None
 		p1nodescopy = copy.copy(p1.nodes) # to avoid mutation error
 		for n in p1nodescopy:
-			if n.type == CURVE or n.type == LINE:
+			if n.type == engine.CURVE or n.type == engine.LINE:
 				n.makeNodeFirst()
 				if self.pathsDirectionallyCompatible(p1, p2, overlapNodes1, overlapNodes2):
 					newStartingNode = n
@@ -599,7 +449,7 @@ class PathJuggler(GeneralPlugin):
 	def setStartingPoint(self, path):
 		bottomLeftNode = None
 		for node in path.nodes:
-			if node.type == CURVE or node.type == LINE:
+			if node.type == engine.CURVE or node.type == engine.LINE:
 				if bottomLeftNode:
 					if node.position.y < bottomLeftNode.position.y:
 						bottomLeftNode = node
@@ -625,13 +475,56 @@ class PathJuggler(GeneralPlugin):
 		for p in layer.paths:
 			output.append(self.setStartingPoint(p)[0])
 		return("\n".join(output), "")
+	
+	@objc.python_method
+	def setStartingPointsBulk(self, layers, counts):
+		'''
+		Sets the starting points of all paths in layers in one pass
+		
+		:param: layers: layers to process
+		:counts: dict with the keys "changed", "unchanged", "empty" and "open", incremented in place
+		:return: (number of changed paths, number of closed paths)
+		'''
+		# load on-curve coordinates of all closed paths into flat lists, segmented by path offsets
+		xs, ys, nodeIndices, offsets, paths = [], [], [], [0], []
+		for layer in layers:
+			for path in layer.paths:
+				if not path.closed:
+					# the start of an open path is fixed
+					counts["open"] += 1
+					continue
+				for i, node in enumerate(path.nodes):
+					if node.type == engine.CURVE or node.type == engine.LINE:
+						(x, y) = node.position
+						xs.append(x)
+						ys.append(y)
+						nodeIndices.append(i)
+				offsets.append(len(xs))
+				paths.append(path)
+		
+		changed = 0
+		for p, path in enumerate(paths):
+			start, end = offsets[p], offsets[p+1]
+			if start == end:
+				counts["empty"] += 1
+				continue
+			# bottom left node: lexicographic minimum over (y, x), first one wins on ties
+			bottomLeft = min(range(start, end), key=lambda k: (ys[k], xs[k]))
+			# the starting node of a closed path is its last node
+			if nodeIndices[bottomLeft] == len(path.nodes)-1:
+				counts["unchanged"] += 1
+			else:
+				path.nodes[nodeIndices[bottomLeft]].makeNodeFirst()
+				counts["changed"] += 1
+				changed += 1
+		return(changed, len(paths))
 			
 	@objc.python_method
 	def getCentreOfMass(self, path):
 		onCurveNodes = 0
 		xsum, ysum = 0, 0
 		for n in path.nodes:
-			if n.type == CURVE or n.type == LINE:
+			if n.type == engine.CURVE or n.type == engine.LINE:
 				onCurveNodes += 1
 				xsum += n.position.x
 				ysum += n.position.y
@@ -644,6 +537,14 @@ class PathJuggler(GeneralPlugin):
 	@objc.python_method
 	def checkPathOrdering(self, glyph, layer):
 		
+		otherLayers = [l for l in glyph.layers if l != layer and (l.isMasterLayer or l.isBracketLayer() or l.isBraceLayer())]
+		if self.TRIAGE_LAYERS:
+			# layers most distant from this one are most likely to fail
+			layerNodes = self.getLayerNodes(layer)
+			otherLayers.sort(key=lambda l: -engine.layerDistance(layerNodes, self.getLayerNodes(l)))
+		
+		# pairs of paths whose arrangement the other layers have to keep
+		pathPairs = []
 		for i, p1 in enumerate(layer.paths):
 			cm1 = self.getCentreOfMass(p1)
 			for j, p2 in enumerate(layer.paths):
@@ -655,26 +556,36 @@ class PathJuggler(GeneralPlugin):
 						continue
 					
 					if cm1 and cm2:
-						pass
+						pathPairs.append((i, j, cm1, cm2))
 					else:
 						return False
-						
-					for l in glyph.layers:
-						if l != layer and (l.isMasterLayer or l.isBracketLayer() or l.isBraceLayer()):
-							if len(l.paths) != len(layer.paths):
-								return False
-							
-							lcm1 = self.getCentreOfMass(l.paths[i])
-							lcm2 = self.getCentreOfMass(l.paths[j])
-							
-							if NSPointInRect(lcm1, l.paths[j].bounds) or NSPointInRect(lcm2, l.paths[i].bounds):
-								continue
-							
-							if lcm1 and lcm2:
-								if not self.isSimilarAngle(cm1, cm2, lcm1, lcm2, 45):
-									return False
-							else:
-								return False
+		
+		for n, l in enumerate(otherLayers):
+			if not self.layerKeepsPathArrangement(layer, l, pathPairs):
+				if self.TRIAGE_LAYERS:
+					engine.countTriage(self.triageStatistics, len(otherLayers), n + 1)
+				return False
+		if self.TRIAGE_LAYERS:
+			engine.countTriage(self.triageStatistics, len(otherLayers), len(otherLayers))
+		return True
+	
+	@objc.python_method
+	def layerKeepsPathArrangement(self, layer, l, pathPairs):
+		''' Checks the pairs of paths found by checkPathOrdering on another layer '''
+		if len(l.paths) != len(layer.paths):
+			return False
+		for i, j, cm1, cm2 in pathPairs:
+			lcm1 = self.getCentreOfMass(l.paths[i])
+			lcm2 = self.getCentreOfMass(l.paths[j])
+			
+			if NSPointInRect(lcm1, l.paths[j].bounds) or NSPointInRect(lcm2, l.paths[i].bounds):
+				continue
+			
+			if lcm1 and lcm2:
+				if not self.isSimilarAngle(cm1, cm2, lcm1, lcm2, 45):
+					return False
+			else:
+				return False
 		return True
 		
 	@objc.python_method
@@ -840,7 +751,52 @@ class PathJuggler(GeneralPlugin):
 		
 	
 	@objc.python_method
-	def correctPathDirection(self, layer):
+	def findInnerPaths(self, layer):
+		''' Returns (outer, inner) index pairs of paths fully enclosed by another path without intersecting it '''
+		startTime = time.time()
+		innerPaths = []
+		paths = list(layer.paths)
+		for i1, p1 in enumerate(paths):
+			for i2, p2 in enumerate(paths):
+				if p1 != p2:
+					if NSContainsRect(p2.bounds, p1.bounds):
+						if not p1.bezierPath.intersectWithPath_(p2.bezierPath):
+							innerPaths.append((i2, i1))
+		self.topologyStatistics["computed"] += 1
+		self.topologyStatistics["computeTime"] += time.time() - startTime
+		return innerPaths
+	
+	@objc.python_method
+	def getPathBounds(self, layer):
+		return [(p.bounds.origin.x, p.bounds.origin.y, p.bounds.size.width, p.bounds.size.height) for p in layer.paths]
+	
+	@objc.python_method
+	def getContainmentTopology(self, layer):
+		''' Inner paths of a reference layer with the bounds candidates they were found among, for reuseInnerPaths '''
+		return (self.findInnerPaths(layer), engine.containmentCandidates(self.getPathBounds(layer)), len(layer.paths))
+	
+	@objc.python_method
+	def reuseInnerPaths(self, layer, topology):
+		''' Returns the inner paths of the reference topology if a cheap check confirms them for this layer, otherwise computes them '''
+		innerPaths, candidates, pathCount = topology
+		if len(layer.paths) == pathCount:
+			startTime = time.time()
+			verified = engine.verifyContainment(innerPaths, candidates, self.getLayerNodes(layer), self.getPathBounds(layer))
+			self.topologyStatistics["verifyTime"] += time.time() - startTime
+			if verified:
+				self.topologyStatistics["reused"] += 1
+				return list(innerPaths)
+			self.topologyStatistics["rejected"] += 1
+		return self.findInnerPaths(layer)
+	
+	@objc.python_method
+	def analyzePathDirection(self, layer, innerPaths=None):
+		'''
+		Decides which paths of the layer need to be reversed, without changing the layer
+		
+		:param: innerPaths: (outer, inner) pairs as returned by findInnerPaths, computed if not given
+		:return: (indices of the paths to reverse, intersection order of the last change or 0)
+		'''
 		# make all paths anti-clockwise
 		# except fully-enclosed paths inside another path that do not intersect it -> CW
 		# if there are two such paths intersecting each other enclosed in an outer one,
@@ -848,26 +804,18 @@ class PathJuggler(GeneralPlugin):
 		
 		changed = 0
 		
-		# generate table of intersections
-		parentGlyph = layer.parent
-		font = Glyphs.font
-		
 		# path is inside another
 		# both paths intersect
 		
 		# Groups of fully enclosed paths
 		
-		innerPaths = []
+		paths = list(layer.paths)
+		# directions as they will be after the corrections so far
+		directions = [p.direction for p in paths]
 		
 		# STEP 1: Find all inner paths (and their respective outer paths)
-		for i1, p1 in enumerate(layer.paths):
-			for i2, p2 in enumerate(layer.paths):
-				if p1 != p2:
-					if NSContainsRect(p2.bounds, p1.bounds):
-						if not p1.bezierPath.intersectWithPath_(p2.bezierPath):
-							innerPaths.append((i2, i1))
-		
-		#print("innerPaths", innerPaths)
+		if innerPaths is None:
+			innerPaths = self.findInnerPaths(layer)
 		
 		pathGroups = []
 		outerPaths = []
@@ -880,18 +828,16 @@ class PathJuggler(GeneralPlugin):
 			while inner in outerPaths:
 				outerPaths.remove(inner)
 		
-		# TODO: set all (remaining) outerPaths to CCW
-		
 		for outerPath in outerPaths:
-			if not layer.paths[outerPath].direction == -1: # CCW
-				layer.paths[outerPath].reverse()
+			if not directions[outerPath] == -1: # CCW
+				directions[outerPath] = -directions[outerPath]
 				changed = 1
 		
 		# set all innerPaths[1] to CW
 		for(outer, inner) in innerPaths:
 			if not inner in outerPaths:
-				if not layer.paths[inner].direction == 1: # CW
-					layer.paths[inner].reverse()
+				if not directions[inner] == 1: # CW
+					directions[inner] = -directions[inner]
 					changed = 2
 			
 		# group remaining paths inside an outer path
@@ -909,24 +855,376 @@ class PathJuggler(GeneralPlugin):
 				# inner path with largest area remains CW
 				# other paths, if they intersect this inner path (but not the outer path)
 				# are set to CCW
-				#print ("path", path, "area", layer.paths[path].area())
-				if layer.paths[path].area() > maxArea:
+				if paths[path].area() > maxArea:
 					maxPath = path
-					maxArea = layer.paths[path].area()
+					maxArea = paths[path].area()
 			
 			if maxPath >= 0:
 				for path in pathGroup[1:]:
 					if path != maxPath:
-						if layer.paths[path].bezierPath.intersectWithPath_(layer.paths[maxPath].bezierPath):
-							if not layer.paths[path].direction == -1: # CCW
-								layer.paths[path].reverse()
+						if paths[path].bezierPath.intersectWithPath_(paths[maxPath].bezierPath):
+							if not directions[path] == -1: # CCW
+								directions[path] = -directions[path]
 								changed = 3
 		
+		reverse = [i for i, p in enumerate(paths) if directions[i] != p.direction]
+		return(reverse, changed)
+	
+	@objc.python_method
+	def correctPathDirection(self, layer, topology=None):
+		innerPaths = self.reuseInnerPaths(layer, topology) if topology else None
+		reverse, changed = self.analyzePathDirection(layer, innerPaths)
+		for i in reverse:
+			layer.paths[i].reverse()
+		
 		if changed:
 			return(str(layer) + ": Corrected path direction with intersection order " + str(changed), "")
 		else:
 			return(str(layer) + ": No changes made", "")
 
+	@objc.python_method
+	def buildGlyphContext(self, glyph):
+		''' Reads all layers of the glyph once into engine.LayerStates for runAllCorrections '''
+		context = []
+		for layer in glyph.layers:
+			paths = []
+			for i, p in enumerate(layer.paths):
+				bounds = p.bounds
+				nodes = [(n.position.x, n.position.y, n.type) for n in p.nodes]
+				paths.append(engine.PathState(i, nodes, p.closed, (bounds.origin.x, bounds.origin.y, bounds.size.width, bounds.size.height)))
+			context.append(engine.LayerState(paths, self.isActiveLayer(layer)))
+		return context
+
+	@objc.python_method
+	def runAllCorrections(self, glyph, referenceLayer):
+		'''
+		Corrects path direction, starting points and path ordering of all layers in one pipeline:
+		the glyph is read once, all three stages work on the same context and the result
+		is written back once at the end
+		
+		:return: (output, errors, plan of the changes as returned by writeGlyphContext)
+		'''
+		layers = list(glyph.layers)
+		context = self.buildGlyphContext(glyph)
+		output = ["Processing glyph " + glyph.name]
+		errorString = ""
+		
+		# STAGE 1: path direction
+		topology = None
+		if self.REUSE_TOPOLOGY:
+			topology = self.getContainmentTopology(referenceLayer)
+		for layer, state in zip(layers, context):
+			if layer == referenceLayer and topology:
+				innerPaths = list(topology[0])
+			elif topology:
+				innerPaths = self.reuseInnerPaths(layer, topology)
+			else:
+				innerPaths = None
+			reverse, changed = self.analyzePathDirection(layer, innerPaths)
+			for i in reverse:
+				state.paths[i].reverse()
+			if state.active:
+				# overlaps depend on the directions, so they are generated after this stage
+				state.overlapCoords = self.generateOverlapCoords(layer, reverse)
+			if changed:
+				output.append(str(layer) + ": Corrected path direction with intersection order " + str(changed))
+		
+		# STAGES 2 and 3: starting points, then path ordering against the reference layer, moving starting points if necessary
+		startingPoints, reordered, failure = engine.correctLayerStates(context, context[layers.index(referenceLayer)], self)
+		output.append("Set %i starting points" % startingPoints)
+		if failure == "empty":
+			output.append("Original layer has no paths")
+		elif failure:
+			if failure == "paths":
+				errorString = "\n" + glyph.name + ": cannot be made compatible. Not all masters contain the same number of paths."
+			else:
+				errorString = "\n" + glyph.name + ": cannot be made compatible. Could not find a matching compatible path."
+			output.append(glyph.name + ": Reordering failed")
+		else:
+			output.append(glyph.name + (": Reordered paths and/or starting points" if reordered else ": No changes made"))
+		
+		# write back all changes at once
+		plan = self.writeGlyphContext(glyph, context)
+		if plan is False:
+			errorString += "\n" + glyph.name + ": ⚠️ could not write back corrections"
+		return("\n".join(output), errorString, plan)
+
+	@objc.python_method
+	def writeGlyphContext(self, glyph, context):
+		'''
+		Writes the layer states of runAllCorrections back to the glyph
+		
+		:return: the changes as plan for glyphs with the same outlines (see derivePathPlan),
+		None if nothing changed, or False if they could not be written
+		'''
+		plan = engine.layerStatesPlan([self.getLayerNodes(layer) for layer in glyph.layers], context)
+		if plan is None:
+			return None
+		if not self.applyPathPlan(glyph, plan):
+			return False
+		return plan
+
+	@objc.python_method
+	def isActiveLayer(self, layer):
+		return layer.isMasterLayer or layer.isBracketLayer() or layer.isBraceLayer()
+
+	@objc.python_method
+	def getInterpolationGroup(self, layer):
+		''' Bracket layers interpolate only with the bracket layers of the same axis range, see engine.layerNameGroup '''
+		if not layer.isBracketLayer():
+			return engine.MASTER_GROUP
+		axisRules = layer.attributes.get("axisRules") if layer.attributes else None
+		if axisRules is not None:
+			return "bracket %r" % (axisRules,)
+		return "bracket " + (layer.name or "")
+
+	@objc.python_method
+	def getLayerOrigin(self, layer):
+		''' Returns the position of the first node in the layer, used to make keys translation-invariant '''
+		for path in layer.paths:
+			for node in path.nodes:
+				return (node.position.x, node.position.y)
+		return (0, 0)
+
+	@objc.python_method
+	def getPathKey(self, path, origin):
+		return engine.pathKey([(n.position.x, n.position.y, n.type) for n in path.nodes], origin)
+
+	@objc.python_method
+	def getSelection(self, font):
+		'''
+		Reads the selection once per command, so that the glyph loop does not ask Glyphs for it again
+
+		:return: dict with "layers" (the selected layers), "glyphs" (their glyphs, in order),
+		"layerIds" (glyph name -> ids of its selected layers), "firstGlyph" (name of the glyph of
+		the first selected layer) and "masterId" (id of the current master)
+		'''
+		selection = {"layers": list(font.selectedLayers), "glyphs": [], "layerIds": {}, "firstGlyph": None, "masterId": font.selectedFontMaster.id}
+		for i, layer in enumerate(selection["layers"]):
+			glyph = layer.parent
+			if glyph.name is None:
+				continue
+			if i == 0:
+				selection["firstGlyph"] = glyph.name
+			selection["glyphs"].append(glyph)
+			selection["layerIds"].setdefault(glyph.name, set()).add(layer.layerId)
+		return selection
+
+	@objc.python_method
+	def getReferenceLayer(self, glyph, selection):
+		''' The current layer if it belongs to glyph, otherwise the glyph's layer of the current master '''
+		if glyph.name == selection["firstGlyph"]:
+			return selection["layers"][0]
+		return glyph.layers[selection["masterId"]]
+
+	@objc.python_method
+	def isSelectedLayer(self, glyph, layer, selection):
+		return layer.layerId in selection["layerIds"].get(glyph.name, ())
+
+	@objc.python_method
+	def getGeometryKey(self, glyph, selection):
+		'''
+		Returns a hashable key of the outlines of all layers of the glyph
+		(translation-invariant per layer), or None if the glyph cannot be deduplicated
+
+		Besides the geometry, the key contains everything else the commands depend on:
+		which layers are active and in which interpolation group (for bracket layers, their axis
+		rules), which are selected and which one is the reference layer.
+		'''
+		referenceLayerId = self.getReferenceLayer(glyph, selection).layerId
+		selectedIds = selection["layerIds"].get(glyph.name, ())
+
+		key = []
+		for layer in glyph.layers:
+			# components are not part of layer.paths, but change overlaps
+			for shape in layer.shapes:
+				if shape.shapeType != GSShapeTypePath:
+					return None
+			origin = self.getLayerOrigin(layer)
+			pathKeys = tuple([self.getPathKey(p, origin) for p in layer.paths])
+			group = self.getInterpolationGroup(layer) if self.isActiveLayer(layer) else None
+			key.append((group, layer.layerId in selectedIds, layer.layerId == referenceLayerId, pathKeys))
+		return tuple(key)
+
+	@objc.python_method
+	def groupIdenticalGlyphs(self, glyphs, selection):
+		'''
+		Pre-pass: returns a dict glyph name -> geometry key and the number of distinct groups
+		Glyphs that cannot be deduplicated, or have no duplicate in the selection, are left out.
+		'''
+		keys = {}
+		for glyph in glyphs:
+			key = self.getGeometryKey(glyph, selection)
+			if key is not None:
+				keys[glyph.name] = key
+		groupSizes = {}
+		for key in keys.values():
+			groupSizes[key] = groupSizes.get(key, 0) + 1
+		keys = dict([(name, key) for name, key in keys.items() if groupSizes[key] > 1])
+		return keys, len(set(keys.values()))
+
+	@objc.python_method
+	def snapshotGlyphPaths(self, glyph):
+		''' Remembers path objects and layer origins before a command changes them '''
+		return [(list(layer.paths), self.getLayerOrigin(layer)) for layer in glyph.layers]
+
+	@objc.python_method
+	def derivePathPlan(self, glyph, snapshot):
+		'''
+		Compares the glyph with its snapshot and returns the changes as a replayable plan:
+		per layer None (unchanged) or a list of (original path index, path key after the change)
+		
+		:return: the plan, None if nothing changed, or False if the command replaced path objects,
+		so that the changes cannot be told apart from new paths
+		'''
+		plan = []
+		changed = False
+		for layer, (oldPaths, origin) in zip(glyph.layers, snapshot):
+			oldKeys = [self.getPathKey(p, origin) for p in oldPaths]
+			layerPlan = []
+			layerChanged = False
+			for i, path in enumerate(layer.paths):
+				if path not in oldPaths:
+					return False
+				index = oldPaths.index(path)
+				pathKey = self.getPathKey(path, origin)
+				if index != i or pathKey != oldKeys[index]:
+					layerChanged = True
+				layerPlan.append((index, pathKey))
+			if layerChanged:
+				plan.append(layerPlan)
+				changed = True
+			else:
+				plan.append(None)
+		if changed:
+			return plan
+		return None
+
+	@objc.python_method
+	def applyPathPlan(self, glyph, plan):
+		'''
+		Replays a plan made by derivePathPlan or writeGlyphContext on a glyph with identical outlines
+		The whole plan is resolved first (see engine.resolveLayerPlan); if any path cannot be matched,
+		no layer is changed. The paths are reversed, rotated and reordered in place, so they stay the same objects.
+		'''
+		resolved = []
+		for layer, layerPlan in zip(glyph.layers, plan):
+			if layerPlan is None:
+				continue
+			paths = list(layer.paths)
+			changes = engine.resolveLayerPlan(self.getLayerNodes(layer), [p.closed for p in paths], layerPlan)
+			if changes is None:
+				return False
+			resolved.append((layer, paths, changes))
+		for layer, paths, changes in resolved:
+			for index, reverse, start in changes:
+				if reverse:
+					paths[index].reverse()
+				if start is not None:
+					paths[index].nodes[start].makeNodeFirst()
+			newPaths = [paths[index] for (index, reverse, start) in changes]
+			if newPaths != paths:
+				for i in range(len(layer.shapes)-1,-1,-1): # reverse ordering
+					if layer.shapes[i].shapeType == GSShapeTypePath:
+						del layer.shapes[i]
+				for path in newPaths:
+					layer.shapes.append(path)
+		return True
+
+	@objc.python_method
+	def ownPathsDirectionallyCompatible(self, glyph):
+		'''
+		Checks the direct paths of all active layers of a glyph against each other
+		With RECORD_MARGINS, every layer pair is measured once and the verdict is derived from the
+		margins, so that the table can re-evaluate other settings; otherwise the pairs are triaged.
+		'''
+		activeLayers = [l for l in glyph.layers if self.isActiveLayer(l)]
+		# margins do not record which segments lie in corners
+		if self.RECORD_MARGINS and not self.IGNORE_CORNER:
+			layers = [self.getLayerNodes(l) for l in activeLayers]
+			overlaps = [self.generateOverlapCoords(l) for l in activeLayers]
+			pathsCompatible = True
+			# margins do not depend on the order of the layers, so each pair is measured once
+			for i in range(len(activeLayers)):
+				for j in range(i + 1, len(activeLayers)):
+					margin = engine.layerPairMargin(layers[i], layers[j], overlaps[i], overlaps[j])
+					self.marginTable.add(glyph.name, activeLayers[i].layerId, activeLayers[j].layerId, margin)
+					if not engine.marginPasses(margin, self):
+						pathsCompatible = False
+			return pathsCompatible
+		
+		if self.TRIAGE_LAYERS:
+			pairs = [(activeLayers[i], activeLayers[j]) for (i, j) in engine.triagePairs([self.getLayerNodes(l) for l in activeLayers])]
+		else:
+			pairs = [(l1, l2) for l1 in activeLayers for l2 in activeLayers if l1 != l2]
+		for n, (l1, l2) in enumerate(pairs):
+			if not self.allPathsDirectionallyCompatible(l1, l2, self.generateOverlapCoords(l1), self.generateOverlapCoords(l2)):
+				if self.TRIAGE_LAYERS:
+					engine.countTriage(self.triageStatistics, len(pairs), n + 1)
+				return False
+		if self.TRIAGE_LAYERS:
+			engine.countTriage(self.triageStatistics, len(pairs), len(pairs))
+		return True
+
+	@objc.python_method
+	def getBaseGlyphNames(self, glyph):
+		''' Names of the glyphs the components of the active layers refer to '''
+		names = []
+		for layer in glyph.layers:
+			if self.isActiveLayer(layer):
+				for component in layer.components:
+					if component.componentName not in names:
+						names.append(component.componentName)
+		return names
+
+	@objc.python_method
+	def checkDirectionalCompatibility(self, glyph, font):
+		'''
+		Checks the direct paths of a glyph and, with COMPONENT_AWARE, the glyphs its components
+		come from; every glyph of the component graph is analyzed only once per command
+		
+		:return: (direct paths compatible, names of base glyphs that are not compatible)
+		'''
+		if glyph.name in self.componentVerdicts:
+			self.componentStatistics["reused"] += 1
+			return self.componentVerdicts[glyph.name]
+		# a component cycle must not recurse forever
+		self.componentVerdicts[glyph.name] = (True, [])
+		pathsCompatible = self.ownPathsDirectionallyCompatible(glyph) if glyph.mastersCompatible else False
+		failingBases = []
+		if self.COMPONENT_AWARE:
+			for name in self.getBaseGlyphNames(glyph):
+				baseGlyph = font.glyphs[name]
+				if baseGlyph is None:
+					continue
+				baseCompatible, baseFailingBases = self.checkDirectionalCompatibility(baseGlyph, font)
+				if not baseCompatible or baseFailingBases:
+					failingBases.append(name)
+		self.componentStatistics["analyzed"] += 1
+		self.componentVerdicts[glyph.name] = (pathsCompatible, failingBases)
+		return (pathsCompatible, failingBases)
+
+	@objc.python_method
+	def replayGroupResult(self, glyph, groupResult, startingPointCounts):
+		'''
+		Reuses the result of the first glyph of a group of identical glyphs
+		
+		:param: startingPointCounts: the counts of the command, the starting points of the first glyph are counted again for this one
+		'''
+		groupName, groupFailed, plan, counts = groupResult
+		output, error = glyph.name + ": same outlines as " + groupName + ", reused its result", ""
+		if plan:
+			if self.applyPathPlan(glyph, plan):
+				output = glyph.name + ": same outlines as " + groupName + ", replayed its corrections"
+			else:
+				error = glyph.name + ": ⚠️ could not replay corrections of " + groupName
+				counts = {}
+		for name, count in counts.items():
+			startingPointCounts[name] += count
+		if groupFailed:
+			error = glyph.name + ": ⚠️ same outlines as " + groupName + ", see its warning"
+		return(output, error)
+
 	@objc.python_method
 	def runMenuCommand( self, sender ):
 		
@@ -935,7 +1233,15 @@ class PathJuggler(GeneralPlugin):
 		Glyphs.showMacroWindow()
 		#print("Path Juggler log:")
 
+		self.prepare()
 		print("Running command: %s"%sender.title())
+		self.compassStatistics = engine.newCompassStatistics()
+		# margins of earlier runs may belong to other fonts or to outlines changed since
+		self.marginTable = engine.MarginTable()
+		self.triageStatistics = engine.newTriageStatistics()
+		self.topologyStatistics = engine.newTopologyStatistics()
+		self.componentVerdicts = {}
+		self.componentStatistics = {"analyzed": 0, "reused": 0}
 
 		try:
 			Font = Glyphs.font
@@ -943,7 +1249,8 @@ class PathJuggler(GeneralPlugin):
 				print("⚠️ No glyphs selected")
 				return
 			
-			selectedGlyphs = [ x.parent for x in Font.selectedLayers if x.parent.name is not None ]
+			selection = self.getSelection(Font)
+			selectedGlyphs = selection["glyphs"]
 			errors = ""
 			successString = "Command generated no warnings."
 			
@@ -951,11 +1258,29 @@ class PathJuggler(GeneralPlugin):
 				print("⚠️ No glyphs selected")
 				return
 			
+			# pre-pass: group glyphs with identical outlines, so that each group is processed only once
+			geometryKeys, groupResults = {}, {}
+			startingPointCounts = {"changed": 0, "unchanged": 0, "empty": 0, "open": 0}
+			interpolationRanking = []
+			if self.DEDUPLICATE and len(selectedGlyphs) > 1:
+				geometryKeys, groupCount = self.groupIdenticalGlyphs(selectedGlyphs, selection)
+				print("%i glyphs, %i distinct outline groups" % (len(selectedGlyphs), groupCount + len(selectedGlyphs) - len(geometryKeys)))
+			# the pipeline of all corrections returns its changes as plan, the other commands are compared with a snapshot
+			returnsPlan = sender == self.allCorrectionsAllLayersItem
+			
 			for i, thisGlyph in enumerate(selectedGlyphs):
 				
 				output = ""
 				error = ""
 				
+				key = geometryKeys.get(thisGlyph.name)
+				firstOfGroup = key is not None and key not in groupResults
+				snapshot = None
+				plan = None
+				if firstOfGroup and not returnsPlan:
+					snapshot = self.snapshotGlyphPaths(thisGlyph)
+				countsBefore = dict(startingPointCounts)
+				
 				containsPaths = False
 				for l in thisGlyph.layers:
 					if l.isMasterLayer or l.isBracketLayer() or l.isBraceLayer():
@@ -963,27 +1288,25 @@ class PathJuggler(GeneralPlugin):
 							containsPaths = True
 							break
 				
-				if not containsPaths:
+				if key in groupResults:
+					output, error = self.replayGroupResult(thisGlyph, groupResults[key], startingPointCounts)
+					if sender == self.pathDirectionCompatibilityItem:
+						self.marginTable.copyGlyph(groupResults[key][0], thisGlyph.name)
+				
+				elif not containsPaths and not (sender == self.pathDirectionCompatibilityItem and self.COMPONENT_AWARE and self.getBaseGlyphNames(thisGlyph)):
 					output += thisGlyph.name + ": does not contain any paths in active layers"
 				
 				elif sender == self.pathDirectionCompatibilityItem:
 					successString = "All glyphs in the selection are directionally compatible"
 					
 					if thisGlyph.mastersCompatible:
-						pathsCompatible = True
-						for l1 in thisGlyph.layers:
-							if l1.isMasterLayer or l1.isBracketLayer() or l1.isBraceLayer():
-								roSourceCoords = self.generateOverlapCoords(l1)
-								for l2 in thisGlyph.layers:
-									if l1 != l2:
-										if l2.isMasterLayer or l2.isBracketLayer() or l2.isBraceLayer():
-											roTargetCoords = self.generateOverlapCoords(l2)
-											if not self.allPathsDirectionallyCompatible(l1, l2, roSourceCoords, roTargetCoords):
-												pathsCompatible = False
-						if pathsCompatible:
-							output += thisGlyph.name + ": is directionally compatible"
-						else:
+						pathsCompatible, failingBases = self.checkDirectionalCompatibility(thisGlyph, Font)
+						if not pathsCompatible:
 							error += thisGlyph.name + ": ⚠️ has compatible masters, but they are not directionally compatible"
+						if failingBases:
+							error += ("\n" if error else "") + thisGlyph.name + ": ⚠️ uses components of " + ", ".join(failingBases) + ", which are not directionally compatible"
+						if not error:
+							output += thisGlyph.name + ": is directionally compatible"
 					else:
 						error += thisGlyph.name+ ": ⚠️ does not have compatible masters"
 						
@@ -991,7 +1314,7 @@ class PathJuggler(GeneralPlugin):
 					successString = "All glyphs in the selection have paths in the same order"
 					
 					for thisLayer in thisGlyph.layers:
-						if thisLayer in Font.selectedLayers:
+						if self.isSelectedLayer(thisGlyph, thisLayer, selection):
 							if thisGlyph.mastersCompatible:
 								if self.checkPathOrdering(thisGlyph, thisLayer):
 									output += thisGlyph.name + ": has paths in the same order"
@@ -1001,39 +1324,42 @@ class PathJuggler(GeneralPlugin):
 								error += thisGlyph.name + ": ⚠️ does not have compatible masters"
 							break # no need to check futher layers if multiple layers are selected
 								
+				elif sender == self.interpolationItem:
+					successString = "No problems found in the interpolated instances of the selection"
+					
+					activeLayers = [l for l in thisGlyph.layers if self.isActiveLayer(l)]
+					layers = [self.getLayerNodes(l) for l in activeLayers]
+					groups = [self.getInterpolationGroup(l) for l in activeLayers]
+					result = interpolation.validateGlyph(layers, [p.closed for p in activeLayers[0].paths], self.INTERPOLATION_SAMPLES, groups=groups)
+					if not result["interpolable"]:
+						error += thisGlyph.name + ": ⚠️ does not have compatible masters"
+					elif result["severity"]:
+						interpolationRanking.append((thisGlyph.name, result))
+						error += thisGlyph.name + ": ⚠️ interpolated instances have %(flips)i direction flips, %(intersections)i self-intersections, %(collapses)i collapsed segments" % result
+					else:
+						output += thisGlyph.name + ": interpolates without problems"
+				
 				elif sender == self.startingPointItem:
 					
-					for layer in thisGlyph.layers:
-						if layer in Font.selectedLayers:
-							text, error = self.setStartingPoints(layer) # error always blank
-							if text:
-								if output:
-									output += "\n" + text
-								else:
-									output = text
+					layers = [l for l in thisGlyph.layers if self.isSelectedLayer(thisGlyph, l, selection)]
+					changed, total = self.setStartingPointsBulk(layers, startingPointCounts)
+					output = thisGlyph.name + ": Set %i of %i starting points" % (changed, total)
 							
 				elif sender == self.startingPointAllLayersItem:
 					
-					for layer in thisGlyph.layers:
-						text, error = self.setStartingPoints(layer) # error always blank
-						if text:
-							if output:
-								output += "\n" + text
-							else:
-								output = text
+					changed, total = self.setStartingPointsBulk(thisGlyph.layers, startingPointCounts)
+					output = thisGlyph.name + ": Set %i of %i starting points" % (changed, total)
 							
 				elif sender == self.startingPointCompatibilityItem:
 					
 					# uses the current layer as example of the "correct" setting
-					thisLayer = Font.selectedLayers[0]
-					if thisLayer.parent != thisGlyph:
-						thisLayer = thisGlyph.layers[Font.selectedFontMaster.id]
+					thisLayer = self.getReferenceLayer(thisGlyph, selection)
 					output, error = self.reestablishStartingPointCompatibility(thisLayer)
 					
 				elif sender == self.correctPathDirectionItem:
 					
 					for thisLayer in thisGlyph.layers:
-						if thisLayer in Font.selectedLayers:
+						if self.isSelectedLayer(thisGlyph, thisLayer, selection):
 							text, error = self.correctPathDirection(thisLayer) # error always blank
 							if text:
 								if output:
@@ -1043,8 +1369,12 @@ class PathJuggler(GeneralPlugin):
 					
 				elif sender == self.correctPathDirectionAllLayersItem:
 					
+					# inner paths are found on the current master and only verified on the other layers
+					topology = None
+					if self.REUSE_TOPOLOGY:
+						topology = self.getContainmentTopology(thisGlyph.layers[selection["masterId"]])
 					for thisLayer in thisGlyph.layers:
-						text, error = self.correctPathDirection(thisLayer) # error always blank
+						text, error = self.correctPathDirection(thisLayer, topology) # error always blank
 						if text:
 							if output:
 								output += "\n" + text
@@ -1054,41 +1384,34 @@ class PathJuggler(GeneralPlugin):
 				elif sender == self.correctPathOrderingItem:
 					
 					# uses the current layer as example of the "correct" ordering
-					thisLayer = Font.selectedLayers[0]
-					if thisLayer.parent != thisGlyph:
-						thisLayer = thisGlyph.layers[Font.selectedFontMaster.id]
+					thisLayer = self.getReferenceLayer(thisGlyph, selection)
 					output, error = self.correctPathOrdering(thisLayer, False)
 					
 				elif sender == self.correctPathOrderingMovingStartPointsItem:
 					
 					# uses the current layer as example of the "correct" ordering
-					thisLayer = Font.selectedLayers[0]
-					if thisLayer.parent != thisGlyph:
-						thisLayer = thisGlyph.layers[Font.selectedFontMaster.id]
+					thisLayer = self.getReferenceLayer(thisGlyph, selection)
 					output, error = self.correctPathOrdering(thisLayer, True)
 					
 				elif sender == self.allCorrectionsAllLayersItem:
-				
-					output = ("Processing glyph " + thisGlyph.name)
-						
-					for layer in thisGlyph.layers:
-						output += "\n" + self.correctPathDirection(layer)[0] # function returns no error
-						output += "\n" + self.setStartingPoints(layer)[0] # function returns no error
 					
 					# uses the current layer as example of the "correct" ordering
-					thisLayer = Font.selectedLayers[0]
-					if thisLayer.parent != thisGlyph:
-						thisLayer = thisGlyph.layers[Font.selectedFontMaster.id]
-					text, error = self.correctPathOrdering(thisLayer, True)
-					output += "\n" + text
+					thisLayer = self.getReferenceLayer(thisGlyph, selection)
 					
-					# TODO!!! if correctPathOrdering fails, repeat and try moving startpoints
+					output, error, plan = self.runAllCorrections(thisGlyph, thisLayer)
 					
 					if len(selectedGlyphs) > 1:
 						output += ("\n")
 				
 				else:
 					print("⚠️ Error: Unrecognized command %s"%sender.title())
+				
+				if snapshot is not None:
+					plan = self.derivePathPlan(thisGlyph, snapshot)
+				if firstOfGroup and plan is not False:
+					# without a plan, the next glyph of the group is processed on its own
+					counts = dict([(name, count - countsBefore[name]) for name, count in startingPointCounts.items()])
+					groupResults[key] = (thisGlyph.name, bool(error), plan, counts)
 					
 				if len(selectedGlyphs) > self.SUPPRESS_OUTPUT:
 					if error:
@@ -1101,6 +1424,31 @@ class PathJuggler(GeneralPlugin):
 					if error:
 						print(error)
 				
+			if sender == self.startingPointItem or sender == self.startingPointAllLayersItem:
+				print("Starting points: %(changed)i set, %(unchanged)i already at the bottom left, %(empty)i paths without on-curve nodes, %(open)i open paths left as they are" % startingPointCounts)
+			
+			if len(interpolationRanking) > 1:
+				interpolationRanking.sort(key=lambda entry: -entry[1]["severity"])
+				print("Glyphs by severity of interpolation problems:")
+				for name, result in interpolationRanking:
+					print("%s: %i" % (name, result["severity"]))
+			
+			if self.componentStatistics["reused"]:
+				print("Components: %(analyzed)i glyphs analyzed, verdicts reused %(reused)i times" % self.componentStatistics)
+			
+			if self.topologyStatistics["reused"]:
+				statistics = self.topologyStatistics
+				# the verification has to stay cheaper than findInnerPaths, or reusing the topology does not pay
+				print("Path containment: reused on %i layers (%.2f ms per check, %i rejected), computed on %i (%.2f ms per layer)" % (
+					statistics["reused"], statistics["verifyTime"] * 1000 / (statistics["reused"] + statistics["rejected"]), statistics["rejected"],
+					statistics["computed"], statistics["computeTime"] * 1000 / max(1, statistics["computed"])))
+			
+			if self.triageStatistics["pairs"]:
+				print("Layer triage: %(checked)i of %(pairs)i layer pairs checked, %(skipped)i skipped after a failure" % self.triageStatistics)
+			
+			if self.USE_COMPASS and sum(self.compassStatistics.values()):
+				print("Segment pairs: %(accepted)i accepted and %(rejected)i rejected by compass direction, %(exact)i compared exactly" % self.compassStatistics)
+			
 			if len(selectedGlyphs) > self.SUPPRESS_OUTPUT:
 				if errors.strip() == "":
 					print("✅ " + successString)
@@ -1129,3 +1477,6 @@ class PathJuggler(GeneralPlugin):
 	def __file__(self):
 		"""Please leave this method unchanged"""
 		return __file__
+
+# time to import this module, reported with the startup time of the plugin
+MODULE_LOAD_TIME = time.time() - _loadStart
@@ -0,0 +1,109 @@
+# encoding: utf-8
+
+###########################################################################################################
+#
+#	Small synthetic glyphs for the tests, in the form expected by store.writeStore
+#
+###########################################################################################################
+
+from __future__ import division, print_function, unicode_literals
+import os, sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pathjuggler import engine
+
+def rectangle(x0, y0, x1, y1, clockwise=True):
+	nodes = [(x0, y0, engine.LINE), (x0, y1, engine.LINE), (x1, y1, engine.LINE), (x1, y0, engine.LINE)]
+	return nodes if clockwise else [nodes[0]] + nodes[:0:-1]
+
+def rotate(nodes, steps):
+	return nodes[steps:] + nodes[:steps]
+
+def bowl(x0, y0, x1, y1):
+	''' A closed path with curves, so that the curve and off-curve node types are stored too '''
+	mx, my = (x0 + x1) / 2, (y0 + y1) / 2
+	return [
+		(x0, my, engine.OFFCURVE), (x0, y1, engine.OFFCURVE), (mx, y1, engine.CURVE),
+		(x1, y1, engine.OFFCURVE), (x1, my, engine.OFFCURVE), (x1, y0, engine.CURVE),
+		(x1, y0, engine.LINE), (x0, y0, engine.LINE), (x0, my, engine.LINE),
+	]
+
+def kinkedStem(kink):
+	return [(200, 0, engine.LINE), (200, 340, engine.LINE), (200 + kink, 360, engine.LINE), (200, 700, engine.LINE), (300, 700, engine.LINE), (300, 0, engine.LINE)]
+
+def glyphs():
+	'''
+	:return: [(glyph name, [(layer name, [(closed, nodes)])])] covering compatible and
+	incompatible layers, swapped paths, moved starting points, overlaps and open paths
+	'''
+	return [
+		("square", [
+			("Regular", [(True, rotate(rectangle(0, 0, 500, 700), 1))]),
+			("Bold", [(True, rotate(rectangle(0, 0, 600, 720), 1))]),
+		]),
+		("flipped", [
+			("Regular", [(True, rectangle(0, 0, 500, 700))]),
+			("Bold", [(True, rectangle(0, 0, 600, 720, False))]),
+		]),
+		("ring", [
+			("Regular", [(True, rectangle(0, 0, 500, 700)), (True, rectangle(100, 100, 400, 600, False))]),
+			("Bold", [(True, rectangle(150, 150, 450, 570, False)), (True, rectangle(0, 0, 600, 720))]),
+		]),
+		("rotated", [
+			("Regular", [(True, rectangle(0, 0, 500, 700))]),
+			("Bold", [(True, rotate(rectangle(0, 0, 600, 720), 2))]),
+		]),
+		("plus", [
+			("Regular", [(True, rectangle(200, 0, 300, 700)), (True, rectangle(0, 300, 500, 400))]),
+			("Bold", [(True, rectangle(180, 0, 340, 720)), (True, rectangle(0, 280, 520, 440))]),
+		]),
+		("kinked", [
+			# the short segments at the kink lie inside the bar and point in different directions
+			("Regular", [(True, kinkedStem(20)), (True, rectangle(0, 300, 500, 400))]),
+			("Bold", [(True, kinkedStem(-20)), (True, rectangle(0, 300, 500, 400))]),
+		]),
+		("curved", [
+			("Regular", [(True, bowl(0, 0, 500, 700))]),
+			("Bold", [(True, bowl(0, 0, 600, 720))]),
+			("Bold [300]", [(True, bowl(0, 0, 650, 720))]),
+		]),
+		("stroke", [
+			("Regular", [(False, [(0, 0, engine.LINE), (250, 700, engine.LINE), (500, 0, engine.LINE)])]),
+			("Bold", [(False, [(500, 0, engine.LINE), (250, 720, engine.LINE), (0, 0, engine.LINE)])]),
+		]),
+		("single", [
+			("Regular", [(True, rectangle(0, 0, 500, 700))]),
+		]),
+		("space", [
+			("Regular", []),
+			("Bold", []),
+		]),
+		("empty", []),
+	]
+
+def glyphLayers(glyph):
+	''' The layers and closed flags of the first layer of a fixture glyph, as the engine takes them '''
+	glyphName, layers = glyph
+	return ([[nodes for closed, nodes in paths] for layerName, paths in layers], [closed for closed, nodes in layers[0][1]] if layers else [])
+
+# (directional, path ordering, paths needing a new starting point) of every glyph, by IGNORE_OVERLAP,
+# worked out by hand: reversed paths, swapped paths and moved starting points fail the directional
+# check, every path except those of "square" starts away from its bottom left node, open paths
+# keep their start, and the kink of "kinked" only passes if its segments inside the bar are ignored
+EXPECTED = {
+	True: {
+		"square": (True, True, 0),
+		"flipped": (False, True, 2),
+		"ring": (False, True, 4),
+		"rotated": (False, True, 2),
+		"plus": (True, True, 4),
+		"kinked": (True, True, 4),
+		"curved": (True, True, 3),
+		"stroke": (False, True, 0),
+		"single": (True, True, 1),
+		"space": (True, True, 0),
+		"empty": (True, True, 0),
+	},
+}
+EXPECTED[False] = dict(EXPECTED[True], kinked=(False, True, 4))
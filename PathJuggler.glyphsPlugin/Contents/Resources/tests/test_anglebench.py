@@ -0,0 +1,30 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import unittest
+import fixtures # puts the package on the path
+from pathjuggler import anglebench, engine
+
+class AngleTableTest(unittest.TestCase):
+
+	def setUp(self):
+		anglebench.angleTable.clear()
+
+	def testSameAnglesAsGetAngle(self):
+		segments = anglebench.exhaustiveSegments(40) + anglebench.sampleSegments(5000, 1)
+		self.assertEqual(anglebench.mismatches(segments), [])
+		# warm, from the table
+		self.assertEqual(anglebench.mismatches(segments), [])
+
+	def testMultiplesShareAnEntry(self):
+		angle = anglebench.lookupAngle((0, 0), (3, 4))
+		self.assertEqual(anglebench.angleTable[(3, 4)], angle)
+		self.assertEqual(anglebench.lookupAngle((10, 10), (70, 90)), angle)
+		self.assertEqual(anglebench.lookupAngle((0, 0), (0, 0)), engine.getAngle((0, 0), (0, 0)))
+
+	def testFractionalDeltasAreNotStored(self):
+		anglebench.lookupAngle((0, 0), (0.5, 2))
+		self.assertEqual(anglebench.angleTable, {})
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,218 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import unittest
+import fixtures
+from fixtures import rectangle
+from pathjuggler import engine
+
+def survivors(paths, closed):
+	coords = engine.overlapCoords(paths, closed)
+	return sorted([point for cell in coords.cells.values() for point in cell])
+
+class OverlapCoordsTest(unittest.TestCase):
+
+	def testPlus(self):
+		# the stem has a node inside the bar and nodes where its edge crosses the edges of the bar
+		stem = [(200, 0, engine.LINE), (200, 300, engine.LINE), (200, 350, engine.LINE), (200, 400, engine.LINE), (200, 700, engine.LINE), (300, 700, engine.LINE), (300, 0, engine.LINE)]
+		bar = rectangle(0, 300, 500, 400)
+		points = survivors([stem, bar], [True, True])
+		self.assertNotIn((200, 350), points)
+		# remove overlap puts nodes where contours cross, so these stay
+		self.assertIn((200, 300), points)
+		self.assertIn((200, 400), points)
+		self.assertEqual(len(points), 10)
+
+	def testOverlappingCorners(self):
+		points = survivors([rectangle(0, 0, 400, 400), rectangle(200, 200, 600, 600)], [True, True])
+		self.assertNotIn((400, 400), points)
+		self.assertNotIn((200, 200), points)
+		self.assertEqual(len(points), 6)
+
+	def testRing(self):
+		# a counter runs against its outer contour: both contours are kept
+		outer = rectangle(0, 0, 500, 700, False)
+		inner = rectangle(100, 100, 400, 600)
+		self.assertEqual(survivors([outer, inner], [True, True]), sorted([(x, y) for (x, y, t) in outer + inner]))
+
+	def testNestedSameDirection(self):
+		# a contour inside another one of the same direction disappears in remove overlap
+		outer = rectangle(0, 0, 500, 700)
+		inner = rectangle(100, 100, 400, 600)
+		self.assertEqual(survivors([outer, inner], [True, True]), sorted([(x, y) for (x, y, t) in outer]))
+		self.assertEqual(survivors([inner, outer], [True, True]), sorted([(x, y) for (x, y, t) in outer]))
+
+	def testOpenPathsFillNothing(self):
+		outer = rectangle(0, 0, 500, 700)
+		stroke = [(100, 100, engine.LINE), (400, 600, engine.LINE)]
+		self.assertEqual(survivors([outer, stroke], [True, False]), sorted([(x, y) for (x, y, t) in outer]))
+		self.assertEqual(survivors([stroke, rectangle(600, 0, 700, 100)], [False, True]), sorted([(100, 100), (400, 600), (600, 0), (600, 100), (700, 100), (700, 0)]))
+
+	def testCurves(self):
+		bowl = fixtures.bowl(0, 0, 500, 700)
+		onCurve = sorted([(x, y) for (x, y, t) in bowl if t != engine.OFFCURVE])
+		# between the chord and the curve of the bowl: covered only if the curve is followed
+		inside = rectangle(400, 500, 420, 520)
+		self.assertEqual(survivors([bowl, inside], [True, True]), onCurve)
+		# outside the curve, but inside its control points
+		outside = rectangle(470, 640, 490, 660)
+		self.assertEqual(survivors([bowl, outside], [True, True]), sorted(onCurve + [(x, y) for (x, y, t) in outside]))
+
+class MarginTest(unittest.TestCase):
+
+	def testMarginsGiveTheVerdicts(self):
+		# the plugin derives its verdicts from the margins and measures every pair of layers once
+		settingsList = [engine.Settings(tolerance, horizTolerance, maxMismatches, ignoreOverlap)
+			for tolerance in (30, 60, 100) for horizTolerance in (5, 15) for maxMismatches in (0, 1) for ignoreOverlap in (True, False)]
+		for glyph in fixtures.glyphs():
+			layers, closed = fixtures.glyphLayers(glyph)
+			overlaps = [engine.overlapCoords(paths, closed) for paths in layers]
+			for i in range(len(layers)):
+				for j in range(len(layers)):
+					if i == j:
+						continue
+					margin = engine.layerPairMargin(layers[i], layers[j], overlaps[i], overlaps[j])
+					self.assertEqual(margin, engine.layerPairMargin(layers[j], layers[i], overlaps[j], overlaps[i]))
+					for settings in settingsList:
+						self.assertEqual(engine.marginPasses(margin, settings), engine.allPathsDirectionallyCompatible(layers[i], layers[j], settings, overlaps[i], overlaps[j]), (glyph[0], i, j))
+
+	def testReevaluation(self):
+		table = engine.MarginTable()
+		for glyph in fixtures.glyphs():
+			layers, closed = fixtures.glyphLayers(glyph)
+			overlaps = [engine.overlapCoords(paths, closed) for paths in layers]
+			for i in range(len(layers)):
+				for j in range(i + 1, len(layers)):
+					table.add(glyph[0], i, j, engine.layerPairMargin(layers[i], layers[j], overlaps[i], overlaps[j]))
+		for ignoreOverlap in (True, False):
+			expected = sorted([name for name, verdicts in fixtures.EXPECTED[ignoreOverlap].items() if verdicts[0] is False])
+			self.assertEqual(sorted(table.failingGlyphs(engine.Settings(ignoreOverlap=ignoreOverlap))), expected)
+		# a looser tolerance lets the kink pass without checking the glyph again
+		self.assertNotIn("kinked", table.failingGlyphs(engine.Settings(tolerance=100, ignoreOverlap=False)))
+
+class CornerTest(unittest.TestCase):
+
+	def testSpike(self):
+		# the cap of the spike is horizontal in one layer and slanted in the other; it turns back by more than 180 degrees in both
+		source = [(0, 0, engine.LINE), (0, 100, engine.LINE), (20, 100, engine.LINE), (0, 80, engine.LINE)]
+		target = [(0, 0, engine.LINE), (0, 100, engine.LINE), (20, 90, engine.LINE), (0, 70, engine.LINE)]
+		settings = engine.Settings()
+		self.assertFalse(engine.pathsDirectionallyCompatible(source, target, settings))
+		settings.IGNORE_CORNER = True
+		self.assertTrue(engine.pathsDirectionallyCompatible(source, target, settings))
+
+	def testIsCorner(self):
+		self.assertTrue(engine.isCorner(engine.DIR_N, engine.DIR_E, engine.DIR_SW))
+		self.assertTrue(engine.isCorner(engine.DIR_N, engine.DIR_W, engine.DIR_SE))
+		self.assertFalse(engine.isCorner(engine.DIR_N, engine.DIR_E, engine.DIR_S))
+		self.assertFalse(engine.isCorner(engine.DIR_N, engine.DIR_E, engine.DIR_N))
+
+class ContainmentTest(unittest.TestCase):
+
+	def verify(self, reference, paths):
+		# the inner paths of the reference as findInnerPaths finds them: enclosing bounds, no crossing
+		bounds = [engine.getBounds(nodes) for nodes in reference]
+		candidates = engine.containmentCandidates(bounds)
+		innerPaths = [(outer, inner) for (outer, inner) in candidates if not engine.pathsCross(reference[outer], reference[inner])]
+		return innerPaths, engine.verifyContainment(innerPaths, candidates, paths, [engine.getBounds(nodes) for nodes in paths])
+
+	def testRing(self):
+		innerPaths, verified = self.verify([rectangle(0, 0, 500, 700), rectangle(100, 100, 400, 600, False)], [rectangle(0, 0, 600, 720), rectangle(150, 150, 450, 570, False)])
+		self.assertEqual((innerPaths, verified), ([(0, 1)], True))
+
+	def testCrossingOnThisLayer(self):
+		innerPaths, verified = self.verify([rectangle(0, 0, 500, 700), rectangle(100, 100, 400, 600)], [rectangle(0, 0, 500, 700), rectangle(100, 100, 500, 600)])
+		self.assertEqual((innerPaths, verified), ([(0, 1)], False))
+		innerPaths, verified = self.verify([rectangle(0, 0, 500, 700), rectangle(100, 100, 500, 600)], [rectangle(0, 0, 500, 700), rectangle(100, 100, 400, 600)])
+		self.assertEqual((innerPaths, verified), ([], False))
+
+	def testInsideTheBoundsOnly(self):
+		# a square in the notch of an L: not crossing, inside its bounds, but outside its outline, which findInnerPaths accepts as well
+		corner = [(0, 0, engine.LINE), (0, 700, engine.LINE), (100, 700, engine.LINE), (100, 100, engine.LINE), (500, 100, engine.LINE), (500, 0, engine.LINE)]
+		innerPaths, verified = self.verify([corner, rectangle(300, 400, 400, 500)], [corner, rectangle(250, 350, 450, 550)])
+		self.assertEqual((innerPaths, verified), ([(0, 1)], True))
+
+	def testNewContainment(self):
+		innerPaths, verified = self.verify([rectangle(0, 0, 500, 700), rectangle(600, 0, 700, 100)], [rectangle(0, 0, 500, 700), rectangle(300, 0, 400, 100)])
+		self.assertEqual((innerPaths, verified), ([], False))
+
+	def testCurves(self):
+		bowl = fixtures.bowl(0, 0, 500, 700)
+		# inside the control points of the bowl, but outside its curve, and crossing it
+		self.assertFalse(engine.pathsCross(bowl, rectangle(470, 640, 490, 660)))
+		self.assertTrue(engine.pathsCross(bowl, rectangle(400, 500, 520, 520)))
+
+def translated(layers, dx, dy):
+	return [[[(x + dx, y + dy, t) for (x, y, t) in nodes] for nodes in paths] for paths in layers]
+
+def correctGlyph(layers, closed):
+	'''
+	Runs all corrections on node lists like the plugin does, with outer paths counter-clockwise
+	and the paths inside them clockwise in place of its path direction stage
+	'''
+	states = [engine.LayerState([engine.PathState(i, nodes, closed[i], engine.getBounds(nodes)) for i, nodes in enumerate(paths)], True) for paths in layers]
+	for state in states:
+		inner = set([i for (outer, i) in engine.containmentCandidates([p.bounds for p in state.paths])])
+		for i, path in enumerate(state.paths):
+			if (engine.signedArea(engine.flattenedPolygon(path.nodes)) > 0) == (i in inner):
+				path.reverse()
+		state.overlapCoords = engine.overlapCoords(state.nodeLists(), closed)
+	return states, engine.correctLayerStates(states, states[0], engine.Settings())
+
+class PathPlanTest(unittest.TestCase):
+
+	def setUp(self):
+		# a ring whose other layer has its paths swapped, the outer one reversed, and starting points away from the bottom left
+		self.closed = [True, True]
+		self.layers = [
+			[fixtures.rotate(rectangle(0, 0, 500, 700, False), 2), rectangle(100, 100, 400, 600)],
+			[fixtures.rotate(rectangle(150, 150, 450, 570), 2), fixtures.rotate(rectangle(0, 0, 600, 720), 3)],
+		]
+
+	def testCorrections(self):
+		states, (startingPoints, reordered, failure) = correctGlyph(self.layers, self.closed)
+		self.assertEqual((startingPoints, reordered, failure), (4, True, None))
+		self.assertEqual([p.index for p in states[1].paths], [1, 0])
+		verdicts = engine.checkGlyph([state.nodeLists() for state in states], self.closed, engine.Settings())
+		self.assertEqual(verdicts, {"directional": True, "ordering": True})
+
+	def testWriteBackAndReplay(self):
+		# the first glyph of a group writes its changes back through the plan, the others replay it
+		states, result = correctGlyph(self.layers, self.closed)
+		plan = engine.layerStatesPlan(self.layers, states)
+		corrected = []
+		for paths, layerPlan in zip(self.layers, plan):
+			self.assertIsNotNone(layerPlan)
+			changes = engine.resolveLayerPlan(paths, self.closed, layerPlan)
+			corrected.append(engine.applyLayerChanges(paths, changes))
+		self.assertEqual(corrected, [state.nodeLists() for state in states])
+
+		duplicate = translated(self.layers, 1000, -50)
+		replayed = [engine.applyLayerChanges(paths, engine.resolveLayerPlan(paths, self.closed, layerPlan)) for paths, layerPlan in zip(duplicate, plan)]
+		self.assertEqual(replayed, translated(corrected, 1000, -50))
+		duplicateStates, duplicateResult = correctGlyph(duplicate, self.closed)
+		self.assertEqual(replayed, [state.nodeLists() for state in duplicateStates])
+
+	def testUnchangedGlyph(self):
+		layers = [[fixtures.rotate(rectangle(0, 0, 500, 700, False), 1)], [fixtures.rotate(rectangle(0, 0, 600, 720, False), 1)]]
+		states, result = correctGlyph(layers, [True])
+		self.assertEqual(result, (0, False, None))
+		self.assertIsNone(engine.layerStatesPlan(layers, states))
+
+	def testPlanMustFit(self):
+		states, result = correctGlyph(self.layers, self.closed)
+		plan = engine.layerStatesPlan(self.layers, states)
+		other = [list(paths) for paths in self.layers]
+		other[1][0] = rectangle(150, 150, 450, 580)
+		self.assertIsNone(engine.resolveLayerPlan(other[1], self.closed, plan[1]))
+		self.assertIsNone(engine.resolveLayerPlan(other[1][:1], self.closed, plan[1]))
+
+	def testOpenPathsKeepTheirStart(self):
+		stroke = [(0, 0, engine.LINE), (250, 700, engine.LINE), (500, 0, engine.LINE)]
+		origin = engine.layerOrigin([stroke])
+		self.assertEqual(engine.resolvePathKey(stroke, False, engine.pathKey(engine.reversedNodes(stroke), origin), origin), (True, None))
+		self.assertIsNone(engine.resolvePathKey(stroke, False, engine.pathKey(engine.rotatedNodes(stroke, 0), origin), origin))
+		self.assertEqual(engine.resolvePathKey(stroke, True, engine.pathKey(engine.rotatedNodes(stroke, 0), origin), origin), (False, 0))
+
+if __name__ == "__main__":
+	unittest.main()
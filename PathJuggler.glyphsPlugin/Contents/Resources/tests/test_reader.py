@@ -0,0 +1,45 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import threading, unittest
+import fixtures # puts the package on the path
+from pathjuggler import glyphsfile, reader
+
+def readAll(prefetch, timeout=10):
+	''' All items of a PrefetchReader, or None if it does not finish within timeout seconds '''
+	items = []
+	thread = threading.Thread(target=lambda: items.extend(prefetch))
+	thread.daemon = True
+	thread.start()
+	thread.join(timeout)
+	return None if thread.is_alive() else items
+
+class PrefetchReaderTest(unittest.TestCase):
+
+	def testAllFilesAreRead(self):
+		items = readAll(reader.PrefetchReader(range(100), read=lambda n: n * n, readers=3, queueSize=4))
+		self.assertEqual(sorted([(path, glyph, error) for (path, glyph, error) in items]), [(n, n * n, None) for n in range(100)])
+
+	def testErrorsAreReported(self):
+		def read(n):
+			if n % 10 == 3:
+				raise AttributeError("broken %i" % n)
+			return n
+		items = readAll(reader.PrefetchReader(range(50), read=read, readers=2, queueSize=2))
+		self.assertIsNotNone(items, "the reader did not finish")
+		errors = sorted([path for (path, glyph, error) in items if error is not None])
+		self.assertEqual(errors, [3, 13, 23, 33, 43])
+		self.assertEqual(len(items), 50)
+
+class MalformedGlyphTest(unittest.TestCase):
+
+	def testNonDictEntriesAreSkipped(self):
+		self.assertEqual(glyphsfile.readGlyphLayers("{glyphname = a; layers = (x);}"), ("a", []))
+		self.assertEqual(glyphsfile.readGlyph("{glyphname = b; layers = ({layerId = m; attr = x; shapes = (x, {nodes = ((1,2,l),(3,4,l));});});}"),
+			("b", [("m", [(True, [(1.0, 2.0, "line"), (3.0, 4.0, "line")])])]))
+
+	def testNotAGlyph(self):
+		self.assertRaises(glyphsfile.ParseError, glyphsfile.readGlyph, "(1, 2)")
+
+if __name__ == "__main__":
+	unittest.main()
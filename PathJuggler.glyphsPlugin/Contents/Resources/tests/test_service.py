@@ -0,0 +1,92 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import io, json, os, shutil, socket, tempfile, threading, time, unittest
+import fixtures
+from pathjuggler import engine, glyphsfile, service
+
+NODE_CODES = {engine.LINE: "l", engine.CURVE: "c", engine.OFFCURVE: "o"}
+
+def glyphText(glyph):
+	''' The text of a .glyph file with the layers of a fixture glyph as masters '''
+	glyphName, layers = glyph
+	layerTexts = []
+	for layerName, paths in layers:
+		shapes = ["{closed = %i; nodes = (%s);}" % (closed, ",".join(["(%r,%r,%s)" % (x, y, NODE_CODES[t]) for (x, y, t) in nodes])) for closed, nodes in paths]
+		layerTexts.append("{layerId = \"%s\"; name = \"%s\"; shapes = (%s);}" % (layerName, layerName, ",".join(shapes)))
+	return "{\nglyphname = %s;\nlayers = (%s);\n}" % (glyphName, ",".join(layerTexts))
+
+class ServiceTest(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.font = os.path.join(self.directory, "Font.glyphspackage")
+		os.makedirs(glyphsfile.glyphsDirectory(self.font))
+		for glyph in fixtures.glyphs():
+			if glyph[0] in ("square", "kinked"):
+				self.writeGlyph(glyph)
+		# old enough for its file list to be trusted
+		past = time.time() - 60
+		os.utime(glyphsfile.glyphsDirectory(self.font), (past, past))
+		self.service = service.CheckService()
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def writeGlyph(self, glyph):
+		with io.open(os.path.join(glyphsfile.glyphsDirectory(self.font), glyph[0] + ".glyph"), "w", encoding="utf-8") as f:
+			f.write(glyphText(glyph))
+
+	def testPerRequestSettings(self):
+		self.assertEqual(self.service.checkGlyph(self.font, "kinked"), {"directional": True, "ordering": True})
+		self.assertEqual(self.service.checkGlyph(self.font, "kinked", {"ignoreOverlap": False}), {"directional": False, "ordering": True})
+		self.assertEqual(self.service.checkGlyph(self.font, "kinked"), {"directional": True, "ordering": True})
+		response = self.service.handle({"id": 1, "method": "compatibilityMatrix", "params": {"font": self.font, "glyph": "kinked", "settings": {"ignoreOverlap": False}}})
+		self.assertEqual(response["result"]["directional"], [[True, False], [False, True]])
+		self.assertIn("error", self.service.handle({"id": 2, "method": "checkGlyph", "params": {"font": self.font, "glyph": "kinked", "settings": {"speed": 2}}}))
+
+	def testMalformedRequests(self):
+		self.assertEqual(self.service.handle([1, 2]), {"id": None, "error": "Request must be an object"})
+		self.assertEqual(self.service.handle({"id": 3, "method": "checkGlyph", "params": [1]})["id"], 3)
+		def failing(**params):
+			raise ZeroDivisionError("engine failure")
+		self.service.checkGlyph = failing
+		self.assertEqual(self.service.handle({"id": 4, "method": "checkGlyph", "params": {}}), {"id": 4, "error": "ZeroDivisionError: engine failure"})
+
+	def testNegativeLookupsAreCached(self):
+		package = self.service.package(self.font)
+		package.glyph("square")
+		scans = []
+		indexFiles = package.indexFiles
+		package.indexFiles = lambda: scans.append(1) or indexFiles()
+		for i in range(3):
+			self.assertRaises(KeyError, package.glyph, "missing")
+		self.assertEqual(scans, [])
+		self.writeGlyph(("missing", [("Regular", [(True, fixtures.rectangle(0, 0, 10, 10))])]))
+		self.assertEqual(package.glyph("missing").layerIds, ["Regular"])
+		self.assertEqual(scans, [1])
+
+	def testConnectionSurvivesBadRequests(self):
+		server = service.makeServer(self.service, port=0)
+		thread = threading.Thread(target=server.serve_forever)
+		thread.daemon = True
+		thread.start()
+		try:
+			connection = socket.create_connection(server.server_address)
+			stream = connection.makefile("rwb")
+			requests = ["[1,2]", "{\"id\": 1, \"method\": \"checkGlyph\", \"params\": {\"font\": 1}}", json.dumps({"id": 2, "method": "checkGlyph", "params": {"font": self.font, "glyph": "square"}})]
+			for request in requests:
+				stream.write((request + "\n").encode("utf-8"))
+			stream.flush()
+			responses = [json.loads(stream.readline().decode("utf-8")) for request in requests]
+			self.assertIn("error", responses[0])
+			self.assertIn("error", responses[1])
+			self.assertEqual(responses[2], {"id": 2, "result": {"directional": True, "ordering": True}})
+			stream.close()
+			connection.close()
+		finally:
+			server.shutdown()
+			server.server_close()
+
+if __name__ == "__main__":
+	unittest.main()
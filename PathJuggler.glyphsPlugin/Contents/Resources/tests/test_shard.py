@@ -0,0 +1,80 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import os, shutil, tempfile, unittest
+import fixtures
+from pathjuggler import engine, shard, store
+
+class ShardTest(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.storePath = os.path.join(self.directory, "Font.pjgs")
+		store.writeStore(self.storePath, fixtures.glyphs())
+		self.settings = engine.Settings()
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def runShards(self, shardCount, byCost=False):
+		return [shard.runShard(self.storePath, s, shardCount, self.settings, byCost=byCost) for s in range(shardCount)]
+
+	def testMergedVerdicts(self):
+		single = shard.runShard(self.storePath, 0, 1, self.settings)
+		for byCost in (False, True):
+			report = shard.mergeReports(self.runShards(3, byCost))
+			self.assertEqual(sorted(report["glyphs"]), sorted([glyphName for glyphName, layers in fixtures.glyphs()]))
+			for glyphName, layers in fixtures.glyphs():
+				entry = report["glyphs"][glyphName]
+				self.assertEqual((entry["directional"], entry["ordering"]), fixtures.EXPECTED[True][glyphName][:2])
+				# the plans do not depend on how the glyphs were split
+				self.assertEqual(entry["plan"], single["glyphs"][glyphName]["plan"])
+
+	def testShardsAreDisjoint(self):
+		reports = self.runShards(3)
+		names = [name for report in reports for name in report["glyphs"]]
+		self.assertEqual(len(names), len(set(names)))
+
+	def testReportRoundTrip(self):
+		reportPath = os.path.join(self.directory, "part0.json")
+		report = shard.runShard(self.storePath, 0, 1, self.settings, reportPath)
+		self.assertEqual(shard.readReport(reportPath), report)
+
+	def testMergeRejectsIncompleteRuns(self):
+		reports = self.runShards(3)
+		self.assertRaises(ValueError, shard.mergeReports, reports[:2])
+		self.assertRaises(ValueError, shard.mergeReports, reports + [reports[0]])
+		del reports[1]["glyphs"][sorted(reports[1]["glyphs"])[0]]
+		self.assertRaises(ValueError, shard.mergeReports, reports)
+
+	def testMergeRejectsOtherAssignments(self):
+		reports = self.runShards(2)
+		byCost = self.runShards(2, True)
+		if reports[0]["assignment"] != byCost[0]["assignment"]:
+			self.assertRaises(ValueError, shard.mergeReports, [reports[0], byCost[1]])
+		other = dict(reports[1], settings=shard.settingsKey(engine.Settings(tolerance=30)))
+		self.assertRaises(ValueError, shard.mergeReports, [reports[0], other])
+
+	def testApplyPlans(self):
+		report = shard.mergeReports(self.runShards(2))
+		outPath = os.path.join(self.directory, "Fixed.pjgs")
+		changed = shard.applyPlans(self.storePath, report, outPath)
+		self.assertGreater(changed, 0)
+		with store.GeometryStore(self.storePath) as before, store.GeometryStore(outPath) as after:
+			self.assertEqual(after.glyphNames, before.glyphNames)
+			self.assertEqual(after.layerNames, before.layerNames)
+			for g in range(after.glyphCount()):
+				# the plans only reorder paths and move starting points: every layer keeps its nodes
+				for beforePaths, afterPaths in zip(before.glyphGeometry(g), after.glyphGeometry(g)):
+					self.assertEqual(sorted([(p.closed, sorted(p)) for p in beforePaths]), sorted([(p.closed, sorted(p)) for p in afterPaths]))
+		results = dict([(result[0], result[1:3]) for result in store.checkStore(outPath, self.settings, processes=1)])
+		self.assertEqual(results["ring"], (True, True))
+		self.assertEqual(results["rotated"], (True, True))
+		self.assertEqual(results["flipped"], (False, True))
+
+	def testApplyPlansRejectsIncompleteReports(self):
+		report = shard.runShard(self.storePath, 0, 2, self.settings)
+		self.assertRaises(ValueError, shard.applyPlans, self.storePath, report, os.path.join(self.directory, "Fixed.pjgs"))
+
+if __name__ == "__main__":
+	unittest.main()
@@ -0,0 +1,54 @@
+# encoding: utf-8
+
+from __future__ import division, print_function, unicode_literals
+import os, shutil, tempfile, unittest
+import fixtures
+from pathjuggler import engine, store
+
+class StoreTest(unittest.TestCase):
+
+	def setUp(self):
+		self.directory = tempfile.mkdtemp()
+		self.storePath = os.path.join(self.directory, "Font.pjgs")
+		store.writeStore(self.storePath, fixtures.glyphs())
+
+	def tearDown(self):
+		shutil.rmtree(self.directory)
+
+	def testRoundTrip(self):
+		with store.GeometryStore(self.storePath) as geometryStore:
+			self.assertEqual(geometryStore.glyphCount(), len(fixtures.glyphs()))
+			for g, (glyphName, layers) in enumerate(fixtures.glyphs()):
+				self.assertEqual(geometryStore.glyphNames[g], glyphName)
+				self.assertEqual(geometryStore.glyphIndex(glyphName), g)
+				layerIndices = geometryStore.glyphLayers(g)
+				self.assertEqual([geometryStore.layerNames[l] for l in layerIndices], [layerName for layerName, paths in layers])
+				for l, (layerName, paths) in zip(layerIndices, layers):
+					views = geometryStore.layerPaths(l)
+					self.assertEqual([(view.closed, list(view)) for view in views], [(closed, [tuple(n) for n in nodes]) for closed, nodes in paths])
+
+	def testPathView(self):
+		with store.GeometryStore(self.storePath) as geometryStore:
+			view = geometryStore.glyphGeometry(geometryStore.glyphIndex("curved"))[0][0]
+			nodes = fixtures.bowl(0, 0, 500, 700)
+			self.assertEqual(len(view), len(nodes))
+			self.assertEqual(view[0], nodes[0])
+			self.assertEqual(view[-1], nodes[-1])
+			self.assertRaises(IndexError, lambda: view[len(nodes)])
+
+	def testRejectsOtherFiles(self):
+		otherPath = os.path.join(self.directory, "Other.pjgs")
+		with open(otherPath, "wb") as f:
+			f.write(b"\0" * 64)
+		self.assertRaises(ValueError, store.GeometryStore, otherPath)
+
+	def testCheckStore(self):
+		for ignoreOverlap in (True, False):
+			settings = engine.Settings(ignoreOverlap=ignoreOverlap)
+			expected = [(glyphName,) + fixtures.EXPECTED[ignoreOverlap][glyphName] for glyphName, layers in fixtures.glyphs()]
+			self.assertEqual(store.checkStore(self.storePath, settings, processes=1), expected)
+			self.assertEqual(store.checkStore(self.storePath, settings, processes=2, chunkSize=3), expected)
+			self.assertEqual(store.checkStore(self.storePath, settings, processes=2, chunkSize=3, longestFirst=False), expected)
+
+if __name__ == "__main__":
+	unittest.main()